@@ -0,0 +1,77 @@
+"""Times the engine on the canonical positions and writes the results as JSON
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --output results.json --compare baseline.json
+
+Results are only comparable between runs on the same machine. When comparing, the exit status
+is 1 if any benchmark is more than `--threshold` slower than the baseline"""
+import argparse
+import json
+import sys
+
+from .positions import POSITIONS
+from .suite import changed_counters
+from .suite import compare_results
+from .suite import different_machine
+from .suite import run_benchmarks
+
+
+def report(position, benchmark, result):
+    print("{:<20} {:<30} {:>12.6f}s".format(position, benchmark, result['seconds']))
+
+
+def report_comparison(baseline, results, threshold):
+    differences = different_machine(baseline, results)
+    if differences:
+        print("Warning: the baseline was run with a different {}".format(", ".join(differences)))
+
+    regressions = 0
+    for position, benchmark, baseline_seconds, seconds, regressed in compare_results(baseline, results, threshold):
+        regressions += regressed
+        print("{:<20} {:<30} {:>12.6f}s {:>12.6f}s {:>+8.1%}{}".format(
+            position,
+            benchmark,
+            baseline_seconds,
+            seconds,
+            seconds / baseline_seconds - 1,
+            "  REGRESSION" if regressed else ""
+        ))
+
+    for position, benchmark, counter, before, after in changed_counters(baseline, results):
+        print("{} {}: {} changed from {} to {}".format(position, benchmark, counter, before, after))
+
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the engine on canonical battle positions")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="a JSON file of earlier results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="how much slower a benchmark can be before it is a regression (default: 0.1)")
+    parser.add_argument('--repeat', type=int, default=3, help="the number of samples of each benchmark (default: 3)")
+    parser.add_argument('--max-depth', type=int, default=3, help="the deepest search to time (default: 3)")
+    parser.add_argument('--positions', nargs='+', choices=list(POSITIONS), help="the positions to benchmark (default: all)")
+    args = parser.parse_args(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(args.positions, args.repeat, args.max_depth, report=report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        print()
+        regressions = report_comparison(baseline, results, args.threshold)
+        if regressions:
+            print("{} benchmark(s) regressed".format(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
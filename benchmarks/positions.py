@@ -0,0 +1,168 @@
+"""Canonical battle positions for the benchmarks
+
+Each position is a Battle as the bot would see it when asked for a move, so the
+benchmarks can time `prepare_battles` as well as the search of the resulting states.
+Every pokemon is taken from the random battle sets so `prepare_battles` does not need
+the smogon usage stats to be downloaded"""
+from collections import defaultdict
+
+import config
+import constants
+import data
+
+from showdown.battle import LastUsedMove
+from showdown.battle import Pokemon
+from showdown.battle_bots.safest.main import BattleBot
+
+
+LEVEL = 82
+
+
+def make_pokemon(name, moves=(), item=constants.UNKNOWN_ITEM, ability=None, hp=1.0, status=None, boosts=None):
+    pkmn = Pokemon(name, LEVEL)
+    for move in moves:
+        pkmn.add_move(move)
+    pkmn.item = item
+    pkmn.ability = ability
+    pkmn.hp = round(pkmn.max_hp * hp)
+    pkmn.fainted = pkmn.hp <= 0
+    pkmn.status = status
+    if boosts is not None:
+        pkmn.boosts = defaultdict(lambda: 0, boosts)
+    return pkmn
+
+
+def make_battle(user_active, user_reserve, opponent_active, opponent_reserve=()):
+    battle = BattleBot("benchmark")
+    battle.battle_type = constants.RANDOM_BATTLE
+    battle.generation = 'gen8'
+    battle.started = True
+
+    battle.user.active = user_active
+    battle.user.reserve = list(user_reserve)
+    # the index of each of the bot's pokemon in its team, which is given by the request json in a real battle
+    for index, pkmn in enumerate([user_active, *user_reserve]):
+        pkmn.index = index + 1
+    battle.opponent.active = opponent_active
+    battle.opponent.reserve = list(opponent_reserve)
+    return battle
+
+
+def user_team():
+    return [
+        make_pokemon("corviknight", ["bravebird", "roost", "bodypress", "defog"], "leftovers", "pressure"),
+        make_pokemon("toxapex", ["scald", "recover", "toxic", "haze"], "blacksludge", "regenerator"),
+        make_pokemon("dragapult", ["dracometeor", "shadowball", "fireblast", "uturn"], "choicespecs", "infiltrator"),
+        make_pokemon("excadrill", ["earthquake", "ironhead", "rapidspin", "swordsdance"], "leftovers", "moldbreaker"),
+        make_pokemon("rotomwash", ["hydropump", "thunderbolt", "voltswitch", "willowisp"], "lifeorb", "levitate"),
+        make_pokemon("clefable", ["moonblast", "fireblast", "moonlight", "calmmind"], "lifeorb", "magicguard"),
+    ]
+
+
+def early_game():
+    """Turn one: only the opponent's lead has been seen and nothing is known about it"""
+    user_active, *user_reserve = user_team()
+    return make_battle(user_active, user_reserve, make_pokemon("weavile"))
+
+
+def hazard_heavy():
+    """Mid-game with hazards on both sides, so every switch costs hp and side-conditions are scored"""
+    user_active, *user_reserve = user_team()
+    user_active.hp = round(user_active.max_hp * 0.6)
+    user_reserve[1].hp = round(user_reserve[1].max_hp * 0.45)
+    user_reserve[3].status = constants.POISON
+
+    battle = make_battle(
+        user_active,
+        user_reserve,
+        make_pokemon("ferrothorn", ["spikes", "leechseed"], "leftovers", "ironbarbs", hp=0.8),
+        [
+            make_pokemon("hippowdon", ["stealthrock", "earthquake"], "leftovers", "sandstream", hp=0.7),
+            make_pokemon("toxapex", ["toxicspikes", "scald"], "blacksludge", "regenerator", hp=0.9),
+        ]
+    )
+    battle.user.side_conditions[constants.STEALTH_ROCK] = 1
+    battle.user.side_conditions[constants.SPIKES] = 2
+    battle.user.side_conditions[constants.TOXIC_SPIKES] = 1
+    battle.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+    battle.opponent.side_conditions[constants.SPIKES] = 1
+    battle.weather = constants.SAND
+    return battle
+
+
+def choice_locked():
+    """Both active pokemon are locked into a move by their choice item"""
+    user_active, *user_reserve = user_team()
+    user_reserve.insert(0, user_active)
+    user_active = user_reserve.pop(2)
+    for move in user_active.moves:
+        move.disabled = move.name != "dracometeor"
+    user_active.boosts = defaultdict(lambda: 0, {constants.SPECIAL_ATTACK: -2})
+    user_active.hp = round(user_active.max_hp * 0.75)
+
+    opponent_active = make_pokemon("cinderace", ["pyroball", "highjumpkick", "uturn"], "choiceband", "libero", hp=0.65)
+    battle = make_battle(
+        user_active,
+        user_reserve,
+        opponent_active,
+        [make_pokemon("gyarados", ["waterfall", "dragondance"], "lifeorb", "moxie")]
+    )
+    battle.opponent.last_used_move = LastUsedMove("cinderace", "pyroball")
+    return battle
+
+
+def forced_switch():
+    """The bot's active pokemon has fainted and it must choose a replacement"""
+    user_active, *user_reserve = user_team()
+    user_active.hp = 0
+    user_active.fainted = True
+    user_reserve[2].hp = 0
+    user_reserve[2].fainted = True
+
+    battle = make_battle(
+        user_active,
+        user_reserve,
+        make_pokemon("tyranitar", ["crunch", "stoneedge", "dragondance"], "leftovers", "sandstream", hp=0.55, boosts={constants.ATTACK: 1, constants.SPEED: 1}),
+        [make_pokemon("rillaboom", ["drumbeating", "uturn"], "choiceband", "grassysurge", hp=0.4)]
+    )
+    battle.force_switch = True
+    battle.weather = constants.SAND
+    return battle
+
+
+def random_battle_6v6():
+    """Late turn in a random battle with both full teams revealed"""
+    user_active, *user_reserve = user_team()
+    user_active.hp = round(user_active.max_hp * 0.85)
+    user_reserve[0].status = constants.TOXIC
+    user_reserve[2].hp = round(user_reserve[2].max_hp * 0.3)
+
+    battle = make_battle(
+        user_active,
+        user_reserve,
+        make_pokemon("gengar", ["shadowball", "sludgewave", "nastyplot"], "lifeorb", "cursedbody", hp=0.9),
+        [
+            make_pokemon("weavile", ["iciclecrash", "throatchop", "iceshard", "swordsdance"], "lifeorb", "pressure", hp=0.5),
+            make_pokemon("excadrill", ["earthquake", "ironhead", "rapidspin"], "focussash", "sandrush"),
+            make_pokemon("clefable", ["moonblast", "moonlight", "thunderwave"], "leftovers", "unaware", hp=0.7),
+            make_pokemon("rotomwash", ["hydropump", "voltswitch", "willowisp", "trick"], "choicescarf", "levitate", hp=0.6),
+            make_pokemon("gyarados", ["waterfall", "earthquake", "dragondance", "powerwhip"], "lifeorb", "moxie", status=constants.BURN),
+        ]
+    )
+    battle.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+    return battle
+
+
+POSITIONS = {
+    'early_game': early_game,
+    'hazard_heavy': hazard_heavy,
+    'choice_locked': choice_locked,
+    'forced_switch': forced_switch,
+    'random_battle_6v6': random_battle_6v6,
+}
+
+
+def use_random_battles():
+    # `prepare_battles` guesses the opponent's sets from whichever sets are loaded, and checks the mode for megas
+    config.pokemon_mode = 'gen8randombattle'
+    data.pokemon_sets = data.random_battle_sets
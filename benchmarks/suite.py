@@ -0,0 +1,203 @@
+import datetime
+import platform
+import statistics
+import subprocess
+import time
+
+import config
+
+from showdown.engine import profiler
+from showdown.engine.damage_calculator import get_damage_calculation_cache
+from showdown.engine.evaluate import evaluate
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.find_state_instructions import get_state_instruction_cache
+from showdown.engine.move_ordering import get_move_orderer
+from showdown.engine.objects import StateMutator
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.transposition_table import get_transposition_table
+
+from .positions import POSITIONS
+from .positions import use_random_battles
+
+
+# the config values that change how much work a search does
+SEARCH_CONFIG = [
+    'damage_calc_type',
+    'damage_roll_bucket_size',
+    'merge_identical_states',
+    'chance_pruning_epsilon',
+    'chance_pruning_top_k',
+]
+
+
+def clear_caches():
+    # every sample starts cold, the same as the first search of a battle
+    get_state_instruction_cache().clear()
+    get_damage_calculation_cache().clear()
+    get_transposition_table().clear()
+    get_move_orderer().clear()
+
+
+def time_function(function, repeat, number=1, warm_up=True):
+    """Times `repeat` samples of calling `function` `number` times, returning the seconds per call of each sample
+
+       The first call in a process also pays for loading lazily-built tables, so it is not timed unless `warm_up` is False"""
+    if warm_up:
+        clear_caches()
+        function()
+
+    samples = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def count_work(function):
+    # the counts are taken from a separate run because profiling slows the search down
+    # this run also warms up the process, so the run that is timed afterwards does not need to
+    clear_caches()
+    with profiler.profiling() as search_profiler:
+        function()
+    return dict(search_profiler.counters)
+
+
+class Position:
+    """A canonical position, prepared the same way the safest bot prepares a battle before searching it"""
+
+    def __init__(self, name):
+        self.name = name
+        self.battle = POSITIONS[name]()
+
+        battle = self.battle.prepare_battles(join_moves_together=True)[0]
+        self.state = battle.create_state()
+        self.user_options, self.opponent_options = battle.get_all_options()
+
+    def prepare_battles(self):
+        self.battle.prepare_battles(join_moves_together=True)
+
+    def get_all_state_instructions(self):
+        mutator = StateMutator(self.state)
+        for user_option in self.user_options:
+            for opponent_option in self.opponent_options:
+                get_all_state_instructions(mutator, user_option, opponent_option)
+
+    def evaluate(self):
+        evaluate(self.state)
+
+    def get_payoff_matrix(self, depth):
+        get_payoff_matrix(StateMutator(self.state), self.user_options, self.opponent_options, depth=depth, prune=True)
+
+
+def benchmark_result(samples, number, counters=None):
+    result = {
+        'seconds': statistics.median(samples),
+        'min_seconds': min(samples),
+        'samples': samples,
+        'number': number,
+    }
+    if counters is not None:
+        result['counters'] = counters
+    return result
+
+
+def benchmark_position(name, repeat, max_depth):
+    position = Position(name)
+    results = {
+        'prepare_battles': benchmark_result(time_function(position.prepare_battles, repeat, number=20), 20),
+    }
+
+    counters = count_work(position.get_all_state_instructions)
+    samples = time_function(position.get_all_state_instructions, repeat, warm_up=False)
+    results['get_all_state_instructions'] = benchmark_result(samples, 1, counters)
+
+    results['evaluate'] = benchmark_result(time_function(position.evaluate, repeat, number=1000), 1000)
+
+    for depth in range(1, max_depth + 1):
+        def search():
+            position.get_payoff_matrix(depth)
+        counters = count_work(search)
+        samples = time_function(search, repeat, warm_up=False)
+        results['get_payoff_matrix_depth_{}'.format(depth)] = benchmark_result(samples, 1, counters)
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_metadata(repeat, max_depth):
+    return {
+        'commit': get_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'repeat': repeat,
+        'max_depth': max_depth,
+        'config': {name: getattr(config, name) for name in SEARCH_CONFIG},
+    }
+
+
+def run_benchmarks(positions=None, repeat=3, max_depth=3, report=None):
+    """Benchmarks each position, returning the results as a dictionary that can be written as JSON
+
+       `report` is called with the name of each benchmark and its result as it finishes"""
+    use_random_battles()
+    results = {}
+    for name in positions or POSITIONS:
+        results[name] = benchmark_position(name, repeat, max_depth)
+        if report is not None:
+            for benchmark, result in results[name].items():
+                report(name, benchmark, result)
+
+    return {
+        'metadata': get_metadata(repeat, max_depth),
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """Compares the median times of the benchmarks that are in both `baseline` and `current`
+
+       Returns a list of (position, benchmark, baseline seconds, current seconds, is regression) tuples
+       A benchmark has regressed if it is more than `threshold` slower than the baseline"""
+    comparisons = []
+    for name, benchmarks in current['results'].items():
+        for benchmark, result in benchmarks.items():
+            try:
+                baseline_seconds = baseline['results'][name][benchmark]['seconds']
+            except KeyError:
+                continue
+            seconds = result['seconds']
+            comparisons.append((name, benchmark, baseline_seconds, seconds, seconds > baseline_seconds * (1 + threshold)))
+    return comparisons
+
+
+def changed_counters(baseline, current):
+    """Returns the counters that differ from the baseline's, as (position, benchmark, counter, baseline, current) tuples
+
+       A search doing a different amount of work is a change in behaviour rather than in speed"""
+    changes = []
+    for name, benchmarks in current['results'].items():
+        for benchmark, result in benchmarks.items():
+            baseline_counters = baseline['results'].get(name, {}).get(benchmark, {}).get('counters')
+            if baseline_counters is None or 'counters' not in result:
+                continue
+            for counter in sorted(set(baseline_counters) | set(result['counters'])):
+                before, after = baseline_counters.get(counter, 0), result['counters'].get(counter, 0)
+                if before != after:
+                    changes.append((name, benchmark, counter, before, after))
+    return changes
+
+
+def different_machine(baseline, current):
+    keys = ['python', 'platform', 'machine', 'processor', 'config']
+    return [key for key in keys if baseline['metadata'].get(key) != current['metadata'].get(key)]
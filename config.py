@@ -21,11 +21,27 @@ track_chat = False
 
 use_relative_weights = False
 damage_calc_type = 'average'
+damage_roll_bucket_size = 0.0
 search_depth = 2
+search_time_budget = 10
+search_processes = 1
+transposition_table_size = 20000
+state_instruction_cache_size = 50000
+damage_calculation_cache_size = 20000
+merge_identical_states = False
+chance_pruning_epsilon = 0.0
+chance_pruning_top_k = 0
+mcts_iterations = 2000
+debug_state_hash = False
+profile_sample_rate = 0.0
+record_decisions = False
+ponder = False
+ponder_max_positions = 16
 
 save_replay = False
 log_to_file = False
 logging_directory = "{}/{}".format(os.getcwd(), "logs/")
+decision_directory = "{}/{}".format(os.getcwd(), "decisions/")
 
 
 def reset_logger(lgr, new_file_name):
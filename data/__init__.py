@@ -1,11 +1,13 @@
 import os
 import json
 
+from .move_table import compile_move_table
+
 PWD = os.path.dirname(os.path.abspath(__file__))
 
 move_json_location = os.path.join(PWD, 'moves.json')
 with open(move_json_location) as f:
-    all_move_json = json.load(f)
+    all_move_json = compile_move_table(json.load(f))
 
 pkmn_json_location = os.path.join(PWD, 'pokedex.json')
 with open(pkmn_json_location, 'r') as f:
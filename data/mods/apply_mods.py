@@ -4,7 +4,10 @@ import constants
 import data
 from data import all_move_json
 from data import pokedex
+from data.move_table import freeze
 from showdown.engine import damage_calculator
+from showdown.engine.find_state_instructions import get_state_instruction_cache
+from showdown.engine.transposition_table import get_transposition_table
 
 CURRENT_GEN = 8
 PWD = os.path.dirname(os.path.abspath(__file__))
@@ -15,7 +18,12 @@ def apply_move_mods(gen_number):
         with open("{}/gen{}_move_mods.json".format(PWD, gen_number), 'r') as f:
             move_mods = json.load(f)
         for move, modifications in move_mods.items():
-            all_move_json[move].update(modifications)
+            all_move_json[move] = freeze({**all_move_json[move], **modifications})
+
+    # anything calculated before now used the unmodified moves
+    damage_calculator.get_damage_calculation_cache().clear()
+    get_state_instruction_cache().clear()
+    get_transposition_table().clear()
 
 
 def apply_pokedex_mods(gen_number):
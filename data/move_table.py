@@ -0,0 +1,55 @@
+import sys
+
+
+class FrozenDict(dict):
+    """A read-only dictionary
+
+       Every move in `all_move_json` is a FrozenDict, so a move can be shared instead of copied.
+       `copy()` returns a regular dictionary that shares the (also read-only) values,
+       so a special-effect can change a move by copying it and setting the keys it changes"""
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("{} is read-only, copy it before changing it".format(self.__class__.__name__))
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+def freeze(value):
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((sys.intern(k), freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def compile_move_table(move_json):
+    """Returns `move_json` with every move converted to a read-only FrozenDict
+
+       Nested dictionaries become FrozenDicts and lists become tuples. Strings are interned,
+       so moves share one copy of each key and comparing them is cheap"""
+    return {sys.intern(name): freeze(move) for name, move in move_json.items()}
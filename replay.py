@@ -0,0 +1,65 @@
+"""Replays decisions recorded with RECORD_DECISIONS=True under cProfile
+
+    python replay.py decisions/battle-gen8randombattle-1234/0007.decision.gz
+    python replay.py decisions/battle-gen8randombattle-1234/*.decision.gz --bot mcts --no-profile
+
+Prints the time each decision took when it was recorded and when it was replayed, and whether the
+replayed decision is the same. The exit status is 1 if any replayed decision is different.
+Each decision is replayed with empty caches, so it does not depend on the decisions replayed before it.
+Decisions made against the clock (SEARCH_TIME_BUDGET, the mcts bot) can differ when the machine is slower or faster"""
+import argparse
+import cProfile
+import pstats
+import sys
+
+from config import logger
+from data.mods.apply_mods import apply_mods
+from showdown.decision_recorder import load_decision
+from showdown.decision_recorder import replay_decision
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Replay recorded decisions under cProfile")
+    parser.add_argument('files', nargs='+', help="recorded decisions")
+    parser.add_argument('--bot', help="the BattleBot module to make the decision with (default: the recorded one)")
+    parser.add_argument('--processes', type=int, default=1, help="search processes; only the main process is profiled (default: 1)")
+    parser.add_argument('--no-profile', action='store_true', help="time the decisions without profiling them")
+    parser.add_argument('--sort', default='cumulative', help="the order the profile is printed in (default: cumulative)")
+    parser.add_argument('--limit', type=int, default=30, help="the number of functions of the profile to print (default: 30)")
+    parser.add_argument('--log-level', default='WARNING', help="the Python logging level (default: WARNING)")
+    args = parser.parse_args(args)
+
+    logger.setLevel(args.log_level)
+
+    records = [(file_name, load_decision(file_name)) for file_name in args.files]
+
+    # the data is modified for a pokemon mode once, the same as `run.py`
+    pokemon_mode = records[0][1]['config']['pokemon_mode']
+    apply_mods(pokemon_mode)
+
+    mismatches = 0
+    for file_name, record in records:
+        if record['config']['pokemon_mode'] != pokemon_mode:
+            print("{}: skipped, it was recorded in {} and not {}".format(file_name, record['config']['pokemon_mode'], pokemon_mode))
+            continue
+
+        profile = None if args.no_profile else cProfile.Profile()
+        if profile is not None:
+            profile.enable()
+        decision, seconds = replay_decision(record, args.bot, {'search_processes': args.processes})
+        if profile is not None:
+            profile.disable()
+
+        matches = decision == record['decision']
+        mismatches += not matches
+        print("{}: {} (recorded {:.3f}s, replayed {:.3f}s)".format(file_name, "same decision" if matches else "DIFFERENT DECISION", record['seconds'], seconds))
+        print("    recorded: {}".format(record['decision']))
+        print("    replayed: {}".format(decision))
+        if profile is not None:
+            pstats.Stats(profile, stream=sys.stdout).sort_stats(args.sort).print_stats(args.limit)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,6 +27,21 @@ def parse_configs():
     config.use_relative_weights = env.bool("USE_RELATIVE_WEIGHTS", config.use_relative_weights)
     config.gambit_exe_path = env("GAMBIT_PATH", config.gambit_exe_path)
     config.search_depth = int(env("MAX_SEARCH_DEPTH", config.search_depth))
+    config.search_time_budget = float(env("SEARCH_TIME_BUDGET", config.search_time_budget))
+    config.search_processes = int(env("SEARCH_PROCESSES", config.search_processes))
+    config.transposition_table_size = int(env("TRANSPOSITION_TABLE_SIZE", config.transposition_table_size))
+    config.state_instruction_cache_size = int(env("STATE_INSTRUCTION_CACHE_SIZE", config.state_instruction_cache_size))
+    config.damage_calculation_cache_size = int(env("DAMAGE_CALCULATION_CACHE_SIZE", config.damage_calculation_cache_size))
+    config.merge_identical_states = env.bool("MERGE_IDENTICAL_STATES", config.merge_identical_states)
+    config.damage_roll_bucket_size = float(env("DAMAGE_ROLL_BUCKET_SIZE", config.damage_roll_bucket_size))
+    config.chance_pruning_epsilon = float(env("CHANCE_PRUNING_EPSILON", config.chance_pruning_epsilon))
+    config.chance_pruning_top_k = int(env("CHANCE_PRUNING_TOP_K", config.chance_pruning_top_k))
+    config.mcts_iterations = int(env("MCTS_ITERATIONS", config.mcts_iterations))
+    config.profile_sample_rate = float(env("PROFILE_SAMPLE_RATE", config.profile_sample_rate))
+    config.ponder = env.bool("PONDER", config.ponder)
+    config.ponder_max_positions = int(env("PONDER_MAX_POSITIONS", config.ponder_max_positions))
+    config.record_decisions = env.bool("RECORD_DECISIONS", config.record_decisions)
+    config.decision_directory = env("DECISION_DIRECTORY", config.decision_directory)
     config.greeting_message = env("GREETING_MESSAGE", config.greeting_message)
     config.battle_ending_message = env("BATTLE_OVER_MESSAGE", config.battle_ending_message)
     config.websocket_uri = env("WEBSOCKET_URI", "sim.smogon.com:8000")
@@ -44,6 +44,9 @@ DamageDealt = namedtuple('DamageDealt', ['attacker', 'defender', 'move', 'percen
 
 
 class Battle(ABC):
+    # whether the bot's search prunes, so the next turn is pondered the way the bot will search it
+    # None for a bot that does not search with `get_payoff_matrix`, which pondering does not help
+    search_prune = None
 
     def __init__(self, battle_tag):
         self.battle_tag = battle_tag
@@ -180,8 +183,9 @@ class Battle(ABC):
         for mon in self.opponent.reserve:
             opponent_reserve[mon.name] = TransposePokemon.from_state_pokemon_dict(mon.to_dict())
 
-        user = Side(user_active, user_reserve, copy(self.user.wish), copy(self.user.side_conditions))
-        opponent = Side(opponent_active, opponent_reserve, copy(self.opponent.wish), copy(self.opponent.side_conditions))
+        # defaultdict(int) can be pickled and sent to a search process, unlike the lambda used by the Battler
+        user = Side(user_active, user_reserve, copy(self.user.wish), defaultdict(int, self.user.side_conditions))
+        opponent = Side(opponent_active, opponent_reserve, copy(self.opponent.wish), defaultdict(int, self.opponent.side_conditions))
 
         state = State(user, opponent, self.weather, self.field, self.trick_room)
         return state
@@ -1,10 +1,12 @@
+import config
 from showdown.battle import Battle
 
 from ..helpers import format_decision
 
 from showdown.engine.objects import StateMutator
 from showdown.engine.select_best_move import pick_safest
-from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import iterative_deepening_payoff_matrix
+from showdown.engine.transposition_table import get_transposition_table
 
 from config import logger
 
@@ -12,6 +14,8 @@ from anytree import Node, RenderTree, PreOrderIter
 from random import shuffle, randint
 
 class BattleBot(Battle):
+    search_prune = False
+
     def __init__(self, *args, **kwargs):
         super(BattleBot, self).__init__(*args, **kwargs)
 
@@ -53,7 +57,9 @@ class BattleBot(Battle):
         user_options, opponent_options = battle.get_all_options()
         logger.debug("Attempting to find best move from: {}".format(mutator.state))
         #get the scores from the "safest" algorithm provided by the starter code
-        scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=False)
+        transposition_table = get_transposition_table()
+        scores, _ = iterative_deepening_payoff_matrix(mutator, user_options, opponent_options, config.search_depth, config.search_time_budget, prune=False, transposition_table=transposition_table)
+        logger.debug("Transposition table: {}".format(transposition_table))
 
         # Create tree using payoff matrix from "Safest" algorithm
         checked_moves = {}
@@ -0,0 +1,215 @@
+import math
+import random
+import time
+from collections import defaultdict
+
+import config
+import constants
+from showdown.battle import Battle
+from showdown.engine.find_state_instructions import get_all_state_instructions_cached
+from showdown.engine.objects import StateMutator
+from showdown.engine.parallel_search import gather_results
+from showdown.engine.parallel_search import get_executor
+from showdown.engine.parallel_search import submit
+from showdown.engine import profiler
+
+from ..helpers import format_decision
+
+from config import logger
+
+
+EXPLORATION = 1.4
+
+# evaluations are squashed into (-1, 1) so they are on the same scale as the exploration term
+# a won or lost battle is worth exactly 1 or -1
+VALUE_SCALE = 200
+
+
+def normalize_score(score):
+    return math.tanh(score / VALUE_SCALE)
+
+
+def evaluate_leaf(mutator):
+    winner = mutator.state.battle_is_finished()
+    if winner:
+        return float(winner)
+    return normalize_score(mutator.evaluation)
+
+
+class Node:
+    """A node of a decoupled-UCT search tree
+
+       Each player selects its own option using UCB on the statistics of that option alone
+       Values are always from the bot's perspective, so the opponent selects the option with the lowest value
+
+       Children are keyed by both player's options and the index of the random outcome that was sampled"""
+
+    def __init__(self, user_options, opponent_options):
+        self.user_options = user_options
+        self.opponent_options = opponent_options
+        self.visits = 0
+        self.user_visits = defaultdict(int)
+        self.user_values = defaultdict(float)
+        self.opponent_visits = defaultdict(int)
+        self.opponent_values = defaultdict(float)
+        self.transitions = dict()
+        self.children = dict()
+
+    def _select(self, options, visits, values, sign):
+        for option in options:
+            if not visits[option]:
+                return option
+
+        log_visits = math.log(self.visits)
+        return max(
+            options,
+            key=lambda o: sign * values[o] / visits[o] + EXPLORATION * math.sqrt(log_visits / visits[o])
+        )
+
+    def select_user_option(self):
+        return self._select(self.user_options, self.user_visits, self.user_values, 1)
+
+    def select_opponent_option(self):
+        return self._select(self.opponent_options, self.opponent_visits, self.opponent_values, -1)
+
+    def update(self, user_move, opponent_move, value):
+        self.user_visits[user_move] += 1
+        self.user_values[user_move] += value
+        self.opponent_visits[opponent_move] += 1
+        self.opponent_values[opponent_move] += value
+
+
+def _simulate(mutator, node, depth, rng):
+    winner = mutator.state.battle_is_finished()
+    if winner:
+        return float(winner)
+
+    # the opponent's active pokemon has fainted but it has unseen reserves
+    # there is nothing to search - see `get_payoff_matrix`
+    if depth <= 0 or (node.opponent_options == [constants.DO_NOTHING_MOVE] and mutator.state.opponent.active.hp == 0):
+        return normalize_score(mutator.evaluation)
+
+    node.visits += 1
+    user_move = node.select_user_option()
+    opponent_move = node.select_opponent_option()
+
+    try:
+        transitions = node.transitions[(user_move, opponent_move)]
+    except KeyError:
+        transitions = get_all_state_instructions_cached(mutator, user_move, opponent_move)
+        node.transitions[(user_move, opponent_move)] = transitions
+
+    index = rng.choices(range(len(transitions)), weights=[t.percentage for t in transitions])[0]
+    instructions = transitions[index].instructions
+
+    mutator.apply(instructions)
+    try:
+        child = node.children.get((user_move, opponent_move, index))
+        if child is None:
+            profiler.count('nodes')
+            profiler.count('leaves')
+            child = Node(*mutator.state.get_all_options())
+            node.children[(user_move, opponent_move, index)] = child
+            value = evaluate_leaf(mutator)
+        else:
+            value = _simulate(mutator, child, depth - 1, rng)
+    finally:
+        mutator.reverse(instructions)
+
+    node.update(user_move, opponent_move, value)
+    return value
+
+
+def monte_carlo_tree_search(state, user_options, opponent_options, iterations, time_budget, max_depth, seed=None):
+    """
+    Runs decoupled-UCT from `state` until `iterations` iterations are done or `time_budget` seconds have passed
+    Every iteration expands one node, so the cost of a search grows with its budget and not with `max_depth`
+
+    :param max_depth: the number of turns after which a state is evaluated instead of searched
+    :return: the number of times each of the bot's options was visited, and the number of iterations done
+    """
+    rng = random.Random(seed)
+    mutator = StateMutator(state)
+    root = Node(user_options, opponent_options)
+
+    deadline = time.time() + time_budget
+    completed_iterations = 0
+    while completed_iterations < iterations and time.time() < deadline:
+        _simulate(mutator, root, max_depth, rng)
+        completed_iterations += 1
+
+    return {option: root.user_visits[option] for option in user_options}, completed_iterations
+
+
+def search_states(searches, iterations, time_budget, max_depth):
+    """
+    Runs `monte_carlo_tree_search` for each (state, user_options, opponent_options) in `searches`
+
+    With worker processes available every state is searched by as many workers as there are to spare,
+    each using a different seed, and the visit counts of their roots are added together
+
+    :return: a list of (visit counts, iterations) in the same order as `searches`
+    """
+    if config.search_processes <= 1:
+        time_budget_per_search = time_budget / max(len(searches), 1)
+        return [
+            monte_carlo_tree_search(state, user_options, opponent_options, iterations, time_budget_per_search, max_depth)
+            for state, user_options, opponent_options in searches
+        ]
+
+    copies = max(1, config.search_processes // len(searches))
+    iterations_per_copy = math.ceil(iterations / copies)
+    time_budget_per_copy = time_budget * min(1, config.search_processes / (len(searches) * copies))
+
+    executor = get_executor()
+    futures = [
+        submit(executor, monte_carlo_tree_search, state, user_options, opponent_options, iterations_per_copy, time_budget_per_copy, max_depth, seed)
+        for state, user_options, opponent_options in searches
+        for seed in range(copies)
+    ]
+    results = gather_results(futures)
+
+    merged_results = list()
+    for i in range(len(searches)):
+        visits = defaultdict(int)
+        completed_iterations = 0
+        for copy_visits, copy_iterations in results[i*copies:(i+1)*copies]:
+            for option, count in copy_visits.items():
+                visits[option] += count
+            completed_iterations += copy_iterations
+        merged_results.append((dict(visits), completed_iterations))
+
+    return merged_results
+
+
+def pick_most_visited_move(results):
+    # every battle has an equal say, regardless of how many iterations its search completed
+    option_weights = defaultdict(float)
+    for visits, completed_iterations in results:
+        for option, count in visits.items():
+            option_weights[option] += count / max(completed_iterations, 1)
+
+    return max(option_weights, key=option_weights.get)
+
+
+class BattleBot(Battle):
+    def __init__(self, *args, **kwargs):
+        super(BattleBot, self).__init__(*args, **kwargs)
+
+    def find_best_move(self):
+        battles = self.prepare_battles(join_moves_together=True)
+
+        searches = list()
+        for b in battles:
+            state = b.create_state()
+            user_options, opponent_options = b.get_all_options()
+            logger.debug("Attempting to find best move from: {}".format(state))
+            searches.append((state, user_options, opponent_options))
+
+        results = search_states(searches, config.mcts_iterations, config.search_time_budget, config.search_depth)
+        for visits, completed_iterations in results:
+            logger.debug("Completed {} iterations: {}".format(completed_iterations, visits))
+
+        decision = pick_most_visited_move(results)
+        logger.debug("Most visited: {}".format(decision))
+        return format_decision(self, decision)
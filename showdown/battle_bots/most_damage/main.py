@@ -1,7 +1,10 @@
+import numpy as np
+
 import constants
 from data import all_move_json
 from showdown.battle import Battle
-from showdown.engine.damage_calculator import calculate_damage
+from showdown.engine.damage_calculator import prepare_damage_calculation
+from showdown.engine.batch_damage_calculator import calculate_damage_rolls
 from showdown.engine.find_state_instructions import update_attacking_move
 from ..helpers import format_decision
 
@@ -25,15 +28,13 @@ class BattleBot(Battle):
         if self.force_switch or not moves:
             return format_decision(self, switches[0])
 
-        most_damage = -1
-        choice = None
+        attacking_moves = []
         for move in moves:
-            damage_amounts = calculate_damage(state, constants.SELF, move, constants.DO_NOTHING_MOVE)
-
-            damage = damage_amounts[0] if damage_amounts else 0
+            attacker, defender, attacking_move, conditions = prepare_damage_calculation(state, constants.SELF, move, constants.DO_NOTHING_MOVE)
+            attacking_moves.append(attacking_move)
 
-            if damage > most_damage:
-                choice = move
-                most_damage = damage
+        # moves that do no damage are nan
+        damage = np.nan_to_num(calculate_damage_rolls([attacker], [defender], attacking_moves, conditions=conditions, calc_type='average')[0, :, 0, 0])
 
+        choice = moves[int(np.argmax(damage))]
         return format_decision(self, choice)
@@ -9,9 +9,9 @@ from nashpy import Game
 import config
 from showdown.battle import Battle
 from showdown.engine.select_best_move import remove_guaranteed_opponent_moves
-from showdown.engine.objects import StateMutator
 from showdown.engine.select_best_move import pick_safest
-from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.parallel_search import search_states
+from showdown.engine.transposition_table import get_transposition_table
 
 from ..safest.main import pick_safest_move_from_battles
 from ..helpers import format_decision
@@ -171,6 +171,8 @@ def pick_move_in_equilibrium_from_multiple_score_lookups(score_lookups):
 
 
 class BattleBot(Battle):
+    search_prune = False
+
     def __init__(self, *args, **kwargs):
         super(BattleBot, self).__init__(*args, **kwargs)
 
@@ -181,14 +183,16 @@ class BattleBot(Battle):
             battles = self.prepare_battles(join_moves_together=True)
             decision = pick_safest_move_from_battles(battles)
         else:
-            list_of_payoffs = list()
+            searches = list()
             for b in battles:
                 state = b.create_state()
-                mutator = StateMutator(state)
-                logger.debug("Attempting to find best move from: {}".format(mutator.state))
+                logger.debug("Attempting to find best move from: {}".format(state))
                 user_options, opponent_options = b.get_all_options()
-                scores = get_payoff_matrix(mutator, user_options, opponent_options, prune=False)
-                list_of_payoffs.append(scores)
+                searches.append((state, user_options, opponent_options))
+
+            results = search_states(searches, config.search_depth, config.search_time_budget, prune=False)
+            logger.debug("Transposition table: {}".format(get_transposition_table()))
+            list_of_payoffs = [scores for scores, _ in results]
 
             decision = pick_move_in_equilibrium_from_multiple_score_lookups(list_of_payoffs)
 
@@ -1,10 +1,15 @@
+import config
 from showdown.battle import Battle
 
 from ..helpers import format_decision
 
-from showdown.engine.objects import StateMutator
 from showdown.engine.select_best_move import pick_safest
-from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.parallel_search import search_states
+from showdown.engine.move_ordering import get_move_orderer
+from showdown.engine.find_state_instructions import get_state_instruction_cache
+from showdown.engine.find_state_instructions import get_chance_pruning_stats
+from showdown.engine.damage_calculator import get_damage_calculation_cache
+from showdown.engine.transposition_table import get_transposition_table
 
 from config import logger
 
@@ -20,14 +25,22 @@ def prefix_opponent_move(score_lookup, prefix):
 
 
 def pick_safest_move_from_battles(battles):
-    all_scores = dict()
-    for i, b in enumerate(battles):
+    searches = list()
+    for b in battles:
         state = b.create_state()
-        mutator = StateMutator(state)
         user_options, opponent_options = b.get_all_options()
-        logger.debug("Attempting to find best move from: {}".format(mutator.state))
-        scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=True)
+        logger.debug("Attempting to find best move from: {}".format(state))
+        searches.append((state, user_options, opponent_options))
+
+    results = search_states(searches, config.search_depth, config.search_time_budget, prune=True)
+    logger.debug("Transposition table: {}".format(get_transposition_table()))
+    logger.debug("Move orderer: {}".format(get_move_orderer()))
+    logger.debug("State instruction cache: {}".format(get_state_instruction_cache()))
+    logger.debug("Chance pruning: {}".format(get_chance_pruning_stats()))
+    logger.debug("Damage calculation cache: {}, hit rate: {:.2f}".format(get_damage_calculation_cache(), get_damage_calculation_cache().hit_rate))
 
+    all_scores = dict()
+    for i, (scores, _) in enumerate(results):
         prefixed_scores = prefix_opponent_move(scores, str(i))
         all_scores = {**all_scores, **prefixed_scores}
 
@@ -38,6 +51,8 @@ def pick_safest_move_from_battles(battles):
 
 
 class BattleBot(Battle):
+    search_prune = True
+
     def __init__(self, *args, **kwargs):
         super(BattleBot, self).__init__(*args, **kwargs)
 
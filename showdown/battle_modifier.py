@@ -1,6 +1,8 @@
 import json
 from copy import deepcopy
 
+import numpy as np
+
 import constants
 from config import logger
 from data import all_move_json
@@ -12,7 +14,8 @@ from showdown.helpers import normalize_name
 from showdown.helpers import get_pokemon_info_from_condition
 from showdown.helpers import calculate_stats
 from showdown.engine.find_state_instructions import get_effective_speed
-from showdown.engine.damage_calculator import calculate_damage
+from showdown.engine.damage_calculator import prepare_damage_calculation
+from showdown.engine.batch_damage_calculator import calculate_damage_rolls
 
 
 def find_pokemon_in_reserves(pkmn_name, reserves):
@@ -666,11 +669,14 @@ def check_choice_band_or_specs(battle, damage_dealt):
     if battle.battle_type == constants.RANDOM_BATTLE:
         spread = 'serious', '85,85,85,85,85,85'
 
-    max_damage = float('-inf')
     potential_battles = battle.prepare_battles(guess_mega_evo_opponent=False, join_moves_together=True)
 
     battle_copy = deepcopy(battle)
     battle_copy.user.from_json(battle.request_json)
+    attackers = []
+    attacking_moves = []
+    defender = None
+    conditions = None
     for b in potential_battles:
         if b.opponent.active.item != choice_item:
             b.opponent.active.set_spread(*spread)
@@ -678,12 +684,19 @@ def check_choice_band_or_specs(battle, damage_dealt):
 
             state = b.create_state()
 
-            damage = calculate_damage(state, constants.OPPONENT, damage_dealt.move, battle.user.last_used_move.move, calc_type='max')[0]
-            max_damage = max(max_damage, damage)
+            # every potential battle has the same bot's pokemon and conditions - only the opponent's set is different
+            attacker, defender, attacking_move, conditions = prepare_damage_calculation(state, constants.OPPONENT, damage_dealt.move, battle.user.last_used_move.move)
+            attackers.append(attacker)
+            attacking_moves.append([attacking_move])
 
     # dont infer if we did not find a damage amount
-    if max_damage == float('-inf'):
+    if not attackers:
+        return
+
+    damage_rolls = calculate_damage_rolls(attackers, [defender], attacking_moves, conditions=conditions, calc_type='max')
+    if np.isnan(damage_rolls).all():
         return
+    max_damage = np.nanmax(damage_rolls)
 
     if (damage_dealt.percent_damage * battle.user.active.max_hp) > (max_damage * 1.2):  # multiply to avoid rounding errors
         logger.debug("{} has {}".format(battle.opponent.active.name, choice_item))
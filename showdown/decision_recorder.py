@@ -0,0 +1,168 @@
+import gzip
+import importlib
+import os
+import pickle
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from copy import deepcopy
+
+import config
+import data
+from config import logger
+from data.helpers import get_pokemon_sets
+from data.helpers import get_mega_pkmn_name
+from showdown.engine.evaluate import Scoring
+from showdown.engine.move_ordering import MoveOrderer
+from showdown.engine.parallel_search import shutdown_executor
+from showdown.engine.transposition_table import LRUCache
+from showdown.engine.transposition_table import TranspositionTable
+from showdown.engine.transposition_table import private_caches
+
+
+RECORD_VERSION = 1
+RECORD_EXTENSION = ".decision.gz"
+
+# the config values that can change the decision a bot makes
+RECORDED_CONFIG = [
+    'pokemon_mode',
+    'use_relative_weights',
+    'gambit_exe_path',
+    'damage_calc_type',
+    'damage_roll_bucket_size',
+    'search_depth',
+    'search_time_budget',
+    'search_processes',
+    'merge_identical_states',
+    'chance_pruning_epsilon',
+    'chance_pruning_top_k',
+    'mcts_iterations',
+]
+
+
+def _picklable_battle(battle):
+    # the side-conditions and boosts of a battle are defaultdicts with lambdas, which cannot be pickled
+    # a defaultdict(int) behaves the same and keeps the record readable by any python version
+    battle = deepcopy(battle)
+    for battler in (battle.user, battle.opponent):
+        battler.side_conditions = defaultdict(int, battler.side_conditions)
+        for pkmn in [battler.active, *battler.reserve]:
+            if pkmn is not None:
+                pkmn.boosts = defaultdict(int, pkmn.boosts)
+    return battle
+
+
+def _opponent_pokemon_sets(battle):
+    # only the sets of the opponent's pokemon are used to make a decision, so the rest are not recorded
+    pokemon_sets = dict()
+    for pkmn in [battle.opponent.active, *battle.opponent.reserve]:
+        if pkmn is None:
+            continue
+        for name in filter(None, (pkmn.name, get_mega_pkmn_name(pkmn.name))):
+            try:
+                pokemon_sets[name] = get_pokemon_sets(name)
+            except KeyError:
+                pass
+    return pokemon_sets
+
+
+def snapshot_decision(battle):
+    """Returns everything a bot's `find_best_move` depends on, so the decision can be made again later
+
+       This must be taken before the decision is made, as a bot may change the battle while deciding"""
+    return {
+        'version': RECORD_VERSION,
+        'bot': config.battle_bot_module,
+        'battle': _picklable_battle(battle),
+        'options': battle.get_all_options(),
+        'config': {name: getattr(config, name) for name in RECORDED_CONFIG},
+        'pokemon_alive_static': Scoring.POKEMON_ALIVE_STATIC,
+        'pokemon_sets': _opponent_pokemon_sets(battle),
+    }
+
+
+def get_decision_directory(battle_tag):
+    return os.path.join(config.decision_directory, battle_tag)
+
+
+def record_decision(snapshot, decision, seconds):
+    """Writes the snapshot with the decision that was made to the next file in the battle's directory
+
+       A decision that cannot be recorded is logged rather than raised so the battle can continue"""
+    record = dict(snapshot, decision=decision, seconds=seconds)
+    directory = get_decision_directory(snapshot['battle'].battle_tag)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        turn = sum(1 for f in os.listdir(directory) if f.endswith(RECORD_EXTENSION))
+        file_name = os.path.join(directory, "{:04d}{}".format(turn, RECORD_EXTENSION))
+        with gzip.open(file_name, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.warning("Could not record the decision: {}".format(e))
+        return None
+
+    logger.debug("Recorded the decision in {}".format(file_name))
+    return file_name
+
+
+def load_decision(file_name):
+    with gzip.open(file_name, 'rb') as f:
+        record = pickle.load(f)
+    if record.get('version') != RECORD_VERSION:
+        raise ValueError("{} is a version {} record, expected version {}".format(file_name, record.get('version'), RECORD_VERSION))
+    return record
+
+
+def _empty_caches():
+    # the sizes are read after the recorded config is set
+    return {
+        'transposition_table': TranspositionTable(config.transposition_table_size),
+        'move_orderer': MoveOrderer(),
+        'state_instruction_cache': LRUCache(config.state_instruction_cache_size),
+        'damage_calculation_cache': LRUCache(config.damage_calculation_cache_size),
+    }
+
+
+@contextmanager
+def recorded_environment(record, config_overrides=None):
+    """Sets the config, scoring and pokemon sets that the recorded decision was made with
+
+       The engine's caches start empty, so what was searched before does not change the decision.
+       Everything is restored afterwards. The data modifications for the pokemon mode are not applied,
+       as they cannot be undone"""
+    recorded_config = dict(record['config'], **(config_overrides or {}))
+    original_config = {name: getattr(config, name) for name in recorded_config}
+    original_pokemon_alive_static = Scoring.POKEMON_ALIVE_STATIC
+    original_pokemon_sets = data.pokemon_sets
+
+    for name, value in recorded_config.items():
+        setattr(config, name, value)
+    Scoring.POKEMON_ALIVE_STATIC = record['pokemon_alive_static']
+    data.pokemon_sets = record['pokemon_sets']
+    try:
+        with private_caches(**_empty_caches()):
+            yield
+    finally:
+        # the search processes keep caches of their own, and were started with this record's settings
+        shutdown_executor()
+        for name, value in original_config.items():
+            setattr(config, name, value)
+        Scoring.POKEMON_ALIVE_STATIC = original_pokemon_alive_static
+        data.pokemon_sets = original_pokemon_sets
+
+
+def replay_decision(record, battle_bot_module=None, config_overrides=None):
+    """Makes the recorded decision again, returning the decision and the seconds it took
+
+       The decision is made by `battle_bot_module` if it is given, otherwise by the bot that was recorded"""
+    battle_module = importlib.import_module('showdown.battle_bots.{}.main'.format(battle_bot_module or record['bot']))
+    recorded_battle = deepcopy(record['battle'])
+    battle = battle_module.BattleBot(recorded_battle.battle_tag)
+    battle.__dict__.update(recorded_battle.__dict__)
+
+    with recorded_environment(record, config_overrides):
+        start = time.perf_counter()
+        decision = battle.find_best_move()
+        seconds = time.perf_counter() - start
+
+    return decision, seconds
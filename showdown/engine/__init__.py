@@ -7,6 +7,7 @@ from .objects import (
 )
 
 from .find_state_instructions import get_all_state_instructions
+from .find_state_instructions import get_all_state_instructions_cached
 from .damage_calculator import calculate_damage
 
 __all__ = [
@@ -16,5 +17,6 @@ __all__ = [
     'StateMutator',
     'TransposeInstruction',
     'get_all_state_instructions',
+    'get_all_state_instructions_cached',
     'calculate_damage'
 ]
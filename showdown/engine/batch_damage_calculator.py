@@ -0,0 +1,239 @@
+import numpy as np
+
+import constants
+
+from . import damage_calculator
+from .damage_calculator import get_move
+from .damage_calculator import pokemon_type_indicies
+from .damage_calculator import damage_multipication_array
+from .damage_calculator import SPECIAL_LOGIC_MOVES
+
+
+DAMAGE_MULTIPLICATION_ARRAY = np.array(damage_multipication_array, dtype=np.float64)
+
+# the modifier of an attacking type against every dual typing: (attacking type, first type, second type)
+# a single typing is padded with 'typeless', which is neutral against every type
+DUAL_TYPE_EFFECTIVENESS_ARRAY = DAMAGE_MULTIPLICATION_ARRAY[:, :, None] * DAMAGE_MULTIPLICATION_ARRAY[:, None, :]
+
+TYPELESS = pokemon_type_indicies['typeless']
+FLYING = pokemon_type_indicies['flying']
+GROUND = pokemon_type_indicies['ground']
+FIRE = pokemon_type_indicies['fire']
+WATER = pokemon_type_indicies['water']
+GRASS = pokemon_type_indicies['grass']
+ELECTRIC = pokemon_type_indicies['electric']
+PSYCHIC = pokemon_type_indicies['psychic']
+DRAGON = pokemon_type_indicies['dragon']
+
+# the same multipliers used by `get_damage_rolls`
+ROLL_MULTIPLIERS = {
+    'average': np.array([0.925]),
+    'max': np.array([1.0]),
+    'min_max': np.array([0.85, 1.0]),
+    'min_max_average': np.array([0.85, 0.925, 1.0]),
+    'all': np.array([0.85, 0.86, 0.87, 0.88, 0.89, 0.90, 0.91, 0.92, 0.93, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99, 1.0]),
+}
+
+
+def _type_indices(pokemon, pad):
+    # every pokemon's types are padded to the same length
+    # 'typeless' is neutral against every type so it can pad a defender's types
+    number_of_types = max(len(p.type_ids) for p in pokemon)
+    indices = np.full((len(pokemon), number_of_types), pad, dtype=np.int64)
+    for i, p in enumerate(pokemon):
+        indices[i, :len(p.type_ids)] = p.type_ids
+    return indices
+
+
+def type_effectiveness_modifiers(attacking_type_ids, defending_type_ids):
+    """
+    A vectorized `type_id_effectiveness_modifier`
+
+    :param attacking_type_ids: an integer ndarray of attacking types
+    :param defending_type_ids: an integer ndarray with one more dimension than `attacking_type_ids`
+                               holding the defending types, padded with 'typeless'
+    :return: a float ndarray of the modifiers, broadcast from both arguments
+    """
+    if defending_type_ids.shape[-1] == 1:
+        return DAMAGE_MULTIPLICATION_ARRAY[attacking_type_ids, defending_type_ids[..., 0]]
+    if defending_type_ids.shape[-1] == 2:
+        return DUAL_TYPE_EFFECTIVENESS_ARRAY[attacking_type_ids, defending_type_ids[..., 0], defending_type_ids[..., 1]]
+
+    type_multipliers = DAMAGE_MULTIPLICATION_ARRAY[attacking_type_ids[..., None], defending_type_ids]
+    modifier = np.ones(type_multipliers.shape[:-1])
+    for i in range(type_multipliers.shape[-1]):
+        modifier = modifier * type_multipliers[..., i]
+    return modifier
+
+
+def _move_table(attackers, moves):
+    # `moves` is either a list of moves used by every attacker, or a list of moves for each attacker
+    if moves and isinstance(moves[0], (list, tuple)):
+        if len(moves) != len(attackers):
+            raise ValueError("Expected a list of moves for each of the {} attackers, got {}".format(len(attackers), len(moves)))
+        move_lists = moves
+    else:
+        move_lists = [moves] * len(attackers)
+
+    table = list()
+    for move_list in move_lists:
+        row = list()
+        for move in move_list:
+            attacking_move = get_move(move)
+            if attacking_move is None:
+                raise TypeError("Invalid move: {}".format(move))
+            row.append(attacking_move)
+        table.append(row)
+
+    if len(set(len(row) for row in table)) > 1:
+        raise ValueError("Every attacker must have the same number of moves")
+
+    return table
+
+
+def calculate_damage_rolls(attackers, defenders, moves, conditions=None, calc_type='all'):
+    """
+    A batched `_calculate_damage` that calculates every (attacker, move, defender) combination in one numpy pass
+
+    The rolls are the same as `_calculate_damage` gives, except that they are in increasing order and not de-duplicated
+    Moves that do no damage, such as status moves, give nan for every roll
+
+    :param attackers: a list of A Pokemon objects
+    :param defenders: a list of D Pokemon objects
+    :param moves: a list of M move names or dictionaries used by every attacker, or a list of M moves for each attacker
+                  dictionaries are assumed to already account for move/item/ability special-effects
+    :param conditions: the same conditions dictionary given to `_calculate_damage`
+    :return: a float ndarray of shape (A, M, D, R) where R is the number of rolls for `calc_type`
+    """
+    try:
+        roll_multipliers = ROLL_MULTIPLIERS[calc_type]
+    except KeyError:
+        raise ValueError("{} is not one of {}".format(calc_type, list(ROLL_MULTIPLIERS)))
+
+    if conditions is None:
+        conditions = {}
+    weather = conditions.get(constants.WEATHER)
+    terrain = conditions.get(constants.TERRAIN)
+
+    move_table = _move_table(attackers, moves)
+    number_of_moves = len(move_table[0]) if move_table else 0
+    if not attackers or not defenders or not number_of_moves:
+        return np.empty((len(attackers), number_of_moves, len(defenders), len(roll_multipliers)))
+
+    # attacker arrays have the shape (A, 1, 1)
+    def attacker_array(f, dtype=np.float64):
+        return np.array([f(p) for p in attackers], dtype=dtype)[:, None, None]
+
+    # defender arrays have the shape (1, 1, D)
+    def defender_array(f, dtype=np.float64):
+        return np.array([f(p) for p in defenders], dtype=dtype)[None, None, :]
+
+    # move arrays have the shape (A, M, 1)
+    def move_array(f, dtype=np.float64):
+        return np.array([[f(m) for m in row] for row in move_table], dtype=dtype)[:, :, None]
+
+    attacking_stats = [p.calculate_boosted_stats() for p in attackers]
+    defending_stats = [p.calculate_boosted_stats() for p in defenders]
+
+    level = attacker_array(lambda p: p.level)
+    boosted_attack = np.array([s[constants.ATTACK] for s in attacking_stats], dtype=np.float64)[:, None, None]
+    boosted_special_attack = np.array([s[constants.SPECIAL_ATTACK] for s in attacking_stats], dtype=np.float64)[:, None, None]
+    raw_attack = attacker_array(lambda p: p.attack)
+    attacker_unaware = attacker_array(lambda p: p.ability == 'unaware', bool)
+    attacker_infiltrator = attacker_array(lambda p: p.ability == 'infiltrator', bool)
+    attacker_burned = attacker_array(lambda p: p.status == constants.BURN, bool)
+    attacker_flashfire = attacker_array(lambda p: 'flashfire' in p.volatile_status, bool)
+    attacker_grounded = attacker_array(lambda p: p.is_grounded(), bool)
+    attacker_types = _type_indices(attackers, -1)[:, None, None, :]
+
+    boosted_defense = np.array([s[constants.DEFENSE] for s in defending_stats], dtype=np.float64)[None, None, :]
+    boosted_special_defense = np.array([s[constants.SPECIAL_DEFENSE] for s in defending_stats], dtype=np.float64)[None, None, :]
+    raw_defense = defender_array(lambda p: p.defense)
+    raw_special_defense = defender_array(lambda p: p.special_defense)
+    defender_unaware = defender_array(lambda p: p.ability == 'unaware', bool)
+    defender_magnetrise = defender_array(lambda p: 'magnetrise' in p.volatile_status, bool)
+    defender_tarshot = defender_array(lambda p: 'tarshot' in p.volatile_status, bool)
+    defender_roost = defender_array(lambda p: constants.ROOST in p.volatile_status, bool)
+    defender_rock = defender_array(lambda p: 'rock' in p.types, bool)
+    defender_grounded = defender_array(lambda p: p.is_grounded(), bool)
+    defender_types = _type_indices(defenders, TYPELESS)[None, None, :, :]
+
+    category = move_array(lambda m: m.get(constants.CATEGORY), object)
+    physical = category == constants.PHYSICAL
+    special = category == constants.SPECIAL
+    base_power = move_array(lambda m: m[constants.BASE_POWER] if m.get(constants.CATEGORY) in constants.DAMAGING_CATEGORIES else 0)
+    move_type = move_array(lambda m: pokemon_type_indicies[m[constants.TYPE]], np.int64)
+    priority = move_array(lambda m: m.get(constants.PRIORITY, 0))
+    thousand_arrows = move_array(lambda m: m[constants.ID] == 'thousandarrows', bool)
+    earthquake = move_array(lambda m: m[constants.ID] == 'earthquake', bool)
+
+    # attacking and defending stats
+    attack = np.where(physical, boosted_attack, boosted_special_attack)
+    attack = np.where(defender_unaware & physical, raw_attack, attack)
+    defense = np.where(attacker_unaware, raw_defense, boosted_defense)
+    special_defense = np.where(attacker_unaware, raw_special_defense, boosted_special_defense)
+    if weather == constants.SAND:
+        special_defense = np.where(defender_rock, np.floor(special_defense * 1.5), special_defense)
+    defense = np.where(physical, defense, special_defense)
+
+    # type effectiveness, ignoring the flying type for thousand arrows and grounded moves against roost
+    ignore_flying = (thousand_arrows | ((move_type == GROUND) & defender_roost))[..., None]
+    defending_types = np.where(ignore_flying & (defender_types == FLYING), TYPELESS, defender_types)
+    type_modifier = type_effectiveness_modifiers(move_type, defending_types)
+
+    if weather == constants.SUN:
+        weather_modifier = np.where(move_type == FIRE, 1.5, 1)
+    elif weather == constants.RAIN:
+        weather_modifier = np.where(move_type == WATER, 1.5, 1)
+    elif weather == constants.DESOLATE_LAND:
+        weather_modifier = np.where(move_type == WATER, 0, 1)
+    else:
+        weather_modifier = np.ones(move_type.shape)
+
+    stab_modifier = np.where((attacker_types == move_type[..., None]).any(axis=-1), 1.5, 1)
+    burn_modifier = np.where(attacker_burned & physical, 0.5, 1)
+
+    terrain_boost = damage_calculator.TERRAIN_DAMAGE_BOOST
+    terrain_modifier = np.select(
+        [
+            (terrain == constants.ELECTRIC_TERRAIN) & (move_type == ELECTRIC) & attacker_grounded,
+            (terrain == constants.GRASSY_TERRAIN) & (move_type == GRASS) & attacker_grounded,
+            (terrain == constants.GRASSY_TERRAIN) & earthquake,
+            (terrain == constants.MISTY_TERRAIN) & (move_type == DRAGON) & defender_grounded,
+            (terrain == constants.PSYCHIC_TERRAIN) & (move_type == PSYCHIC) & attacker_grounded,
+            (terrain == constants.PSYCHIC_TERRAIN) & (priority > 0),
+        ],
+        [terrain_boost, terrain_boost, 0.5, 0.5, terrain_boost, 0],
+        default=1
+    )
+
+    volatile_status_modifier = np.where(defender_magnetrise & (move_type == GROUND), 0, 1)
+    volatile_status_modifier = volatile_status_modifier * np.where(attacker_flashfire & (move_type == FIRE), 1.5, 1)
+    volatile_status_modifier = volatile_status_modifier * np.where(defender_tarshot & (move_type == FIRE), 2, 1)
+
+    # multiplied in the same order as `calculate_modifier` so the floating-point results are identical
+    modifier = type_modifier * weather_modifier * stab_modifier * burn_modifier * terrain_modifier * volatile_status_modifier
+    screens = ~attacker_infiltrator
+    modifier = modifier * np.where(screens & bool(conditions.get(constants.LIGHT_SCREEN)) & special, 0.5, 1)
+    modifier = modifier * np.where(screens & bool(conditions.get(constants.REFLECT)) & physical, 0.5, 1)
+    modifier = modifier * np.where(screens & bool(conditions.get(constants.AURORA_VEIL)), 0.5, 1)
+
+    damage = (np.floor(2 * level / 5) + 2) * base_power
+    damage = np.floor(damage * attack / defense)
+    damage = np.floor(damage / 50) + 2
+    damage = damage * modifier
+
+    rolls = np.floor(damage[..., None] * roll_multipliers)
+
+    rolls[~np.broadcast_to(physical | special, rolls.shape[:-1])] = np.nan
+    rolls[np.broadcast_to(base_power == 0, rolls.shape[:-1]) & ~np.isnan(rolls[..., 0])] = 0
+
+    # special-logic moves depend on each pokemon's hp, so they are calculated one at a time
+    for a, row in enumerate(move_table):
+        for m, attacking_move in enumerate(row):
+            if attacking_move.get(constants.CATEGORY) in constants.DAMAGING_CATEGORIES and attacking_move[constants.ID] in SPECIAL_LOGIC_MOVES:
+                for d, defender in enumerate(defenders):
+                    damage_amounts = SPECIAL_LOGIC_MOVES[attacking_move[constants.ID]](attackers[a], defender)
+                    rolls[a, m, d] = np.nan if damage_amounts is None else damage_amounts[0]
+
+    return rolls
@@ -0,0 +1,176 @@
+import numpy as np
+
+import constants
+
+from .evaluate import Scoring
+
+
+MAX_POKEMON = 6
+
+# the order in which `evaluate_pokemon` adds each boost
+BOOSTS = [
+    constants.ATTACK,
+    constants.DEFENSE,
+    constants.SPECIAL_ATTACK,
+    constants.SPECIAL_DEFENSE,
+    constants.SPEED,
+    constants.ACCURACY,
+    constants.EVASION,
+]
+
+# status code 0 is no status
+STATUSES = [None, constants.BURN] + [s for s in Scoring.POKEMON_STATIC_STATUSES if s is not None]
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+BURN_CODE = STATUS_CODES[constants.BURN]
+
+VOLATILE_STATUSES = list(Scoring.POKEMON_VOLATILE_STATUSES)
+SIDE_CONDITIONS = list(Scoring.STATIC_SCORED_SIDE_CONDITIONS) + list(Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS)
+
+
+class LeafFeatures:
+    """The parts of a batch of states that `evaluate` scores, as arrays with one row per state
+
+       Pokemon are indexed by (state, side, slot), where side 0 is the bot, side 1 is the opponent,
+       and slot 0 is the active pokemon. Slots without a pokemon have `present` set to False.
+       The arrays hold no scores, so the same features can be scored with different `Scoring` weights"""
+
+    def __init__(self, number_of_states):
+        shape = (number_of_states, 2, MAX_POKEMON)
+        self.present = np.zeros(shape, dtype=bool)
+        self.hp = np.zeros(shape, dtype=np.float64)
+        self.maxhp = np.ones(shape, dtype=np.float64)
+        self.boosts = np.zeros(shape + (len(BOOSTS),), dtype=np.int8)
+        self.status = np.zeros(shape, dtype=np.int8)
+        self.burn_multiplier = np.zeros(shape, dtype=np.int8)
+        self.volatile_status = np.zeros(shape + (len(VOLATILE_STATUSES),), dtype=bool)
+        self.side_conditions = np.zeros((number_of_states, 2, len(SIDE_CONDITIONS)), dtype=np.int16)
+        self.unrevealed_opponents = np.zeros(number_of_states, dtype=np.int8)
+
+    @classmethod
+    def from_states(cls, states):
+        collector = LeafFeatureCollector()
+        for state in states:
+            collector.append(state)
+        return collector.to_features()
+
+    def __len__(self):
+        return len(self.present)
+
+
+class LeafFeatureCollector:
+    """Reads the features of states one at a time, so a state can be changed after it has been added
+
+       The features are kept in lists until `to_features` builds the arrays, which is much faster
+       than writing each value into an array"""
+
+    def __init__(self):
+        self.number_of_states = 0
+        self.positions = []
+        self.pokemon = []
+        self.side_conditions = []
+        self.unrevealed_opponents = []
+
+    def append(self, state):
+        state_offset = self.number_of_states * 2 * MAX_POKEMON
+        for side_index, side in enumerate((state.self, state.opponent)):
+            if len(side.reserve) >= MAX_POKEMON:
+                raise ValueError("A side can have at most {} pokemon".format(MAX_POKEMON))
+
+            side_offset = state_offset + side_index * MAX_POKEMON
+            for slot, pkmn in enumerate([side.active, *side.reserve.values()]):
+                self.positions.append(side_offset + slot)
+                self.pokemon.append((
+                    pkmn.hp,
+                    pkmn.maxhp,
+                    pkmn.attack_boost,
+                    pkmn.defense_boost,
+                    pkmn.special_attack_boost,
+                    pkmn.special_defense_boost,
+                    pkmn.speed_boost,
+                    pkmn.accuracy_boost,
+                    pkmn.evasion_boost,
+                    # `evaluate_pokemon` scores any status it does not know as a burn
+                    STATUS_CODES.get(pkmn.status, BURN_CODE),
+                    pkmn.burn_multiplier,
+                    *[v in pkmn.volatile_status for v in VOLATILE_STATUSES]
+                ))
+
+            side_conditions = side.side_conditions
+            self.side_conditions.append([side_conditions.get(c, 0) for c in SIDE_CONDITIONS])
+
+        self.unrevealed_opponents.append(6 - (len(state.opponent.reserve) + 1))
+        self.number_of_states += 1
+
+    def to_features(self):
+        features = LeafFeatures(self.number_of_states)
+        if not self.number_of_states:
+            return features
+
+        positions = np.array(self.positions, dtype=np.int64)
+        pokemon = np.array(self.pokemon, dtype=np.float64)
+        number_of_boosts = len(BOOSTS)
+
+        features.present.reshape(-1)[positions] = True
+        features.hp.reshape(-1)[positions] = pokemon[:, 0]
+        features.maxhp.reshape(-1)[positions] = pokemon[:, 1]
+        features.boosts.reshape(-1, number_of_boosts)[positions] = pokemon[:, 2:2 + number_of_boosts]
+        features.status.reshape(-1)[positions] = pokemon[:, 2 + number_of_boosts]
+        features.burn_multiplier.reshape(-1)[positions] = pokemon[:, 3 + number_of_boosts]
+        features.volatile_status.reshape(-1, len(VOLATILE_STATUSES))[positions] = pokemon[:, 4 + number_of_boosts:]
+        features.side_conditions[:] = np.array(self.side_conditions, dtype=np.int16).reshape(self.number_of_states, 2, -1)
+        features.unrevealed_opponents[:] = self.unrevealed_opponents
+        return features
+
+    def __len__(self):
+        return self.number_of_states
+
+
+def evaluate_pokemon_features(features, scoring=Scoring):
+    """A vectorized `evaluate_pokemon`: the score of every pokemon, with the shape (states, 2, MAX_POKEMON)"""
+    # the terms are added in the same order as `evaluate_pokemon` so the result is rounded the same way
+    score = scoring.POKEMON_ALIVE_STATIC + scoring.POKEMON_HP * (features.hp / features.maxhp)
+    for i, stat in enumerate(BOOSTS):
+        boost_scores = np.array(
+            [scoring.POKEMON_BOOST_DIMINISHING_RETURNS[b] * scoring.POKEMON_BOOSTS[stat] for b in range(-6, 7)],
+            dtype=np.float64
+        )
+        score = score + boost_scores[features.boosts[..., i].astype(np.int64) + 6]
+
+    status_scores = np.array(
+        [scoring.POKEMON_STATIC_STATUSES.get(s, 0) for s in STATUSES],
+        dtype=np.float64
+    )
+    status_score = np.where(
+        features.status == BURN_CODE,
+        scoring.BURN(features.burn_multiplier.astype(np.float64)),
+        status_scores[features.status.astype(np.int64)]
+    )
+    score = score + status_score
+
+    volatile_status_scores = np.array([scoring.POKEMON_VOLATILE_STATUSES[v] for v in VOLATILE_STATUSES], dtype=np.float64)
+    score = score + features.volatile_status @ volatile_status_scores
+
+    # np.round rounds halves to even, the same as `round`
+    score = np.round(score)
+    return np.where(features.present & (features.hp > 0), score, 0).astype(np.int64)
+
+
+def evaluate_features(features, scoring=Scoring):
+    """A vectorized `evaluate`: the score of every state in `features`, as an integer ndarray"""
+    pokemon_scores = evaluate_pokemon_features(features, scoring).sum(axis=2)
+
+    alive_reserves = (features.present[..., 1:] & (features.hp[..., 1:] > 0)).sum(axis=2)
+    alive_reserves[:, 1] += features.unrevealed_opponents
+
+    static_weights = np.array([scoring.STATIC_SCORED_SIDE_CONDITIONS.get(c, 0) for c in SIDE_CONDITIONS], dtype=np.int64)
+    count_weights = np.array([scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS.get(c, 0) for c in SIDE_CONDITIONS], dtype=np.int64)
+    side_conditions = features.side_conditions.astype(np.int64)
+    side_condition_scores = side_conditions @ static_weights + (side_conditions @ count_weights) * alive_reserves
+
+    side_scores = pokemon_scores + side_condition_scores
+    return side_scores[:, 0] - side_scores[:, 1]
+
+
+def evaluate_states(states, scoring=Scoring):
+    """The same scores as `[evaluate(s) for s in states]`, calculated in one pass"""
+    return evaluate_features(LeafFeatures.from_states(states), scoring)
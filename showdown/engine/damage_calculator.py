@@ -1,9 +1,11 @@
-from copy import copy
-from copy import deepcopy
-
+import config
 import constants
 from data import all_move_json
 
+from . import profiler
+from .transposition_table import LRUCache
+from .transposition_table import get_private_cache
+
 
 pokemon_type_indicies = {
     'normal': 0,
@@ -47,6 +49,30 @@ damage_multipication_array = [[1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1/2, 0, 1, 1,
                               [1, 1/2, 1, 1, 1, 1, 2, 1/2, 1, 1, 1, 1, 1, 1, 2, 2, 1/2, 1, 1],
                               [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]]
 
+FLYING_TYPE_ID = pokemon_type_indicies['flying']
+ROCK_TYPE_ID = pokemon_type_indicies['rock']
+
+
+def get_type_ids(types):
+    return tuple(pokemon_type_indicies[t] for t in types)
+
+
+def _build_type_effectiveness_table():
+    # for each attacking type, a lookup of the modifier against every single and dual typing
+    # the modifiers are multiplied in the same order as they would be one type at a time
+    table = list()
+    for multipliers in damage_multipication_array:
+        effectiveness = {(): 1}
+        for first_type_id, first_multiplier in enumerate(multipliers):
+            effectiveness[(first_type_id,)] = 1 * first_multiplier
+            for second_type_id, second_multiplier in enumerate(multipliers):
+                effectiveness[(first_type_id, second_type_id)] = 1 * first_multiplier * second_multiplier
+        table.append(effectiveness)
+    return table
+
+
+TYPE_EFFECTIVENESS = _build_type_effectiveness_table()
+
 
 SPECIAL_LOGIC_MOVES = {
     "seismictoss": lambda attacker, defender: [int(attacker.level)] if "ghost" not in defender.types else None,
@@ -62,9 +88,97 @@ SPECIAL_LOGIC_MOVES = {
 TERRAIN_DAMAGE_BOOST = 1.3
 
 
+# the only volatile-statuses that change the damage a move does
+DAMAGE_VOLATILE_STATUSES = frozenset(['magnetrise', 'flashfire', 'tarshot', constants.ROOST])
+
+_damage_calculation_cache = None
+
+
+def get_damage_calculation_cache():
+    # the cache is created lazily so `config.damage_calculation_cache_size` can be set by `run.py` first
+    global _damage_calculation_cache
+    private_cache = get_private_cache('damage_calculation_cache')
+    if private_cache is not None:
+        return private_cache
+    if _damage_calculation_cache is None:
+        _damage_calculation_cache = LRUCache(config.damage_calculation_cache_size)
+    return _damage_calculation_cache
+
+
+def _pokemon_damage_key(pkmn):
+    return (
+        pkmn.level,
+        pkmn.attack,
+        pkmn.defense,
+        pkmn.special_attack,
+        pkmn.special_defense,
+        pkmn.attack_boost,
+        pkmn.defense_boost,
+        pkmn.special_attack_boost,
+        pkmn.special_defense_boost,
+        pkmn.type_ids,
+        pkmn.ability,
+        pkmn.item,
+        pkmn.status,
+        DAMAGE_VOLATILE_STATUSES.intersection(pkmn.volatile_status)
+    )
+
+
+def _damage_key(attacker, defender, attacking_move, conditions, calc_type):
+    if conditions is None:
+        conditions = {}
+
+    return (
+        _pokemon_damage_key(attacker),
+        _pokemon_damage_key(defender),
+        attacking_move[constants.ID],
+        attacking_move.get(constants.CATEGORY),
+        attacking_move.get(constants.BASE_POWER),
+        attacking_move.get(constants.TYPE),
+        attacking_move.get(constants.PRIORITY),
+        conditions.get(constants.WEATHER),
+        conditions.get(constants.TERRAIN),
+        conditions.get(constants.REFLECT),
+        conditions.get(constants.LIGHT_SCREEN),
+        conditions.get(constants.AURORA_VEIL),
+        calc_type,
+        TERRAIN_DAMAGE_BOOST
+    )
+
+
+@profiler.timed('damage_calculation')
 def _calculate_damage(attacker, defender, move, conditions=None, calc_type='average'):
     # This function assumes the `move` dictionary has already been updated to account for move/item/ability special-effects
     # You may want to use `calculate_damage`
+    # Results are memoized on every field that the calculation reads
+
+    # the move is only read when building the key, so the move-json does not need to be copied
+    attacking_move = move if isinstance(move, dict) else all_move_json.get(move) if isinstance(move, str) else None
+    if attacking_move is None or attacking_move[constants.ID] in SPECIAL_LOGIC_MOVES:
+        # invalid moves raise an error, and special-logic moves depend on each pokemon's hp
+        return _calculate_damage_uncached(attacker, defender, move, conditions=conditions, calc_type=calc_type)
+
+    cache = get_damage_calculation_cache()
+    key = _damage_key(attacker, defender, attacking_move, conditions, calc_type)
+    try:
+        damage_rolls = cache.get(key, key)
+    except TypeError:
+        # an unhashable value, such as a list for the weather, cannot be cached
+        return _calculate_damage_uncached(attacker, defender, move, conditions=conditions, calc_type=calc_type)
+
+    if damage_rolls is key:
+        damage_rolls = _calculate_damage_uncached(attacker, defender, move, conditions=conditions, calc_type=calc_type)
+        if damage_rolls is not None:
+            damage_rolls = tuple(damage_rolls)
+        cache.put(key, damage_rolls)
+
+    # callers are free to modify the list they are given
+    if damage_rolls is None:
+        return None
+    return list(damage_rolls)
+
+
+def _calculate_damage_uncached(attacker, defender, move, conditions=None, calc_type='average'):
 
     acceptable_calc_types = ['average', 'max', 'min_max', 'min_max_average', 'all']
     if calc_type not in acceptable_calc_types:
@@ -109,16 +223,12 @@ def _calculate_damage(attacker, defender, move, conditions=None, calc_type='aver
         elif defense == constants.SPECIAL_ATTACK:
             attacking_stats[attack] = attacker.special_attack
 
-    defending_types = defender.types
-    if attacking_move[constants.ID] == 'thousandarrows' and 'flying' in defending_types:
-        defending_types = copy(defender.types)
-        defending_types.remove('flying')
-    if attacking_move[constants.TYPE] == 'ground' and constants.ROOST in defender.volatile_status:
-        defending_types = copy(defender.types)
-        try:
-            defending_types.remove('flying')
-        except ValueError:
-            pass
+    defending_type_ids = defender.type_ids
+    if (
+        (attacking_move[constants.ID] == 'thousandarrows' or (attacking_move[constants.TYPE] == 'ground' and constants.ROOST in defender.volatile_status)) and
+        FLYING_TYPE_ID in defending_type_ids
+    ):
+        defending_type_ids = tuple(t for t in defending_type_ids if t != FLYING_TYPE_ID)
 
     # rock types get 1.5x SPDEF in sand
     try:
@@ -130,27 +240,27 @@ def _calculate_damage(attacker, defender, move, conditions=None, calc_type='aver
     damage = int(int((2 * attacker.level) / 5) + 2) * attacking_move[constants.BASE_POWER]
     damage = int(damage * attacking_stats[attack] / defending_stats[defense])
     damage = int(damage / 50) + 2
-    damage *= calculate_modifier(attacker, defender, defending_types, attacking_move, conditions)
+    damage *= calculate_modifier(attacker, defender, defending_type_ids, attacking_move, conditions)
 
     damage_rolls = get_damage_rolls(damage, calc_type)
 
     return list(set(damage_rolls))
 
 
-def is_super_effective(move_type, defending_pokemon_types):
-    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
+def is_super_effective(move_type, defending_type_ids):
+    multiplier = type_id_effectiveness_modifier(pokemon_type_indicies[move_type], defending_type_ids)
     return multiplier > 1
 
 
-def is_not_very_effective(move_type, defending_pokemon_types):
-    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
+def is_not_very_effective(move_type, defending_type_ids):
+    multiplier = type_id_effectiveness_modifier(pokemon_type_indicies[move_type], defending_type_ids)
     return multiplier < 1
 
 
-def calculate_modifier(attacker, defender, defending_types, attacking_move, conditions):
+def calculate_modifier(attacker, defender, defending_type_ids, attacking_move, conditions):
 
     modifier = 1
-    modifier *= type_effectiveness_modifier(attacking_move[constants.TYPE], defending_types)
+    modifier *= type_id_effectiveness_modifier(pokemon_type_indicies[attacking_move[constants.TYPE]], defending_type_ids)
     modifier *= weather_modifier(attacking_move, conditions.get(constants.WEATHER))
     modifier *= stab_modifier(attacker, attacking_move)
     modifier *= burn_modifier(attacker, attacking_move)
@@ -169,7 +279,8 @@ def get_move(move):
     if isinstance(move, dict):
         return move
     if isinstance(move, str):
-        return deepcopy(all_move_json.get(move, None))
+        # moves are read-only, so they can be shared instead of copied
+        return all_move_json.get(move, None)
     else:
         return None
 
@@ -213,13 +324,18 @@ def get_damage_rolls(damage, calc_type):
 
 
 def type_effectiveness_modifier(attacking_move_type, defending_types):
-    modifier = 1
-    attacking_type_index = pokemon_type_indicies[attacking_move_type]
-    for pkmn_type in defending_types:
-        defending_type_index = pokemon_type_indicies[pkmn_type]
-        modifier *= damage_multipication_array[attacking_type_index][defending_type_index]
+    return type_id_effectiveness_modifier(pokemon_type_indicies[attacking_move_type], get_type_ids(defending_types))
 
-    return modifier
+
+def type_id_effectiveness_modifier(attacking_type_id, defending_type_ids):
+    try:
+        return TYPE_EFFECTIVENESS[attacking_type_id][defending_type_ids]
+    except KeyError:
+        # only a pokemon with more than two types, such as after trick-or-treat, is not in the table
+        modifier = 1
+        for defending_type_id in defending_type_ids:
+            modifier *= damage_multipication_array[attacking_type_id][defending_type_id]
+        return modifier
 
 
 def weather_modifier(attacking_move, weather):
@@ -295,6 +411,13 @@ def volatile_status_modifier(attacking_move, attacker, defender):
 
 def calculate_damage(state, attacking_side_string, attacking_move, defending_move, calc_type='average'):
     # a wrapper for `_calculate_damage` that takes into account move/item/ability special-effects
+    attacker, defender, attacking_move_dict, conditions = prepare_damage_calculation(state, attacking_side_string, attacking_move, defending_move)
+    return _calculate_damage(attacker, defender, attacking_move_dict, conditions=conditions, calc_type=calc_type)
+
+
+def prepare_damage_calculation(state, attacking_side_string, attacking_move, defending_move):
+    # returns the attacker, defender, move and conditions for `_calculate_damage`
+    # with the move updated to account for move/item/ability special-effects
     from showdown.engine.find_state_instructions import update_attacking_move
     from showdown.engine.find_state_instructions import user_moves_first
 
@@ -324,7 +447,10 @@ def calculate_damage(state, attacking_side_string, attacking_move, defending_mov
     attacker_moves_first = user_moves_first(state, attacking_move_dict, defending_move_dict)
 
     # a charge move doesn't need to charge when only calculating damage
-    attacking_move_dict[constants.FLAGS].pop(constants.CHARGE, None)
+    if constants.CHARGE in attacking_move_dict[constants.FLAGS]:
+        attacking_move_dict = attacking_move_dict.copy()
+        attacking_move_dict[constants.FLAGS] = attacking_move_dict[constants.FLAGS].copy()
+        attacking_move_dict[constants.FLAGS].pop(constants.CHARGE)
 
     attacking_move_dict = update_attacking_move(
         attacking_side.active,
@@ -335,4 +461,4 @@ def calculate_damage(state, attacking_side_string, attacking_move, defending_mov
         state.weather
     )
 
-    return _calculate_damage(attacking_side.active, defending_side.active, attacking_move_dict, conditions=conditions, calc_type=calc_type)
+    return attacking_side.active, defending_side.active, attacking_move_dict, conditions
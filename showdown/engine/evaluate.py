@@ -1,5 +1,8 @@
 import constants
 
+from . import profiler
+from .state_hash import BOOST_ATTRIBUTES
+
 
 class Scoring:
     POKEMON_ALIVE_STATIC = 75
@@ -65,6 +68,11 @@ class Scoring:
         constants.TOXIC_SPIKES: -7,
     }
 
+    SIDE_CONDITION_MAX_COUNT = {
+        constants.SPIKES: 3,
+        constants.TOXIC_SPIKES: 2,
+    }
+
     WEAK_TO_OPPONENT_TYPE = 5
     FASTER_POKEMON_IN_MATCHUP = 10
     SUPER_EFFECTIVE_DAMAGING_MOVE = 5
@@ -103,12 +111,33 @@ def evaluate_pokemon(pkmn):
     return round(score)
 
 
+def alive_reserve_count(side, unrevealed_count=0):
+    # pokemon that have not been revealed are assumed to be alive
+    return len([p for p in side.reserve.values() if p.hp > 0]) + unrevealed_count
+
+
+def unrevealed_opponent_count(state):
+    number_of_opponent_reserve_revealed = len(state.opponent.reserve) + 1
+    return 6 - number_of_opponent_reserve_revealed
+
+
+def evaluate_side_conditions(side_conditions, alive_reserves):
+    score = 0
+    for condition, count in side_conditions.items():
+        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
+            score += count * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
+        elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
+            score += count * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition] * alive_reserves
+
+    return score
+
+
+@profiler.timed('evaluate')
 def evaluate(state):
     score = 0
 
-    number_of_opponent_reserve_revealed = len(state.opponent.reserve) + 1
-    bot_alive_reserve_count = len([p.hp for p in state.self.reserve.values() if p.hp > 0])
-    opponent_alive_reserves_count = len([p for p in state.opponent.reserve.values() if p.hp > 0]) + (6-number_of_opponent_reserve_revealed)
+    bot_alive_reserve_count = alive_reserve_count(state.self)
+    opponent_alive_reserves_count = alive_reserve_count(state.opponent, unrevealed_opponent_count(state))
 
     # evaluate the bot's pokemon
     score += evaluate_pokemon(state.self.active)
@@ -123,17 +152,77 @@ def evaluate(state):
         score -= this_pkmn_score
 
     # evaluate the side-conditions for the bot
-    for condition, count in state.self.side_conditions.items():
-        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
-            score += count * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
-        elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
-            score += count * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition] * bot_alive_reserve_count
+    score += evaluate_side_conditions(state.self.side_conditions, bot_alive_reserve_count)
 
     # evaluate the side-conditions for the opponent
-    for condition, count in state.opponent.side_conditions.items():
-        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
-            score -= count * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
-        elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
-            score -= count * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition] * opponent_alive_reserves_count
+    score -= evaluate_side_conditions(state.opponent.side_conditions, opponent_alive_reserves_count)
 
     return int(score)
+
+
+def _boost_and_volatile_status_bounds():
+    boosts_low = 0
+    boosts_high = 0
+    for weight in Scoring.POKEMON_BOOSTS.values():
+        boosts_low += min(Scoring.POKEMON_BOOST_DIMINISHING_RETURNS.values()) * weight
+        boosts_high += max(Scoring.POKEMON_BOOST_DIMINISHING_RETURNS.values()) * weight
+
+    volatile_status_low = sum(v for v in Scoring.POKEMON_VOLATILE_STATUSES.values() if v < 0)
+    volatile_status_high = sum(v for v in Scoring.POKEMON_VOLATILE_STATUSES.values() if v > 0)
+
+    return boosts_low + volatile_status_low, boosts_high + volatile_status_high
+
+
+def _side_pokemon_bounds(side):
+    # boosts and volatile-statuses are only ever gained by the active pokemon and are removed when it switches out
+    # so only the active pokemon and reserves that still have some can be scored for them
+    pokemon = [side.active] + list(side.reserve.values())
+    holders = 1 + len([
+        p for p in side.reserve.values()
+        if p.volatile_status or any(getattr(p, attribute) for attribute in BOOST_ATTRIBUTES.values())
+    ])
+    modifier_low, modifier_high = _boost_and_volatile_status_bounds()
+
+    status_low = min(min(Scoring.POKEMON_STATIC_STATUSES.values()), Scoring.BURN(4))
+    status_high = max(Scoring.POKEMON_STATIC_STATUSES.values())
+
+    # a fainted pokemon scores 0
+    low = len(pokemon) * min(0, Scoring.POKEMON_ALIVE_STATIC + status_low) + holders * min(0, modifier_low)
+    high = len(pokemon) * max(0, Scoring.POKEMON_ALIVE_STATIC + Scoring.POKEMON_HP + status_high) + holders * max(0, modifier_high)
+    return low, high
+
+
+def _side_condition_bounds(state):
+    low = 0
+    high = 0
+    conditions = set(Scoring.STATIC_SCORED_SIDE_CONDITIONS) | set(Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS)
+    for condition in conditions:
+        # side-conditions only ever grow to their maximum count, but they can be swapped between sides
+        max_count = max(
+            Scoring.SIDE_CONDITION_MAX_COUNT.get(condition, 1),
+            state.self.side_conditions.get(condition, 0),
+            state.opponent.side_conditions.get(condition, 0)
+        )
+        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
+            extreme = max_count * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
+        else:
+            # at most 5 reserves are alive
+            extreme = max_count * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition] * 5
+        low += min(0, extreme)
+        high += max(0, extreme)
+
+    return low, high
+
+
+def evaluation_bounds(state):
+    """Returns a (lower, upper) bound on the result of `evaluate` for `state` and every state reachable from it
+
+       The bounds are loose, but they let a search prove that a chance-node cannot change a decision
+       before all of its outcomes have been searched"""
+    bot_low, bot_high = _side_pokemon_bounds(state.self)
+    opponent_low, opponent_high = _side_pokemon_bounds(state.opponent)
+    side_condition_low, side_condition_high = _side_condition_bounds(state)
+
+    lower = bot_low - opponent_high + side_condition_low - side_condition_high
+    upper = bot_high - opponent_low + side_condition_high - side_condition_low
+    return lower, upper
@@ -1,3 +1,4 @@
+import heapq
 from copy import copy
 
 import config
@@ -5,8 +6,10 @@ import constants
 from data import all_move_json
 
 from . import instruction_generator
+from . import profiler
 from .damage_calculator import _calculate_damage
 from .objects import TransposeInstruction
+from .objects import ImmutableTransposeInstruction
 from .special_effects.abilities.modify_attack_against import ability_modify_attack_against
 from .special_effects.abilities.modify_attack_being_used import ability_modify_attack_being_used
 from .special_effects.items.modify_attack_against import item_modify_attack_against
@@ -14,6 +17,9 @@ from .special_effects.items.modify_attack_being_used import item_modify_attack_b
 from .special_effects.moves.move_special_effect import modify_attack_being_used
 from .switch_out_moves import switch_out_move_triggered
 from .switch_out_moves import get_best_switch_pokemon
+from .transposition_table import LRUCache
+from .transposition_table import get_private_cache
+from .transposition_table import get_search_settings
 
 
 def lookup_move(move_name):
@@ -192,13 +198,49 @@ def cannot_use_move(attacking_pokemon, attacking_move):
     return False
 
 
+def get_damage_roll_buckets(damage_amounts, defending_pokemon, bucket_size):
+    """Groups damage rolls that lead to equivalent outcomes
+
+       Every roll that knocks out `defending_pokemon` is one bucket, since they all deal the same damage once
+       capped to the defender's HP. The remaining rolls are grouped with rolls that leave the defender within
+       `bucket_size` of its max HP of each other, and a group deals the average of its rolls.
+       A `bucket_size` of 0 keeps every roll separate.
+
+       :return: a list of (damage, percentage) tuples
+    """
+    roll_percentage = 1 / len(damage_amounts)
+    if (
+        not bucket_size or
+        len(damage_amounts) == 1 or
+        constants.SUBSTITUTE in defending_pokemon.volatile_status or
+        min(damage_amounts) <= 0
+    ):
+        return [(dmg, roll_percentage) for dmg in damage_amounts]
+
+    knockout_rolls = [dmg for dmg in damage_amounts if dmg >= defending_pokemon.hp]
+    surviving_rolls = sorted(dmg for dmg in damage_amounts if dmg < defending_pokemon.hp)
+
+    buckets = []
+    bucket_width = bucket_size * defending_pokemon.maxhp
+    for dmg in surviving_rolls:
+        if buckets and dmg - buckets[-1][0] <= bucket_width:
+            buckets[-1].append(dmg)
+        else:
+            buckets.append([dmg])
+
+    damage_rolls = [(sum(bucket) / len(bucket), len(bucket) * roll_percentage) for bucket in buckets]
+    if knockout_rolls:
+        damage_rolls.append((max(knockout_rolls), len(knockout_rolls) * roll_percentage))
+    return damage_rolls
+
+
 def get_state_instructions_from_move(mutator, attacking_move, defending_move, attacker, defender, first_move, instructions):
     instructions.frozen = False
 
     if constants.SWITCH_STRING in attacking_move:
         return instruction_generator.get_instructions_from_switch(mutator, attacker, attacking_move[constants.SWITCH_STRING], instructions)
 
-    mutator.apply(instructions.instructions)
+    mutator.apply(instructions.compiled_instructions)
     attacking_side = instruction_generator.get_side_from_state(mutator.state, attacker)
     defending_side = instruction_generator.get_side_from_state(mutator.state, defender)
     attacking_pokemon = attacking_side.active
@@ -220,7 +262,7 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
         # if the attacker is dead, remove the 'flinched' volatile-status if it has it and exit early
         # this triggers if the pokemon moves second but the first attack knocked it out
         instructions = instruction_generator.get_instructions_from_flinched(mutator, attacker, instructions)
-        mutator.reverse(instructions.instructions)
+        mutator.reverse(instructions.compiled_instructions)
         return [instructions]
 
     attacking_move = update_attacking_move(
@@ -269,6 +311,8 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     # move is a damaging move
     if attacking_move[constants.CATEGORY] in constants.DAMAGING_CATEGORIES:
         damage_amounts = _calculate_damage(attacking_pokemon, defending_pokemon, attacking_move, conditions=conditions, calc_type=config.damage_calc_type)
+        if damage_amounts is not None:
+            damage_rolls = get_damage_roll_buckets(damage_amounts, defending_pokemon, config.damage_roll_bucket_size)
 
         attacking_move_secondary = attacking_move[constants.SECONDARY]
         attacking_move_self = attacking_move.get(constants.SELF)
@@ -319,7 +363,7 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
             boosts_target = attacker if attacking_move[constants.TARGET] == constants.SELF else defender
             boosts_chance = attacking_move[constants.ACCURACY]
 
-    mutator.reverse(instructions.instructions)
+    mutator.reverse(instructions.compiled_instructions)
 
     all_instructions = instruction_generator.get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defender, attacking_move, defending_move, instructions)
 
@@ -332,10 +376,9 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     if damage_amounts is not None:
         temp_instructions = []
         for instruction_set in all_instructions:
-            amount_of_damage_rolls = len(damage_amounts)
-            for dmg in damage_amounts:
+            for dmg, roll_percentage in damage_rolls:
                 these_instructions = copy(instruction_set)
-                these_instructions.update_percentage(1 / amount_of_damage_rolls)
+                these_instructions.update_percentage(roll_percentage)
                 temp_instructions += instruction_generator.get_states_from_damage(mutator, defender, dmg, move_accuracy, attacking_move, these_instructions)
         all_instructions = temp_instructions
 
@@ -400,17 +443,120 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     return all_instructions
 
 
-def remove_duplicate_instructions(list_of_instructions):
-    new_instructions = [list_of_instructions[0]]
-    for instruction_1 in list_of_instructions[1:]:
-        for instruction_2 in new_instructions:
-            if instruction_1.has_same_instructions_as(instruction_2):
-                instruction_2.percentage += instruction_1.percentage
-                break
+def _instructions_key(instructions):
+    key = tuple(instructions)
+    try:
+        hash(key)
+    except TypeError:
+        # some instructions carry lists (i.e. the types in a type-change)
+        key = tuple(
+            tuple(tuple(value) if isinstance(value, list) else value for value in instruction)
+            for instruction in instructions
+        )
+    return key
+
+
+def remove_duplicate_instructions(list_of_instructions, mutator=None):
+    """Combines the TransposeInstructions that have the same instructions, adding their percentages together
+
+       If a mutator is given, TransposeInstructions that result in the same state are combined as well,
+       even if their instructions are different. This costs one apply and reverse of each TransposeInstruction,
+       so the mutator's state must be the state that the instructions were generated from"""
+    new_instructions = dict()
+    for instruction in list_of_instructions:
+        if mutator is None:
+            key = _instructions_key(instruction.instructions)
+        else:
+            mutator.apply(instruction.compiled_instructions)
+            key = mutator.state_hash
+            mutator.reverse(instruction.compiled_instructions)
+
+        existing_instruction = new_instructions.get(key)
+        if existing_instruction is None:
+            new_instructions[key] = instruction
         else:
-            new_instructions.append(instruction_1)
+            existing_instruction.percentage += instruction.percentage
+
+    return list(new_instructions.values())
+
+
+class ChancePruningStats:
+    """Counts the outcomes removed by chance pruning and how much probability they had
+
+       Each call to `get_all_state_instructions` with chance pruning enabled is one node"""
+
+    def __init__(self):
+        self.reset_counters()
+
+    def record(self, pruned_outcomes, pruned_mass):
+        self.nodes += 1
+        if pruned_outcomes:
+            self.pruned_nodes += 1
+        self.pruned_outcomes += pruned_outcomes
+        self.pruned_mass += pruned_mass
+        self.max_pruned_mass = max(self.max_pruned_mass, pruned_mass)
+
+    def reset_counters(self):
+        self.nodes = 0
+        self.pruned_nodes = 0
+        self.pruned_outcomes = 0
+        self.pruned_mass = 0.0
+        self.max_pruned_mass = 0.0
+
+    @property
+    def mean_pruned_mass(self):
+        if not self.nodes:
+            return 0.0
+        return self.pruned_mass / self.nodes
+
+    def __repr__(self):
+        return "{}(nodes={}, pruned_nodes={}, pruned_outcomes={}, mean_pruned_mass={:.4f}, max_pruned_mass={:.4f})".format(
+            self.__class__.__name__,
+            self.nodes,
+            self.pruned_nodes,
+            self.pruned_outcomes,
+            self.mean_pruned_mass,
+            self.max_pruned_mass
+        )
+
+
+_chance_pruning_stats = None
+
+
+def get_chance_pruning_stats():
+    global _chance_pruning_stats
+    if _chance_pruning_stats is None:
+        _chance_pruning_stats = ChancePruningStats()
+    return _chance_pruning_stats
+
+
+def prune_unlikely_instructions(list_of_instructions, epsilon, top_k=0):
+    """Removes the TransposeInstructions whose percentage is below `epsilon`, and all but the `top_k` most likely ones
+
+       The most likely TransposeInstruction is always kept. The removed percentage is spread over the kept
+       TransposeInstructions in proportion to their own percentage, so the total percentage is unchanged.
+       The order of the kept TransposeInstructions is unchanged.
+
+       :return: the kept TransposeInstructions and the total percentage that was removed"""
+    if len(list_of_instructions) <= 1:
+        return list_of_instructions, 0.0
+
+    kept_instructions = [i for i in list_of_instructions if i.percentage >= epsilon]
+    if top_k and len(kept_instructions) > top_k:
+        most_likely = set(map(id, heapq.nlargest(top_k, kept_instructions, key=lambda i: i.percentage)))
+        kept_instructions = [i for i in kept_instructions if id(i) in most_likely]
+    if not kept_instructions:
+        kept_instructions = [max(list_of_instructions, key=lambda i: i.percentage)]
 
-    return new_instructions
+    if len(kept_instructions) == len(list_of_instructions):
+        return list_of_instructions, 0.0
+
+    total_percentage = sum(i.percentage for i in list_of_instructions)
+    kept_percentage = sum(i.percentage for i in kept_instructions)
+    for instruction in kept_instructions:
+        instruction.percentage *= total_percentage / kept_percentage
+
+    return kept_instructions, total_percentage - kept_percentage
 
 
 def end_of_turn_triggered(user_move, opponent_move):
@@ -422,30 +568,95 @@ def end_of_turn_triggered(user_move, opponent_move):
     return True
 
 
+@profiler.timed('state_instructions')
 def get_all_state_instructions(mutator, user_move_string, opponent_move_string):
     user_move = lookup_move(user_move_string)
     opponent_move = lookup_move(opponent_move_string)
 
     bot_moves_first = user_moves_first(mutator.state, user_move, opponent_move)
 
-    instructions = TransposeInstruction(1.0, [], False)
-
-    all_instructions = []
-    if bot_moves_first:
-        instructions = get_state_instructions_from_move(mutator, user_move, opponent_move, constants.SELF, constants.OPPONENT, True, instructions)
-        for instruction in instructions:
-            all_instructions += get_state_instructions_from_move(mutator, opponent_move, user_move, constants.OPPONENT, constants.SELF, False, instruction)
+    # unlikely outcomes of the first move are pruned before the second move is generated from them
+    chance_pruning = config.chance_pruning_epsilon > 0 or config.chance_pruning_top_k > 0
+    number_of_pruned_outcomes = 0
+    pruned_mass = 0.0
+
+    # the generators apply and reverse instructions many times without reading the hash
+    with mutator.hash_suspended():
+        instructions = TransposeInstruction(1.0, [], False)
+
+        all_instructions = []
+        if bot_moves_first:
+            instructions = get_state_instructions_from_move(mutator, user_move, opponent_move, constants.SELF, constants.OPPONENT, True, instructions)
+            if chance_pruning:
+                number_of_instructions = len(instructions)
+                instructions, pruned_mass = prune_unlikely_instructions(instructions, config.chance_pruning_epsilon)
+                number_of_pruned_outcomes = number_of_instructions - len(instructions)
+            for instruction in instructions:
+                all_instructions += get_state_instructions_from_move(mutator, opponent_move, user_move, constants.OPPONENT, constants.SELF, False, instruction)
+        else:
+            instructions = get_state_instructions_from_move(mutator, opponent_move, user_move, constants.OPPONENT, constants.SELF, True, instructions)
+            if chance_pruning:
+                number_of_instructions = len(instructions)
+                instructions, pruned_mass = prune_unlikely_instructions(instructions, config.chance_pruning_epsilon)
+                number_of_pruned_outcomes = number_of_instructions - len(instructions)
+            for instruction in instructions:
+                all_instructions += get_state_instructions_from_move(mutator, user_move, opponent_move, constants.SELF, constants.OPPONENT, False, instruction)
+
+        if end_of_turn_triggered(user_move_string, opponent_move_string):
+            temp_instructions = []
+            for instruction_set in all_instructions:
+                temp_instructions += instruction_generator.get_end_of_turn_instructions(mutator, instruction_set, user_move, opponent_move, bot_moves_first)
+            all_instructions = temp_instructions
+
+    if config.merge_identical_states:
+        all_instructions = remove_duplicate_instructions(all_instructions, mutator=mutator)
     else:
-        instructions = get_state_instructions_from_move(mutator, opponent_move, user_move, constants.OPPONENT, constants.SELF, True, instructions)
-        for instruction in instructions:
-            all_instructions += get_state_instructions_from_move(mutator, user_move, opponent_move, constants.SELF, constants.OPPONENT, False, instruction)
-
-    if end_of_turn_triggered(user_move_string, opponent_move_string):
-        temp_instructions = []
-        for instruction_set in all_instructions:
-            temp_instructions += instruction_generator.get_end_of_turn_instructions(mutator, instruction_set, user_move, opponent_move, bot_moves_first)
-        all_instructions = temp_instructions
+        all_instructions = remove_duplicate_instructions(all_instructions)
 
-    all_instructions = remove_duplicate_instructions(all_instructions)
+    if chance_pruning:
+        number_of_instructions = len(all_instructions)
+        all_instructions, final_pruned_mass = prune_unlikely_instructions(all_instructions, config.chance_pruning_epsilon, config.chance_pruning_top_k)
+        number_of_pruned_outcomes += number_of_instructions - len(all_instructions)
+        get_chance_pruning_stats().record(number_of_pruned_outcomes, pruned_mass + final_pruned_mass)
 
+    profiler.count('state_instruction_calls')
+    profiler.count('instruction_sets', len(all_instructions))
     return all_instructions
+
+
+_state_instruction_cache = None
+
+
+def get_state_instruction_cache():
+    # the cache is created lazily so `config.state_instruction_cache_size` can be set by `run.py` first
+    global _state_instruction_cache
+    private_cache = get_private_cache('state_instruction_cache')
+    if private_cache is not None:
+        return private_cache
+    if _state_instruction_cache is None:
+        _state_instruction_cache = LRUCache(config.state_instruction_cache_size)
+    return _state_instruction_cache
+
+
+def get_all_state_instructions_cached(mutator, user_move_string, opponent_move_string):
+    """A memoized `get_all_state_instructions` for searches that revisit the same states
+
+       Results are keyed by the mutator's state-hash and both moves, and are shared between every caller.
+       They are returned as a tuple of ImmutableTransposeInstructions so no caller can modify them"""
+    cache = get_state_instruction_cache()
+    key = (
+        mutator.state_hash,
+        user_move_string,
+        opponent_move_string,
+        get_search_settings()
+    )
+
+    state_instructions = cache.get(key)
+    if state_instructions is None:
+        state_instructions = tuple(
+            ImmutableTransposeInstruction.from_transpose_instruction(i)
+            for i in get_all_state_instructions(mutator, user_move_string, opponent_move_string)
+        )
+        cache.put(key, state_instructions)
+
+    return state_instructions
@@ -3,7 +3,8 @@ from copy import copy
 import constants
 from config import logger
 
-from .damage_calculator import type_effectiveness_modifier
+from .damage_calculator import ROCK_TYPE_ID
+from .damage_calculator import type_id_effectiveness_modifier
 from .special_effects.abilities.on_switch_in import ability_on_switch_in
 from .special_effects.items.end_of_turn import item_end_of_turn
 from .special_effects.abilities.end_of_turn import ability_end_of_turn
@@ -103,7 +104,7 @@ def get_instructions_from_special_logic_move(mutator, attacking_pokemon, defendi
         return [instructions]
 
     new_instructions = list()
-    mutator.apply(instructions.instructions)
+    mutator.apply(instructions.compiled_instructions)
     if move_name in weather_instructions and mutator.state.weather != move_name and mutator.state.weather not in constants.IRREVERSIBLE_WEATHER:
         new_instructions.append(
             (constants.MUTATOR_WEATHER_START, move_name, mutator.state.weather)
@@ -121,7 +122,7 @@ def get_instructions_from_special_logic_move(mutator, attacking_pokemon, defendi
             (constants.MUTATOR_CHANGE_ITEM, constants.OPPONENT, mutator.state.self.active.item, mutator.state.opponent.active.item)
         )
 
-    mutator.reverse(instructions.instructions)
+    mutator.reverse(instructions.compiled_instructions)
 
     for i in new_instructions:
         instructions.add_instruction(i)
@@ -142,9 +143,9 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
         return [instruction]
 
     side = get_side_from_state(mutator.state, affected_side)
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
     if volatile_status in side.active.volatile_status:
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
         return [instruction]
 
     if can_be_volatile_statused(side, volatile_status, first_move) and volatile_status not in side.active.volatile_status:
@@ -153,7 +154,7 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
             affected_side,
             volatile_status
         )
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
         instruction.add_instruction(apply_status_instruction)
         if volatile_status == constants.SUBSTITUTE:
             instruction.add_instruction(
@@ -164,7 +165,7 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
                 )
             )
     else:
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
 
     return [instruction]
 
@@ -175,7 +176,7 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
 
     attacking_side = get_side_from_state(mutator.state, attacker)
     defending_side = get_side_from_state(mutator.state, opposite_side[attacker])
-    mutator.apply(instructions.instructions)
+    mutator.apply(instructions.compiled_instructions)
     instruction_additions = remove_volatile_status_and_boosts_instructions(attacking_side, attacker)
 
     for move in filter(lambda x: x[constants.DISABLED] is True and x[constants.CURRENT_PP], attacking_side.active.moves):
@@ -220,7 +221,7 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
 
         # account for stealth rock damage
         if attacking_side.side_conditions[constants.STEALTH_ROCK] == 1:
-            multiplier = type_effectiveness_modifier('rock', switch_pkmn.types)
+            multiplier = type_id_effectiveness_modifier(ROCK_TYPE_ID, switch_pkmn.type_ids)
 
             instruction_additions.append(
                 (
@@ -296,7 +297,7 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
                 i
             )
 
-    mutator.reverse(instructions.instructions)
+    mutator.reverse(instructions.compiled_instructions)
     for i in instruction_additions:
         instructions.add_instruction(i)
 
@@ -328,7 +329,7 @@ def get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defe
     attacker_side = get_side_from_state(mutator.state, attacker)
     defender_side = get_side_from_state(mutator.state, defender)
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     if constants.PARALYZED == attacker_side.active.status:
         fully_paralyzed_instruction = copy(instruction)
@@ -372,7 +373,7 @@ def get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defe
     if move[constants.TYPE] == 'electric' and 'ground' in defender_side.active.types:
         instruction.frozen = True
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
 
     return instructions
 
@@ -392,7 +393,7 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
     drain = attacking_move.get(constants.DRAIN)
     move_flags = attacking_move.get(constants.FLAGS, {})
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     if accuracy is True:
         accuracy = 100
@@ -411,10 +412,10 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
                 attacker,
                 min(int(crash_percent * attacker_side.active.maxhp), attacker_side.active.hp)
             )
-            mutator.reverse(instruction.instructions)
+            mutator.reverse(instruction.compiled_instructions)
             instruction.add_instruction(crash_instruction)
         else:
-            mutator.reverse(instruction.instructions)
+            mutator.reverse(instruction.compiled_instructions)
         instruction.frozen = True
         return [instruction]
 
@@ -498,7 +499,7 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
 
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -521,7 +522,7 @@ def get_instructions_from_side_conditions(mutator, attacker_string, side_string,
 
     instruction_additions = []
     side = get_side_from_state(mutator.state, side_string)
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     if condition == constants.WISH:
         if side.wish[0] == 0:
@@ -552,7 +553,7 @@ def get_instructions_from_side_conditions(mutator, attacker_string, side_string,
                 )
             )
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -569,7 +570,7 @@ def get_instructions_from_hazard_clearing_moves(mutator, attacker_string, move,
     defender_string = opposite_side[attacker_string]
 
     instruction_additions = []
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     attacker_side = get_side_from_state(mutator.state, attacker_string)
     defender_side = get_side_from_state(mutator.state, defender_string)
@@ -644,7 +645,7 @@ def get_instructions_from_hazard_clearing_moves(mutator, attacker_string, move,
     else:
         raise ValueError("{} is not a hazard clearing move".format(move[constants.ID]))
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -664,17 +665,17 @@ def get_states_from_status_effects(mutator, defender, status, accuracy, instruct
         accuracy = 100
     percent_hit = accuracy / 100
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
     instruction_additions = []
     defending_side = get_side_from_state(mutator.state, defender)
     attacking_side = get_side_from_state(mutator.state, opposite_side[defender])
 
     if sleep_clause_activated(defending_side, status):
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
         return [instruction]
 
     if immune_to_status(mutator.state, defending_side.active, attacking_side.active, status):
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
         return [instruction]
 
     move_missed_instruction = copy(instruction)
@@ -702,7 +703,7 @@ def get_states_from_status_effects(mutator, defender, status, accuracy, instruct
             move_missed_instruction.add_instruction(blunder_policy_increase_speed_instruction)
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -725,7 +726,7 @@ def get_states_from_boosts(mutator, side_string, boosts, accuracy, instruction):
         accuracy = 100
     percent_hit = accuracy / 100
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
     instruction_additions = []
 
     move_missed_instruction = copy(instruction)
@@ -762,7 +763,7 @@ def get_states_from_boosts(mutator, side_string, boosts, accuracy, instruction):
         move_missed_instruction.update_percentage(1 - percent_hit)
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -803,7 +804,7 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
     if instruction.frozen:
         return [instruction]
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     target = move[constants.HEAL_TARGET]
     if target in opposing_side_strings:
@@ -818,7 +819,7 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
         health_recovered = 0
 
     if health_recovered == 0:
-        mutator.reverse(instruction.instructions)
+        mutator.reverse(instruction.compiled_instructions)
         return [instruction]
 
     final_health = pkmn.hp + health_recovered
@@ -833,7 +834,7 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
         health_recovered
     )
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
 
     if health_recovered:
         instruction.add_instruction(heal_instruction)
@@ -848,7 +849,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
     else:
         sides = [constants.OPPONENT, constants.SELF]
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
 
     # weather damage - sand and hail
     for attacker in sides:
@@ -1084,7 +1085,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 mutator.apply_one(disable_instruction)
                 instruction.add_instruction(disable_instruction)
 
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
 
     return [instruction]
 
@@ -1102,9 +1103,9 @@ def get_state_from_drag(mutator, attacking_move, attacking_side_string, move_tar
     else:
         raise ValueError("Invalid value for move_target: {}".format(move_target))
 
-    mutator.apply(instruction.instructions)
+    mutator.apply(instruction.compiled_instructions)
     new_instructions = remove_volatile_status_and_boosts_instructions(affected_side, affected_side_string)
-    mutator.reverse(instruction.instructions)
+    mutator.reverse(instruction.compiled_instructions)
 
     for i in new_instructions:
         instruction.add_instruction(i)
@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from data import all_move_json
+
+from .damage_calculator import _calculate_damage
+from .transposition_table import LRUCache
+from .transposition_table import get_private_cache
+
+
+KILLER_MOVES_PER_DEPTH = 2
+DAMAGE_ESTIMATE_CACHE_SIZE = 4096
+
+
+class MoveOrderer:
+    """Orders the options searched by `get_payoff_matrix` so that pruning happens as early as possible
+
+       The bot's options are ordered by a history table of the options that were the best in previously searched states.
+       The opponent's options are ordered by:
+           - killer moves: the replies that most recently pruned a row at the same depth
+           - a history table of the replies that have pruned rows, weighted by the depth of the prune
+           - an estimate of the damage the reply does to the bot's active pokemon
+
+       One MoveOrderer is shared by the root and every recursive call of a search, and between searches"""
+
+    def __init__(self):
+        self.user_history = defaultdict(int)
+        self.opponent_history = defaultdict(int)
+        self.killer_moves = defaultdict(list)
+        self.cutoffs = 0
+        self.first_reply_cutoffs = 0
+        self._damage_estimates = LRUCache(DAMAGE_ESTIMATE_CACHE_SIZE)
+
+    def estimate_damage(self, attacker, defender, move_name):
+        """Returns the fraction of the defender's max-hp a move is expected to do, ignoring special-effects
+
+           Estimates are cached by pokemon and move, so boosts and other changes during a search are not considered"""
+        if move_name not in all_move_json:
+            # switches and the do-nothing move
+            return 0
+
+        key = (attacker.id, defender.id, move_name)
+        estimate = self._damage_estimates.get(key)
+        if estimate is None:
+            damage = _calculate_damage(attacker, defender, move_name, calc_type='max')
+            estimate = max(damage) / defender.maxhp if damage else 0
+            self._damage_estimates.put(key, estimate)
+
+        return estimate
+
+    def order_user_options(self, state, user_options, depth):
+        # sorting is stable, so options without any history keep their original order
+        return sorted(user_options, key=lambda o: -self.user_history[o])
+
+    def order_opponent_options(self, state, opponent_options, depth):
+        killers = self.killer_moves[depth]
+
+        def sort_key(option):
+            try:
+                killer_rank = killers.index(option)
+            except ValueError:
+                killer_rank = len(killers)
+            return (
+                killer_rank,
+                -self.opponent_history[option],
+                -self.estimate_damage(state.opponent.active, state.self.active, option)
+            )
+
+        return sorted(opponent_options, key=sort_key)
+
+    def record_cutoff(self, opponent_move, depth, searched_first):
+        self.cutoffs += 1
+        if searched_first:
+            self.first_reply_cutoffs += 1
+
+        self.opponent_history[opponent_move] += (depth + 1) ** 2
+
+        killers = self.killer_moves[depth]
+        if opponent_move in killers:
+            killers.remove(opponent_move)
+        killers.insert(0, opponent_move)
+        del killers[KILLER_MOVES_PER_DEPTH:]
+
+    def record_best_user_option(self, user_move, depth):
+        self.user_history[user_move] += (depth + 1) ** 2
+
+    def age(self):
+        # older results are worth less once the battle has moved on
+        for history in (self.user_history, self.opponent_history):
+            for option in list(history):
+                history[option] //= 2
+                if not history[option]:
+                    del history[option]
+        self.killer_moves.clear()
+
+    def merge(self, other):
+        """Adds what `other` learned to this MoveOrderer. The killer moves of `other` are taken as the more recent"""
+        for history, other_history in ((self.user_history, other.user_history), (self.opponent_history, other.opponent_history)):
+            for option, score in other_history.items():
+                history[option] += score
+        for depth, other_killers in other.killer_moves.items():
+            killers = self.killer_moves[depth]
+            killers[:] = (other_killers + [k for k in killers if k not in other_killers])[:KILLER_MOVES_PER_DEPTH]
+        self._damage_estimates.merge(other._damage_estimates)
+        self.cutoffs += other.cutoffs
+        self.first_reply_cutoffs += other.first_reply_cutoffs
+
+    def clear(self):
+        self.user_history.clear()
+        self.opponent_history.clear()
+        self.killer_moves.clear()
+        self._damage_estimates.clear()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.cutoffs = 0
+        self.first_reply_cutoffs = 0
+
+    @property
+    def first_reply_cutoff_rate(self):
+        if not self.cutoffs:
+            return 0.0
+        return self.first_reply_cutoffs / self.cutoffs
+
+    def __repr__(self):
+        return "{}(cutoffs={}, first_reply_cutoffs={}, first_reply_cutoff_rate={:.2f}, damage_estimates={})".format(
+            self.__class__.__name__,
+            self.cutoffs,
+            self.first_reply_cutoffs,
+            self.first_reply_cutoff_rate,
+            self._damage_estimates
+        )
+
+
+_move_orderer = None
+
+
+def get_move_orderer():
+    global _move_orderer
+    private_move_orderer = get_private_cache('move_orderer')
+    if private_move_orderer is not None:
+        return private_move_orderer
+    if _move_orderer is None:
+        _move_orderer = MoveOrderer()
+    return _move_orderer
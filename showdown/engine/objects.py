@@ -1,9 +1,17 @@
 from collections import defaultdict
+from collections import namedtuple
+from contextlib import contextmanager
 from copy import copy
 
+import config
 import constants
 from data import all_move_json
 
+from . import profiler
+from . import state_hash
+from . import evaluate
+from .damage_calculator import get_type_ids
+
 
 boost_multiplier_lookup = {
     -6: 2/8,
@@ -173,7 +181,8 @@ class Pokemon(object):
     __slots__ = (
         'id',
         'level',
-        'types',
+        '_types',
+        'type_ids',
         'hp',
         'maxhp',
         'ability',
@@ -246,6 +255,16 @@ class Pokemon(object):
         # it is calculated here to save time during evaluation
         self.burn_multiplier = self.calculate_burn_multiplier()
 
+    @property
+    def types(self):
+        return self._types
+
+    @types.setter
+    def types(self, types):
+        # the integer ids of the types are kept alongside them for type-effectiveness lookups
+        self._types = types
+        self.type_ids = get_type_ids(types)
+
     def calculate_burn_multiplier(self):
         # +1 to the multiplier for each physical move
         burn_multiplier = len([m for m in self.moves if all_move_json[m[constants.ID]][constants.CATEGORY] == constants.PHYSICAL])
@@ -355,24 +374,44 @@ class Pokemon(object):
 
 
 class TransposeInstruction:
-    __slots__ = ('percentage', 'instructions', 'frozen')
+    """A list of instructions and the chance of them happening
+
+       `compiled_instructions` are the same instructions compiled, which is the form they should be applied in.
+       Each instruction is compiled once, when it is added, so instructions must be added with `add_instruction`"""
+    __slots__ = ('percentage', '_instructions', 'compiled_instructions', 'frozen')
 
     def __init__(self, percentage, instructions, frozen=False):
         self.percentage = percentage
         self.instructions = instructions
         self.frozen = frozen
 
+    @property
+    def instructions(self):
+        return self._instructions
+
+    @instructions.setter
+    def instructions(self, instructions):
+        self._instructions = instructions
+        self.compiled_instructions = list(compile_instructions(instructions))
+
     def update_percentage(self, modifier):
         self.percentage *= modifier
 
     def add_instruction(self, instruction):
-        self.instructions.append(instruction)
+        self._instructions.append(instruction)
+        self.compiled_instructions.append(compile_instruction(instruction))
 
     def has_same_instructions_as(self, other):
         return self.instructions == other.instructions
 
     def __copy__(self):
-        return TransposeInstruction(self.percentage, copy(self.instructions), self.frozen)
+        # the copy is made without `__init__` so the instructions are not compiled again
+        transpose_instruction = TransposeInstruction.__new__(TransposeInstruction)
+        transpose_instruction.percentage = self.percentage
+        transpose_instruction._instructions = copy(self._instructions)
+        transpose_instruction.compiled_instructions = copy(self.compiled_instructions)
+        transpose_instruction.frozen = self.frozen
+        return transpose_instruction
 
     def __repr__(self):
         return "{}: {}".format(self.percentage, str(self.instructions))
@@ -383,10 +422,110 @@ class TransposeInstruction:
             self.frozen == other.frozen
 
 
+class ImmutableTransposeInstruction(namedtuple('ImmutableTransposeInstruction', ['percentage', 'instructions', 'frozen'])):
+    """A read-only TransposeInstruction whose instructions are a tuple of compiled instructions
+
+       These are shared between every search that reaches the same state, so they must never be modified"""
+    __slots__ = ()
+
+    @classmethod
+    def from_transpose_instruction(cls, transpose_instruction):
+        return cls(transpose_instruction.percentage, tuple(transpose_instruction.compiled_instructions), transpose_instruction.frozen)
+
+
+class StateHashDivergedError(Exception):
+    pass
+
+
+# the two sides, indexed by their side id in compiled instructions
+SIDES = (constants.SELF, constants.OPPONENT)
+SIDE_IDS = {side: side_id for side_id, side in enumerate(SIDES)}
+
+# every mutator instruction, indexed by its opcode in compiled instructions
+MUTATOR_INSTRUCTIONS = (
+    constants.MUTATOR_SWITCH,
+    constants.MUTATOR_APPLY_VOLATILE_STATUS,
+    constants.MUTATOR_REMOVE_VOLATILE_STATUS,
+    constants.MUTATOR_DAMAGE,
+    constants.MUTATOR_HEAL,
+    constants.MUTATOR_BOOST,
+    constants.MUTATOR_UNBOOST,
+    constants.MUTATOR_APPLY_STATUS,
+    constants.MUTATOR_REMOVE_STATUS,
+    constants.MUTATOR_SIDE_START,
+    constants.MUTATOR_SIDE_END,
+    constants.MUTATOR_WISH_START,
+    constants.MUTATOR_WISH_DECREMENT,
+    constants.MUTATOR_DISABLE_MOVE,
+    constants.MUTATOR_ENABLE_MOVE,
+    constants.MUTATOR_WEATHER_START,
+    constants.MUTATOR_FIELD_START,
+    constants.MUTATOR_FIELD_END,
+    constants.MUTATOR_TOGGLE_TRICKROOM,
+    constants.MUTATOR_CHANGE_TYPE,
+    constants.MUTATOR_CHANGE_ITEM,
+)
+OPCODES = {instruction: opcode for opcode, instruction in enumerate(MUTATOR_INSTRUCTIONS)}
+
+# instructions that change the whole field instead of one side
+SIDELESS_OPCODES = frozenset(
+    OPCODES[instruction] for instruction in (
+        constants.MUTATOR_WEATHER_START,
+        constants.MUTATOR_FIELD_START,
+        constants.MUTATOR_FIELD_END,
+        constants.MUTATOR_TOGGLE_TRICKROOM,
+    )
+)
+
+
+def compile_instruction(instruction):
+    """Translates an instruction into its compiled form
+
+       The instruction's string is replaced by its opcode, and the side it changes (if any) by its side id.
+       The remaining values are unchanged. An instruction that is already compiled is returned as-is"""
+    if instruction[0].__class__ is int:
+        return instruction
+
+    opcode = OPCODES[instruction[0]]
+    if opcode in SIDELESS_OPCODES:
+        return (opcode,) + tuple(instruction[1:])
+    return (opcode, SIDE_IDS[instruction[1]]) + tuple(instruction[2:])
+
+
+def compile_instructions(instructions):
+    return tuple(compile_instruction(instruction) for instruction in instructions)
+
+
 class StateMutator:
+    """Applies and reverses instructions on a State
+
+       Instructions are either tuples led by a `constants.MUTATOR_*` string and a side string,
+       or their compiled form from `compile_instruction`, which is led by an opcode and a side id.
+       The instructions given to one call of `apply` or `reverse` must all be in the same form.
+       String instructions are compiled every time they are applied, so the search and the instruction generators
+       apply compiled instructions only (i.e. `TransposeInstruction.compiled_instructions`).
+       The side objects are looked up once, when the mutator is created"""
 
-    def __init__(self, state):
+    def __init__(self, state, debug_hash=None):
         self.state = state
+        self._sides = None
+        self._resolve_sides()
+
+        # the hash is calculated the first time it is needed and then kept up to date by every instruction,
+        # except inside `hash_suspended`
+        self._state_hash = None
+
+        # the evaluation is kept as a score for each pokemon and each side's side-conditions
+        # instructions mark the scores they change as stale, and only those are re-scored when `evaluation` is read
+        self._evaluation = None
+        self._pokemon_scores = None
+        self._side_condition_scores = None
+        self._stale_pokemon = dict()
+        self._stale_side_conditions = set()
+
+        # in debug mode every instruction's change to `state_hash` is cross-checked against a from-scratch hash
+        self.debug_hash = config.debug_state_hash if debug_hash is None else debug_hash
+
         self.apply_instructions = {
             constants.MUTATOR_SWITCH: self.switch,
             constants.MUTATOR_APPLY_VOLATILE_STATUS: self.apply_volatile_status,
@@ -434,177 +573,356 @@ class StateMutator:
             constants.MUTATOR_CHANGE_ITEM: self.reverse_change_item
         }
 
+        # the same methods indexed by opcode, which is how compiled instructions are dispatched
+        self.apply_opcodes = [self.apply_instructions[instruction] for instruction in MUTATOR_INSTRUCTIONS]
+        self.reverse_opcodes = [self.reverse_instructions[instruction] for instruction in MUTATOR_INSTRUCTIONS]
+
+    def _resolve_sides(self):
+        self._sides = (self.state.self, self.state.opponent)
+
     def apply_one(self, instruction):
-        method = self.apply_instructions[instruction[0]]
-        method(*instruction[1:])
+        instruction = compile_instruction(instruction)
+        if self.debug_hash:
+            return self._checked_call(self.apply_opcodes, instruction)
+        self.apply_opcodes[instruction[0]](*instruction[1:])
 
     def apply(self, instructions):
+        if instructions and instructions[0][0].__class__ is str:
+            instructions = compile_instructions(instructions)
+        if profiler.active_profiler is not None:
+            return profiler.time_call('mutator', self._apply, instructions)
+        self._apply(instructions)
+
+    def _apply(self, instructions):
+        if self.debug_hash:
+            for instruction in instructions:
+                self._checked_call(self.apply_opcodes, instruction)
+            return
+        handlers = self.apply_opcodes
         for instruction in instructions:
-            method = self.apply_instructions[instruction[0]]
-            method(*instruction[1:])
+            handlers[instruction[0]](*instruction[1:])
 
     def reverse(self, instructions):
+        if instructions and instructions[0][0].__class__ is str:
+            instructions = compile_instructions(instructions)
+        if profiler.active_profiler is not None:
+            return profiler.time_call('mutator', self._reverse, instructions)
+        self._reverse(instructions)
+
+    def _reverse(self, instructions):
+        if self.debug_hash:
+            for instruction in reversed(instructions):
+                self._checked_call(self.reverse_opcodes, instruction)
+            return
+        handlers = self.reverse_opcodes
         for instruction in reversed(instructions):
-            method = self.reverse_instructions[instruction[0]]
-            method(*instruction[1:])
+            handlers[instruction[0]](*instruction[1:])
+
+    def _checked_call(self, handlers, instruction):
+        # the state may have been modified directly since the mutator was created (tests do this often)
+        # so the incremental change is compared against the change in the from-scratch hash
+        scratch_hash_before = state_hash.hash_state(self.state)
+        incremental_hash_before = self.state_hash
+
+        handlers[instruction[0]](*instruction[1:])
+
+        scratch_delta = scratch_hash_before ^ state_hash.hash_state(self.state)
+        incremental_delta = incremental_hash_before ^ self._state_hash
+        if scratch_delta != incremental_delta:
+            raise StateHashDivergedError("Incremental hash diverged after instruction: {}".format(instruction))
+
+    @property
+    def state_hash(self):
+        if self._state_hash is None:
+            self._state_hash = state_hash.hash_state(self.state)
+        return self._state_hash
+
+    @contextmanager
+    def hash_suspended(self):
+        """`state_hash` is not kept up to date by the instructions applied inside this block
+
+           The block must leave the state as it found it, so the hash from before the block is kept.
+           Generating instructions and evaluating leaves apply and reverse instructions without reading the hash,
+           so keeping it up to date there would be wasted"""
+        state_hash_before = self._state_hash
+        self._state_hash = None
+        yield
+        # not reached if the block raises, which may not have left the state as it found it
+        self._state_hash = state_hash_before
+
+    def rehash(self):
+        # must be called if `self.state` is modified without using this mutator after `state_hash` or `evaluation` has been read
+        self._state_hash = None
+        self._evaluation = None
+
+    @property
+    def evaluation(self):
+        """The same score as `evaluate.evaluate(self.state)`, without re-scoring what has not changed"""
+        if self._evaluation is None:
+            self._score_state()
+        elif self._stale_pokemon or self._stale_side_conditions:
+            self._rescore_stale()
+        return self._evaluation
+
+    @profiler.timed('evaluate')
+    def _score_state(self):
+        sides = (self.state.self, self.state.opponent)
+        self._pokemon_scores = tuple(
+            {pkmn.id: evaluate.evaluate_pokemon(pkmn) for pkmn in [side.active] + list(side.reserve.values())}
+            for side in sides
+        )
+        self._side_condition_scores = [self._score_side_conditions(side) for side in range(len(sides))]
+        self._stale_pokemon.clear()
+        self._stale_side_conditions.clear()
+        self._evaluation = (
+            sum(self._pokemon_scores[0].values()) - sum(self._pokemon_scores[1].values()) +
+            self._side_condition_scores[0] - self._side_condition_scores[1]
+        )
+
+    def _score_side_conditions(self, side):
+        if side == 0:
+            side_object = self.state.self
+            alive_reserves = evaluate.alive_reserve_count(side_object)
+        else:
+            side_object = self.state.opponent
+            alive_reserves = evaluate.alive_reserve_count(side_object, evaluate.unrevealed_opponent_count(self.state))
+        return evaluate.evaluate_side_conditions(side_object.side_conditions, alive_reserves)
+
+    @profiler.timed('evaluate')
+    def _rescore_stale(self):
+        change = [0, 0]
+        for (side, pokemon_id), pkmn in self._stale_pokemon.items():
+            scores = self._pokemon_scores[side]
+            score = evaluate.evaluate_pokemon(pkmn)
+            change[side] += score - scores[pokemon_id]
+            scores[pokemon_id] = score
+        self._stale_pokemon.clear()
+
+        for side in self._stale_side_conditions:
+            score = self._score_side_conditions(side)
+            change[side] += score - self._side_condition_scores[side]
+            self._side_condition_scores[side] = score
+        self._stale_side_conditions.clear()
+
+        self._evaluation += change[0] - change[1]
 
     def get_side(self, side):
-        return getattr(self.state, side)
+        # `side` is a side id
+        return self._sides[side]
 
-    def disable_move(self, side, move_name):
-        side = self.get_side(side)
+    def _set_move_disabled(self, side, move_name, disabled):
+        pkmn = self.get_side(side).active
         try:
-            move = next(filter(lambda x: x[constants.ID] == move_name, side.active.moves))
+            move = next(filter(lambda x: x[constants.ID] == move_name, pkmn.moves))
         except StopIteration:
-            raise ValueError("{} not in pokemon's moves: {}".format(move_name, side.active.moves))
+            raise ValueError("{} not in pokemon's moves: {}".format(move_name, pkmn.moves))
 
-        move[constants.DISABLED] = True
+        if bool(move.get(constants.DISABLED)) != disabled:
+            if self._state_hash is not None:
+                self._state_hash ^= state_hash.disabled_move_key(SIDES[side], pkmn.id, move_name)
+        move[constants.DISABLED] = disabled
 
-    def enable_move(self, side, move_name):
-        side = self.get_side(side)
-        try:
-            move = next(filter(lambda x: x[constants.ID] == move_name, side.active.moves))
-        except StopIteration:
-            raise ValueError("{} not in pokemon's moves: {}".format(move_name, side.active.moves))
+    def disable_move(self, side, move_name):
+        self._set_move_disabled(side, move_name, True)
 
-        move[constants.DISABLED] = False
+    def enable_move(self, side, move_name):
+        self._set_move_disabled(side, move_name, False)
 
     def switch(self, side, _, switch_pokemon_name):
         # the second parameter to this function is the current active pokemon
         # this value must be here for reversing purposes
+        side_id = side
+        side_string = SIDES[side]
         side = self.get_side(side)
 
+        if self._state_hash is not None:
+            self._state_hash ^= state_hash.active_key(side_string, side.active.id) ^ state_hash.active_key(side_string, switch_pokemon_name)
         side.reserve[side.active.id] = side.active
         side.active = side.reserve.pop(switch_pokemon_name)
+        if self._evaluation is not None:
+            # the number of alive reserves may have changed
+            self._stale_side_conditions.add(side_id)
 
     def reverse_switch(self, side, previous_active, current_active):
         self.switch(side, current_active, previous_active)
 
     def apply_volatile_status(self, side, volatile_status):
-        side = self.get_side(side)
-        side.active.volatile_status.add(volatile_status)
+        pkmn = self.get_side(side).active
+        if volatile_status not in pkmn.volatile_status:
+            if self._state_hash is not None:
+                self._state_hash ^= state_hash.volatile_status_key(SIDES[side], pkmn.id, volatile_status)
+            if self._evaluation is not None:
+                self._stale_pokemon[(side, pkmn.id)] = pkmn
+            pkmn.volatile_status.add(volatile_status)
 
     def remove_volatile_status(self, side, volatile_status):
-        side = self.get_side(side)
-        side.active.volatile_status.remove(volatile_status)
+        pkmn = self.get_side(side).active
+        pkmn.volatile_status.remove(volatile_status)
+        if self._state_hash is not None:
+            self._state_hash ^= state_hash.volatile_status_key(SIDES[side], pkmn.id, volatile_status)
+        if self._evaluation is not None:
+            self._stale_pokemon[(side, pkmn.id)] = pkmn
+
+    def _change_hp(self, side, amount):
+        pkmn = self.get_side(side).active
+        new_hp = pkmn.hp + amount
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.hp_key(side_string, pkmn.id, pkmn.hp) ^ state_hash.hp_key(side_string, pkmn.id, new_hp)
+        if self._evaluation is not None:
+            self._stale_pokemon[(side, pkmn.id)] = pkmn
+        pkmn.hp = new_hp
 
     def damage(self, side, amount):
-        side = self.get_side(side)
-        side.active.hp -= amount
+        self._change_hp(side, -amount)
 
     def heal(self, side, amount):
-        side = self.get_side(side)
-        side.active.hp += amount
+        self._change_hp(side, amount)
 
     def boost(self, side, stat, amount):
-        side = self.get_side(side)
-        if stat == constants.ATTACK:
-            side.active.attack_boost += amount
-        elif stat == constants.DEFENSE:
-            side.active.defense_boost += amount
-        elif stat == constants.SPECIAL_ATTACK:
-            side.active.special_attack_boost += amount
-        elif stat == constants.SPECIAL_DEFENSE:
-            side.active.special_defense_boost += amount
-        elif stat == constants.SPEED:
-            side.active.speed_boost += amount
-        elif stat == constants.ACCURACY:
-            side.active.accuracy_boost += amount
-        elif stat == constants.EVASION:
-            side.active.evasion_boost += amount
-        else:
+        try:
+            attribute = state_hash.BOOST_ATTRIBUTES[stat]
+        except KeyError:
             raise ValueError("Invalid stat: {}".format(stat))
 
+        pkmn = self.get_side(side).active
+        old_boost = getattr(pkmn, attribute)
+        new_boost = old_boost + amount
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.boost_key(side_string, pkmn.id, attribute, old_boost) ^ state_hash.boost_key(side_string, pkmn.id, attribute, new_boost)
+        if self._evaluation is not None:
+            self._stale_pokemon[(side, pkmn.id)] = pkmn
+        setattr(pkmn, attribute, new_boost)
+
     def unboost(self, side, stat, amount):
         self.boost(side, stat, -1*amount)
 
     def apply_status(self, side, status):
-        side = self.get_side(side)
-        side.active.status = status
+        pkmn = self.get_side(side).active
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.status_key(side_string, pkmn.id, pkmn.status) ^ state_hash.status_key(side_string, pkmn.id, status)
+        if self._evaluation is not None:
+            self._stale_pokemon[(side, pkmn.id)] = pkmn
+        pkmn.status = status
 
     def remove_status(self, side, _):
         # the second parameter of this function is the status being removed
         # this value must be here for reverse purposes
         self.apply_status(side, None)
 
+    def _set_side_condition(self, side, effect, count):
+        side_conditions = self.get_side(side).side_conditions
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.side_condition_key(side_string, effect, side_conditions[effect]) ^ state_hash.side_condition_key(side_string, effect, count)
+        if self._evaluation is not None:
+            self._stale_side_conditions.add(side)
+        side_conditions[effect] = count
+
     def side_start(self, side, effect, amount):
-        side = self.get_side(side)
-        side.side_conditions[effect] += amount
+        self._set_side_condition(side, effect, self.get_side(side).side_conditions[effect] + amount)
 
     def reverse_side_start(self, side, effect, amount):
-        side = self.get_side(side)
-        side.side_conditions[effect] -= amount
+        self._set_side_condition(side, effect, self.get_side(side).side_conditions[effect] - amount)
 
     def side_end(self, side, effect, _):
         # the third parameter of this function is the amount being removed
         # this value must be here for reverse purposes
-        side = self.get_side(side)
-        side.side_conditions[effect] = 0
+        self._set_side_condition(side, effect, 0)
 
     def reverse_side_end(self, side, effect, amount):
         self.side_start(side, effect, amount)
 
+    def _set_wish(self, side, wish):
+        side_object = self.get_side(side)
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.wish_key(side_string, side_object.wish) ^ state_hash.wish_key(side_string, wish)
+        side_object.wish = wish
+
     def start_wish(self, side, health, _):
         # the third parameter is the current wish amount
         # it is here for reversing purposes
-        side = self.get_side(side)
-        side.wish = (2, health)
+        self._set_wish(side, (2, health))
 
     def reserve_start_wish(self, side, _, previous_wish_amount):
-        side = self.get_side(side)
-        side.wish = (0, previous_wish_amount)
+        self._set_wish(side, (0, previous_wish_amount))
 
     def decrement_wish(self, side):
-        side = self.get_side(side)
-        side.wish = (side.wish[0] - 1, side.wish[1])
+        wish = self.get_side(side).wish
+        self._set_wish(side, (wish[0] - 1, wish[1]))
 
     def reverse_decrement_wish(self, side):
-        side = self.get_side(side)
-        side.wish = (side.wish[0] + 1, side.wish[1])
+        wish = self.get_side(side).wish
+        self._set_wish(side, (wish[0] + 1, wish[1]))
+
+    def _set_weather(self, weather):
+        if self._state_hash is not None:
+            self._state_hash ^= state_hash.weather_key(self.state.weather) ^ state_hash.weather_key(weather)
+        self.state.weather = weather
 
     def start_weather(self, weather, _):
         # the second parameter is the current weather
         # the value is here for reversing purposes
-        self.state.weather = weather
+        self._set_weather(weather)
 
     def reverse_start_weather(self, _, old_weather):
-        self.state.weather = old_weather
+        self._set_weather(old_weather)
+
+    def _set_field(self, field):
+        if self._state_hash is not None:
+            self._state_hash ^= state_hash.field_key(self.state.field) ^ state_hash.field_key(field)
+        self.state.field = field
 
     def start_field(self, field, _):
         # the second parameter is the current field
         # the value is here for reversing purposes
-        self.state.field = field
+        self._set_field(field)
 
     def reverse_start_field(self, _, old_field):
-        self.state.field = old_field
+        self._set_field(old_field)
 
     def end_field(self, _):
         # the second parameter is the current field
         # the value is here for reversing purposes
-        self.state.field = None
+        self._set_field(None)
 
     def reverse_end_field(self, old_field):
-        self.state.field = old_field
+        self._set_field(old_field)
 
     def toggle_trickroom(self):
+        if self._state_hash is not None:
+            self._state_hash ^= state_hash.trick_room_key(self.state.trick_room) ^ state_hash.trick_room_key(not self.state.trick_room)
         self.state.trick_room ^= True
 
+    def _set_types(self, side, types):
+        pkmn = self.get_side(side).active
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.types_key(side_string, pkmn.id, pkmn.types) ^ state_hash.types_key(side_string, pkmn.id, types)
+        pkmn.types = types
+
     def change_types(self, side, new_types, _):
         # the third parameter is the current types of the active pokemon
         # they must be here for reversing purposes
-        side = self.get_side(side)
-        side.active.types = new_types
+        self._set_types(side, new_types)
 
     def reverse_change_types(self, side, _, old_types):
-        side = self.get_side(side)
-        side.active.types = old_types
+        self._set_types(side, old_types)
+
+    def _set_item(self, side, item):
+        pkmn = self.get_side(side).active
+        if self._state_hash is not None:
+            side_string = SIDES[side]
+            self._state_hash ^= state_hash.item_key(side_string, pkmn.id, pkmn.item) ^ state_hash.item_key(side_string, pkmn.id, item)
+        pkmn.item = item
 
     def change_item(self, side, new_item, _):
         # the third parameter is the current item
         # it must be here for reversing purposes
-        side = self.get_side(side)
-        side.active.item = new_item
+        self._set_item(side, new_item)
 
     def reverse_change_item(self, side, _, old_item):
-        side = self.get_side(side)
-        side.active.item = old_item
+        self._set_item(side, old_item)
@@ -0,0 +1,180 @@
+import concurrent.futures
+
+import config
+from data.mods.apply_mods import apply_mods
+
+from . import profiler
+from .evaluate import Scoring
+from .move_ordering import get_move_orderer
+from .objects import StateMutator
+from .select_best_move import get_payoff_matrix
+from .select_best_move import iterative_deepening_payoff_matrix
+from .transposition_table import SEARCH_SETTINGS
+from .transposition_table import get_search_settings
+from .transposition_table import get_transposition_table
+
+
+_executor = None
+_pending_futures = set()
+
+# the settings that this process has been initialized with when it is a worker
+_worker_settings = None
+
+
+def _get_worker_settings():
+    return config.pokemon_mode, get_search_settings(), Scoring.POKEMON_ALIVE_STATIC
+
+
+def _initialize_worker(pokemon_mode, search_settings, pokemon_alive_static):
+    # a worker may be started with a fresh interpreter, so the settings that change the search are copied over
+    # workers never start their own pool
+    if pokemon_mode is not None:
+        apply_mods(pokemon_mode)
+    for name, value in zip(SEARCH_SETTINGS, search_settings):
+        setattr(config, name, value)
+    config.search_processes = 1
+    Scoring.POKEMON_ALIVE_STATIC = pokemon_alive_static
+
+
+def _run_task(worker_settings, profile, function, *args):
+    # ProcessPoolExecutor has no `initializer` before python3.7,
+    # so a worker is initialized by the first task it is given
+    global _worker_settings
+    if _worker_settings != worker_settings:
+        _initialize_worker(*worker_settings)
+        _worker_settings = worker_settings
+    return profiler.run_profiled(profile, function, *args)
+
+
+def get_executor():
+    """Returns the persistent process-pool used for searching
+
+       The pool is created the first time it is needed so the battle's settings are in place beforehand"""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers=config.search_processes)
+    return _executor
+
+
+def shutdown_executor():
+    """Stops the process-pool, dropping any tasks that have not started yet"""
+    global _executor
+    if _executor is not None:
+        # `shutdown(cancel_futures=True)` is not available before python3.9
+        for future in list(_pending_futures):
+            future.cancel()
+        _executor.shutdown()
+        _executor = None
+
+
+def _search(state, user_options, opponent_options, depth, prune, deadline):
+    mutator = StateMutator(state)
+    return get_payoff_matrix(
+        mutator,
+        user_options,
+        opponent_options,
+        depth=depth,
+        prune=prune,
+        transposition_table=get_transposition_table(),
+        deadline=deadline,
+        move_orderer=get_move_orderer()
+    )
+
+
+def submit(executor, function, *args):
+    # a worker profiles its search when the decision it is searching for is being profiled
+    future = executor.submit(_run_task, _get_worker_settings(), profiler.get_active_profiler() is not None, function, *args)
+    _pending_futures.add(future)
+    future.add_done_callback(_pending_futures.discard)
+    return future
+
+
+def gather_results(futures):
+    """Waits for the results of the tasks given to `submit`, adding the workers' profiles to the active profiler
+
+       Results are collected in submission order so the merged dictionary has the same order as a serial search"""
+    try:
+        results = [f.result() for f in futures]
+    except BaseException:
+        for f in futures:
+            f.cancel()
+        raise
+
+    active_profiler = profiler.get_active_profiler()
+    if active_profiler is not None:
+        for _, summary in results:
+            if summary is not None:
+                active_profiler.merge(summary)
+    return [result for result, _ in results]
+
+
+def get_payoff_matrix_parallel(mutator, user_options, opponent_options, depth=2, prune=True, transposition_table=None, deadline=None, move_orderer=None):
+    """
+    A drop-in replacement for `get_payoff_matrix` that splits the root of the search across worker processes
+
+    When pruning, each of the bot's options is searched by a separate worker.
+    Rows cannot prune one another, so cells that a serial search would skip are given real scores.
+    Without pruning every (bot option, opponent option) cell is searched by a separate worker.
+
+    `transposition_table` and `move_orderer` are ignored: each worker keeps a transposition table and move orderer of its own
+    """
+    if mutator.state.battle_is_finished() or depth <= 0:
+        return get_payoff_matrix(mutator, user_options, opponent_options, depth=depth, prune=prune, transposition_table=transposition_table, deadline=deadline, move_orderer=move_orderer)
+
+    if prune:
+        tasks = [([user_option], opponent_options) for user_option in user_options]
+    else:
+        tasks = [([user_option], [opponent_option]) for user_option in user_options for opponent_option in opponent_options]
+
+    executor = get_executor()
+    futures = [
+        submit(executor, _search, mutator.state, task_user_options, task_opponent_options, depth, prune, deadline)
+        for task_user_options, task_opponent_options in tasks
+    ]
+
+    state_scores = dict()
+    for scores in gather_results(futures):
+        state_scores.update(scores)
+
+    return state_scores
+
+
+def _iterative_deepening_search(state, user_options, opponent_options, max_depth, time_budget, prune):
+    mutator = StateMutator(state)
+    return iterative_deepening_payoff_matrix(
+        mutator,
+        user_options,
+        opponent_options,
+        max_depth,
+        time_budget,
+        prune=prune,
+        transposition_table=get_transposition_table(),
+        move_orderer=get_move_orderer()
+    )
+
+
+def search_states(searches, max_depth, time_budget, prune=True):
+    """
+    Runs an iterative-deepening search for each (state, user_options, opponent_options) in `searches`
+    Each state is independent, so when there are worker processes available the states are searched in parallel
+
+    :param time_budget: the number of seconds available for all of the searches
+    :return: a list of (score-lookup, completed depth) in the same order as `searches`
+    """
+    if config.search_processes <= 1 or len(searches) <= 1:
+        # a single state can still use the workers - its root is split across them
+        time_budget_per_search = time_budget / max(len(searches), 1)
+        return [
+            _iterative_deepening_search(state, user_options, opponent_options, max_depth, time_budget_per_search, prune)
+            for state, user_options, opponent_options in searches
+        ]
+
+    # every worker gets an equal share of the time available
+    time_budget_per_search = time_budget * min(1, config.search_processes / len(searches))
+
+    executor = get_executor()
+    futures = [
+        submit(executor, _iterative_deepening_search, state, user_options, opponent_options, max_depth, time_budget_per_search, prune)
+        for state, user_options, opponent_options in searches
+    ]
+    return gather_results(futures)
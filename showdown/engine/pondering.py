@@ -0,0 +1,161 @@
+import threading
+import time
+from copy import deepcopy
+
+import config
+from config import logger
+
+from .objects import StateMutator
+from .select_best_move import get_payoff_matrix
+from .select_best_move import SearchTimeout
+from .damage_calculator import get_damage_calculation_cache
+from .find_state_instructions import get_all_state_instructions_cached
+from .find_state_instructions import get_state_instruction_cache
+from .move_ordering import MoveOrderer
+from .move_ordering import get_move_orderer
+from .transposition_table import LRUCache
+from .transposition_table import TranspositionTable
+from .transposition_table import get_transposition_table
+from .transposition_table import private_caches
+
+
+def get_likely_positions(state, user_option, opponent_options, max_positions, cancelled=None):
+    """The positions that `user_option` can lead to next turn, as (probability, state) with the most likely first
+
+       Each of the opponent's options is assumed to be equally likely. Outcomes that lead to the same position are combined.
+       SearchTimeout is raised if `cancelled`, a threading.Event, is set"""
+    mutator = StateMutator(state)
+    positions = dict()
+    for opponent_option in opponent_options:
+        if cancelled is not None and cancelled.is_set():
+            raise SearchTimeout()
+        for transpose_instruction in get_all_state_instructions_cached(mutator, user_option, opponent_option):
+            mutator.apply(transpose_instruction.instructions)
+            probability = transpose_instruction.percentage / len(opponent_options)
+            state_hash = mutator.state_hash
+            if state_hash in positions:
+                positions[state_hash][0] += probability
+            else:
+                positions[state_hash] = [probability, deepcopy(mutator.state)]
+            mutator.reverse(transpose_instruction.instructions)
+
+    positions = sorted(positions.values(), key=lambda p: p[0], reverse=True)
+    return [(probability, position) for probability, position in positions[:max_positions]]
+
+
+class Ponderer:
+    """Searches the likely next-turn positions in a background thread while the opponent is choosing their move
+
+       The search uses a transposition table, move orderer, state-instruction cache and damage-calculation cache of its own,
+       as the engine's shared ones are not thread-safe. `stop` merges them into the shared ones,
+       so the search of the next turn starts with them warm. A position that turns out to be the real one is not searched again"""
+
+    def __init__(self):
+        self._thread = None
+        self._cancelled = None
+        self._copied = None
+        self._caches = None
+        self.positions = 0
+        self.positions_searched = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, battle, prepare, max_depth, time_budget, prune):
+        """Ponders the position that `prepare` makes from a copy of `battle`
+
+           `prepare` returns the (state, user_option, opponent_options) to ponder, or None when there is nothing to ponder.
+           The copy is made in the background thread, so `battle` must not be changed until `wait_until_copied` returns.
+           Each likely position is searched the way the bot will search it: to `max_depth`, for at most `time_budget` seconds,
+           and pruned or not, as the transposition table keeps pruned and unpruned searches apart"""
+        self.stop()
+        self._cancelled = threading.Event()
+        self._copied = threading.Event()
+        self._caches = {
+            'transposition_table': TranspositionTable(config.transposition_table_size),
+            'move_orderer': MoveOrderer(),
+            'state_instruction_cache': LRUCache(config.state_instruction_cache_size),
+            'damage_calculation_cache': LRUCache(config.damage_calculation_cache_size),
+        }
+        self._thread = threading.Thread(
+            target=self._ponder,
+            args=(battle, prepare, max_depth, time_budget, prune, self._cancelled, self._copied, self._caches),
+            name="ponder",
+            daemon=True
+        )
+        self._thread.start()
+
+    def wait_until_copied(self):
+        if self._copied is not None:
+            self._copied.wait()
+
+    def stop(self):
+        """Cancels the search and waits for the thread to finish, which takes at most the expansion of one node
+
+           What the search found is then merged into the engine's shared caches"""
+        if self._thread is None:
+            return
+        self._cancelled.set()
+        self._thread.join()
+        self._thread = None
+        self._copied = None
+
+        get_transposition_table().merge(self._caches['transposition_table'])
+        get_move_orderer().merge(self._caches['move_orderer'])
+        get_state_instruction_cache().merge(self._caches['state_instruction_cache'])
+        get_damage_calculation_cache().merge(self._caches['damage_calculation_cache'])
+        self._caches = None
+        logger.debug("Pondered {} of {} positions".format(self.positions_searched, self.positions))
+
+    def _ponder(self, battle, prepare, max_depth, time_budget, prune, cancelled, copied, caches):
+        self.positions = 0
+        self.positions_searched = 0
+        try:
+            try:
+                battle = deepcopy(battle)
+            finally:
+                copied.set()
+
+            with private_caches(state_instruction_cache=caches['state_instruction_cache'], damage_calculation_cache=caches['damage_calculation_cache']):
+                position = prepare(battle)
+                if position is None:
+                    return
+                state, user_option, opponent_options = position
+
+                positions = get_likely_positions(state, user_option, opponent_options, config.ponder_max_positions, cancelled)
+                self.positions = len(positions)
+
+                for _, position in positions:
+                    self._ponder_position(position, max_depth, time_budget, prune, cancelled, caches)
+                    self.positions_searched += 1
+        except SearchTimeout:
+            pass
+        except Exception:
+            # pondering is only an optimization, so it must not stop the battle
+            logger.exception("Pondering failed")
+
+    @staticmethod
+    def _ponder_position(position, max_depth, time_budget, prune, cancelled, caches):
+        # the next turn's search deepens one ply at a time, so the shallower searches are useful to it too.
+        # like that search, depth 1 is always completed and it goes no deeper than its time budget allows
+        mutator = StateMutator(position)
+        user_options, opponent_options = position.get_all_options()
+        deadline = time.time() + time_budget
+        for depth in range(1, max_depth + 1):
+            try:
+                get_payoff_matrix(mutator, user_options, opponent_options, depth=depth, prune=prune, transposition_table=caches['transposition_table'], deadline=deadline if depth > 1 else None, move_orderer=caches['move_orderer'], cancelled=cancelled)
+            except SearchTimeout:
+                if cancelled.is_set():
+                    raise
+                return
+
+
+_ponderer = None
+
+
+def get_ponderer():
+    global _ponderer
+    if _ponderer is None:
+        _ponderer = Ponderer()
+    return _ponderer
@@ -0,0 +1,127 @@
+import functools
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# the profiler collecting for the decision being made, if that decision is being profiled
+# every instrumented function checks this first, so an unprofiled decision pays for one lookup per call
+active_profiler = None
+
+
+class SearchProfiler:
+    """Counts the work done while making one decision and the time spent in each subsystem
+
+       Times are inclusive and are only recorded by the outermost call of a subsystem, so recursive
+       searches are not counted twice. Subsystems can still contain one another (generating instructions
+       applies and reverses instructions), so the times do not add up to the wall time"""
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._depths = defaultdict(int)
+        self._start_time = time.perf_counter()
+        self._wall_seconds = None
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def stop(self):
+        self._wall_seconds = time.perf_counter() - self._start_time
+
+    @property
+    def wall_seconds(self):
+        if self._wall_seconds is None:
+            return time.perf_counter() - self._start_time
+        return self._wall_seconds
+
+    def merge(self, summary):
+        # adds the summary of a profiler from another process, i.e. a search worker
+        for name, amount in summary['counters'].items():
+            self.counters[name] += amount
+        for subsystem, seconds in summary['seconds'].items():
+            self.seconds[subsystem] += seconds
+
+    def summary(self):
+        summary = {
+            'wall_seconds': round(self.wall_seconds, 6),
+            'counters': dict(self.counters),
+            'seconds': {subsystem: round(seconds, 6) for subsystem, seconds in self.seconds.items()},
+        }
+        if self.counters['state_instruction_calls']:
+            summary['instruction_sets_per_node'] = round(self.counters['instruction_sets'] / self.counters['state_instruction_calls'], 3)
+        return summary
+
+
+def count(name, amount=1):
+    profiler = active_profiler
+    if profiler is not None:
+        profiler.counters[name] += amount
+
+
+def time_call(subsystem, function, *args, **kwargs):
+    """Calls `function`, adding the time it takes to `subsystem` if a decision is being profiled"""
+    profiler = active_profiler
+    if profiler is None:
+        return function(*args, **kwargs)
+
+    depths = profiler._depths
+    depths[subsystem] += 1
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        depths[subsystem] -= 1
+        if not depths[subsystem]:
+            profiler.seconds[subsystem] += time.perf_counter() - start
+
+
+def timed(subsystem):
+    """Adds the time spent in the decorated function to `subsystem` when a decision is being profiled
+
+       This costs an extra call even when nothing is being profiled, so the hottest functions
+       check `active_profiler` themselves and use `time_call` instead"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if active_profiler is None:
+                return function(*args, **kwargs)
+            return time_call(subsystem, function, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_active_profiler():
+    return active_profiler
+
+
+@contextmanager
+def profiling(sample_rate=1.0):
+    """Profiles the work done inside the block with a probability of `sample_rate`
+
+       Yields the SearchProfiler, or None if this block is not sampled"""
+    global active_profiler
+    if active_profiler is not None or sample_rate <= 0 or random.random() >= sample_rate:
+        # a block inside a profiled block is counted by the outer profiler
+        yield None
+        return
+
+    profiler = SearchProfiler()
+    active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        active_profiler = None
+
+
+def run_profiled(profile, function, *args):
+    """Runs `function` in a search worker, returning its result and the summary of its profile
+
+       `profile` is whether the decision that the worker is searching for is being profiled"""
+    if not profile:
+        return function(*args), None
+    with profiling() as profiler:
+        result = function(*args)
+    return result, profiler.summary()
@@ -1,14 +1,25 @@
 import math
+import time
 from collections import defaultdict
 
+import config
 import constants
+from config import logger
 
-from .evaluate import evaluate
-from .find_state_instructions import get_all_state_instructions
+from . import profiler
+from .evaluate import evaluation_bounds
+from .find_state_instructions import get_all_state_instructions_cached
 
 
 WON_BATTLE = 100
 
+# guards the chance-node cutoff against floating-point error in the accumulated percentages
+CHANCE_CUTOFF_TOLERANCE = 1e-6
+
+
+class SearchTimeout(Exception):
+    pass
+
 
 def remove_guaranteed_opponent_moves(score_lookup):
     """This method removes enemy moves from the score-lookup that do not give the bot a choice.
@@ -23,13 +34,16 @@ def remove_guaranteed_opponent_moves(score_lookup):
         return score_lookup
 
     # find the opponent's moves where the bot has a choice
+    # a cell that was pruned is NaN and does not show whether there is a choice
     opponent_move_scores = dict()
     opponent_decisions = set()
     for k, score in score_lookup.items():
+        if math.isnan(score):
+            continue
         opponent_move = k[1]
         if opponent_move not in opponent_move_scores:
             opponent_move_scores[opponent_move] = score
-        elif opponent_move in opponent_move_scores and score != opponent_move_scores[opponent_move] and not math.isnan(score):
+        elif score != opponent_move_scores[opponent_move]:
             opponent_decisions.add(opponent_move)
 
     # re-create score_lookup with only the opponent's move acquired above
@@ -62,19 +76,46 @@ def move_item_to_front_of_list(l, item):
     return [l[i] for i in all_indicies]
 
 
-def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=True):
+@profiler.timed('search')
+def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=True, transposition_table=None, deadline=None, move_orderer=None, cancelled=None):
     """
     :param mutator: a StateMutator object representing the state of the battle
     :param user_options: options for the bot
     :param opponent_options: options for the opponent
     :param depth: the remaining depth before the state is evaluated
     :param prune: specify whether or not to prune the tree
+    :param transposition_table: an optional TranspositionTable used to re-use the results of positions already searched
+    :param deadline: an optional `time.time()` value - SearchTimeout is raised if a node is expanded after it has passed
+    :param move_orderer: an optional MoveOrderer used to search the options most likely to prune first
+    :param cancelled: an optional threading.Event - SearchTimeout is raised if a node is expanded after it is set
     :return: a dictionary representing the potential move combinations and their associated scores
+             the dictionary may be shared with the transposition table and must not be modified
     """
+    if deadline is not None and time.time() > deadline:
+        raise SearchTimeout()
+    if cancelled is not None and cancelled.is_set():
+        raise SearchTimeout()
+
+    if transposition_table is None:
+        return _calculate_payoff_matrix(mutator, user_options, opponent_options, depth, prune, transposition_table, deadline, move_orderer, cancelled)
+
+    key = transposition_table.make_key(mutator.state_hash, depth, user_options, opponent_options, prune)
+    state_scores = transposition_table.get(key)
+    if state_scores is not None:
+        profiler.count('transposition_hits')
+    else:
+        state_scores = _calculate_payoff_matrix(mutator, user_options, opponent_options, depth, prune, transposition_table, deadline, move_orderer, cancelled)
+        transposition_table.put(key, state_scores)
+
+    return state_scores
+
 
+def _calculate_payoff_matrix(mutator, user_options, opponent_options, depth, prune, transposition_table, deadline, move_orderer, cancelled):
+    profiler.count('nodes')
     winner = mutator.state.battle_is_finished()
     if winner:
-        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate(mutator.state) + WON_BATTLE*depth*winner}
+        profiler.count('leaves')
+        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): mutator.evaluation + WON_BATTLE*depth*winner}
 
     depth -= 1
 
@@ -82,39 +123,40 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
     # this is a special case in a random battle where the opponent's pokemon has fainted, but the opponent still
     # has reserves left that are unseen
     if opponent_options == [constants.DO_NOTHING_MOVE] and mutator.state.opponent.active.hp == 0:
-        return {(user_option, constants.DO_NOTHING_MOVE): evaluate(mutator.state) for user_option in user_options}
+        profiler.count('leaves')
+        return {(user_option, constants.DO_NOTHING_MOVE): mutator.evaluation for user_option in user_options}
 
     state_scores = dict()
 
+    if prune:
+        # no outcome of a chance-node can score higher than this
+        # a battle won deeper in the tree scores WON_BATTLE for each turn left
+        upper_bound = evaluation_bounds(mutator.state)[1] + WON_BATTLE*depth
+    else:
+        upper_bound = float('inf')
+
+    # ordering only changes which cells are pruned
+    if prune and move_orderer is not None:
+        searched_user_options = move_orderer.order_user_options(mutator.state, user_options, depth)
+        searched_opponent_options = move_orderer.order_opponent_options(mutator.state, opponent_options, depth)
+    else:
+        searched_user_options = user_options
+        searched_opponent_options = opponent_options
+
     best_score = float('-inf')
-    for i, user_move in enumerate(user_options):
+    best_user_move = None
+    for user_move in searched_user_options:
         worst_score_for_this_row = float('inf')
         skip = False
 
-        # opponent_options can change during the loop
-        # using opponent_options[:] makes a copy when iterating to ensure no funny-business
-        for j, opponent_move in enumerate(opponent_options[:]):
+        # searched_opponent_options can change during the loop
+        # using searched_opponent_options[:] makes a copy when iterating to ensure no funny-business
+        for j, opponent_move in enumerate(searched_opponent_options[:]):
             if skip:
                 state_scores[(user_move, opponent_move)] = float('nan')
                 continue
 
-            score = 0
-            state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
-            if depth == 0:
-                for instructions in state_instructions:
-                    mutator.apply(instructions.instructions)
-                    t_score = evaluate(mutator.state)
-                    score += (t_score * instructions.percentage)
-                    mutator.reverse(instructions.instructions)
-
-            else:
-                for instructions in state_instructions:
-                    this_percentage = instructions.percentage
-                    mutator.apply(instructions.instructions)
-                    next_turn_user_options, next_turn_opponent_options = mutator.state.get_all_options()
-                    safest = pick_safest(get_payoff_matrix(mutator, next_turn_user_options, next_turn_opponent_options, depth=depth, prune=prune))
-                    score += safest[1] * this_percentage
-                    mutator.reverse(instructions.instructions)
+            score = _score_cell(mutator, user_move, opponent_move, depth, prune, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled)
 
             state_scores[(user_move, opponent_move)] = score
 
@@ -122,13 +164,166 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
                 worst_score_for_this_row = score
 
             if prune and score < best_score:
+                profiler.count('row_prunes')
                 skip = True
+                if move_orderer is not None:
+                    move_orderer.record_cutoff(opponent_move, depth, j == 0)
 
                 # MOST of the time in pokemon, an opponent's move that causes a prune will cause a prune elsewhere
                 # move this item to the front of the list to prune faster
-                opponent_options = move_item_to_front_of_list(opponent_options, opponent_move)
+                searched_opponent_options = move_item_to_front_of_list(searched_opponent_options, opponent_move)
 
         if worst_score_for_this_row > best_score:
             best_score = worst_score_for_this_row
+            best_user_move = user_move
+
+    if prune:
+        _search_undecided_columns(mutator, state_scores, user_options, opponent_options, depth, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled)
+
+    if move_orderer is not None and prune and best_user_move is not None:
+        move_orderer.record_best_user_option(best_user_move, depth)
+
+        # the score-lookup is returned in the order of the options given so ties are broken the same way
+        state_scores = {(u, o): state_scores[(u, o)] for u in user_options for o in opponent_options}
 
     return state_scores
+
+
+def _score_cell(mutator, user_move, opponent_move, depth, prune, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled):
+    state_instructions = get_all_state_instructions_cached(mutator, user_move, opponent_move)
+    if depth == 0:
+        # the outcomes are only evaluated, so their hash is never read
+        with mutator.hash_suspended():
+            return _score_outcomes(mutator, state_instructions, depth, prune, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled)
+    return _score_outcomes(mutator, state_instructions, depth, prune, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled)
+
+
+def _score_outcomes(mutator, state_instructions, depth, prune, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled):
+    score = 0
+    remaining_percentage = sum(instructions.percentage for instructions in state_instructions)
+    for instructions in state_instructions:
+        this_percentage = instructions.percentage
+        mutator.apply(instructions.instructions)
+        if depth == 0:
+            profiler.count('leaves')
+            t_score = mutator.evaluation
+            mutator.reverse(instructions.instructions)
+        else:
+            try:
+                next_turn_user_options, next_turn_opponent_options = mutator.state.get_all_options()
+                t_score = pick_safest(get_payoff_matrix(mutator, next_turn_user_options, next_turn_opponent_options, depth=depth, prune=prune, transposition_table=transposition_table, deadline=deadline, move_orderer=move_orderer, cancelled=cancelled))[1]
+            finally:
+                # a SearchTimeout must leave the state as it was found
+                mutator.reverse(instructions.instructions)
+        score += t_score * this_percentage
+        remaining_percentage -= this_percentage
+
+        # even if every outcome left scored as highly as possible this cell would prune the row,
+        # so the remaining outcomes cannot change the decision and are not searched.
+        # the cell is given this upper-bound, which is still lower than `best_score`
+        if remaining_percentage > 0:
+            cell_upper_bound = score + remaining_percentage * upper_bound
+            if cell_upper_bound < best_score - CHANCE_CUTOFF_TOLERANCE:
+                profiler.count('chance_cutoffs')
+                return cell_upper_bound
+
+    return score
+
+
+def _search_undecided_columns(mutator, state_scores, user_options, opponent_options, depth, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled):
+    """
+    Searches the skipped cells of each opponent's move whose searched cells all have the same score
+
+    `remove_guaranteed_opponent_moves` removes an opponent's move when every one of its cells has the same score,
+    which cannot be known while some of them were skipped. A row is only pruned by a cell lower than the best row's,
+    so the rows that were pruned cannot be the safest, and once every opponent's move is known to give the bot a choice
+    or not, `pick_safest` gives the same result as it would if no cell had been pruned.
+    This keeps the result independent of the order the options are searched in
+    """
+    if len(user_options) == 1 or len(opponent_options) == 1:
+        return
+
+    for opponent_move in opponent_options:
+        skipped = [u for u in user_options if math.isnan(state_scores[(u, opponent_move)])]
+        if not skipped:
+            continue
+
+        searched_scores = {state_scores[(u, opponent_move)] for u in user_options if u not in skipped}
+        if len(searched_scores) > 1:
+            continue
+
+        for user_move in skipped:
+            profiler.count('undecided_cells')
+            score = _score_cell(mutator, user_move, opponent_move, depth, True, upper_bound, best_score, transposition_table, deadline, move_orderer, cancelled)
+            state_scores[(user_move, opponent_move)] = score
+            if score not in searched_scores:
+                break
+
+
+def get_retained_payoff_matrix(mutator, user_options, opponent_options, max_depth, prune, transposition_table, move_orderer):
+    """
+    Looks for a search of this position that was made before, usually as part of last turn's search, when the
+    position was one of the outcomes that was searched. Its options may have been in a different order
+
+    The bot's best option in it is searched first from now on.
+    If it searched every one of these options, and no deeper than `max_depth`, it is used in place of the searches up to its depth.
+    A pruned search is only used when it searched exactly these options:
+    its bounds and skipped cells are only meaningful against the other options it was searched with
+
+    :return: the score-lookup in the order of the options given, and its depth, or (None, 0)
+    """
+    if transposition_table is None:
+        return None, 0
+
+    retained = transposition_table.get_deepest(mutator.state_hash, prune)
+    if retained is None:
+        return None, 0
+
+    depth, retained_scores = retained
+    if move_orderer is not None:
+        move_orderer.record_best_user_option(pick_safest(retained_scores)[0][0], depth)
+
+    if depth > max_depth or any((u, o) not in retained_scores for u in user_options for o in opponent_options):
+        return None, 0
+    if prune and len(retained_scores) != len(user_options) * len(opponent_options):
+        return None, 0
+
+    profiler.count('retained_roots')
+    logger.debug("Reusing a search of depth {} made before".format(depth))
+    return {(u, o): retained_scores[(u, o)] for u in user_options for o in opponent_options}, depth
+
+
+def iterative_deepening_payoff_matrix(mutator, user_options, opponent_options, max_depth, time_budget, prune=True, transposition_table=None, move_orderer=None):
+    """
+    Searches to depth 1, then 2, then 3... until `max_depth` is reached or `time_budget` seconds have passed
+    Depth 1 is always completed. An iteration that runs out of time is abandoned
+    Each iteration orders its options using what `move_orderer` learned from the shallower ones
+
+    :return: the score-lookup of the deepest completed iteration, and that depth
+    """
+    deadline = time.time() + time_budget
+
+    if config.search_processes > 1:
+        from .parallel_search import get_payoff_matrix_parallel as search
+    else:
+        search = get_payoff_matrix
+
+    if move_orderer is not None:
+        move_orderer.age()
+
+    scores, completed_depth = get_retained_payoff_matrix(mutator, user_options, opponent_options, max_depth, prune, transposition_table, move_orderer)
+    if scores is None:
+        scores = search(mutator, user_options, opponent_options, depth=1, prune=prune, transposition_table=transposition_table, move_orderer=move_orderer)
+        completed_depth = 1
+
+    # a single option for the bot means searching deeper cannot change the decision
+    while completed_depth < max_depth and len(user_options) > 1 and time.time() < deadline:
+        try:
+            scores = search(mutator, user_options, opponent_options, depth=completed_depth+1, prune=prune, transposition_table=transposition_table, deadline=deadline, move_orderer=move_orderer)
+        except SearchTimeout:
+            logger.debug("Ran out of time searching depth {}".format(completed_depth + 1))
+            break
+        completed_depth += 1
+
+    logger.debug("Completed a search of depth {}".format(completed_depth))
+    return scores, completed_depth
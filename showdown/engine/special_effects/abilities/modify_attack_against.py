@@ -107,7 +107,7 @@ def thickfat(attacking_move, attacking_pokemon, defending_pokemon):
 
 
 def solidrock(attacking_move, attacking_pokemon, defending_pokemon):
-    if is_super_effective(attacking_move[constants.TYPE], defending_pokemon.types):
+    if is_super_effective(attacking_move[constants.TYPE], defending_pokemon.type_ids):
         attacking_move = attacking_move.copy()
         attacking_move[constants.BASE_POWER] *= (3/4)
     return attacking_move
@@ -193,7 +193,7 @@ def roughskin(attacking_move, attacking_pokemon, defending_pokemon):
 
 
 def wonderguard(attacking_move, attacking_pokemon, defending_pokemon):
-    if not is_super_effective(attacking_move[constants.TYPE], defending_pokemon.types):
+    if not is_super_effective(attacking_move[constants.TYPE], defending_pokemon.type_ids):
         attacking_move = attacking_move.copy()
         attacking_move[constants.BASE_POWER] = 0
     return attacking_move
@@ -336,7 +336,7 @@ def weakarmor(attacking_move, attacking_pokemon, defending_pokemon):
 def liquidooze(attacking_move, attacking_pokemon, defending_pokemon):
     if constants.DRAIN in attacking_move:
         attacking_move = attacking_move.copy()
-        attacking_move[constants.DRAIN] = attacking_move[constants.DRAIN].copy()
+        attacking_move[constants.DRAIN] = list(attacking_move[constants.DRAIN])
         attacking_move[constants.DRAIN][0] *= -1
 
     return attacking_move
@@ -27,7 +27,7 @@ def lifeorb(attacking_move, attacking_pokemon, defending_pokemon):
 
 
 def expertbelt(attacking_move, attacking_pokemon, defending_pokemon):
-    if is_super_effective(attacking_move[constants.TYPE], defending_pokemon.types):
+    if is_super_effective(attacking_move[constants.TYPE], defending_pokemon.type_ids):
         attacking_move = attacking_move.copy()
         attacking_move[constants.BASE_POWER] *= 1.2
     return attacking_move
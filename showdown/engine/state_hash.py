@@ -0,0 +1,142 @@
+from functools import lru_cache
+
+import constants
+
+
+MASK_64 = (1 << 64) - 1
+
+BOOST_ATTRIBUTES = {
+    constants.ATTACK: 'attack_boost',
+    constants.DEFENSE: 'defense_boost',
+    constants.SPECIAL_ATTACK: 'special_attack_boost',
+    constants.SPECIAL_DEFENSE: 'special_defense_boost',
+    constants.SPEED: 'speed_boost',
+    constants.ACCURACY: 'accuracy_boost',
+    constants.EVASION: 'evasion_boost',
+}
+
+
+@lru_cache(maxsize=1 << 16)
+def zobrist_key(*components):
+    """Returns a pseudo-random 64-bit key for one feature of a state
+
+       Equal components always give the same key, so a numeric value gives the same key as an int or a float
+       The splitmix64 finalizer spreads the bits of Python's hash so XOR-ing keys together rarely collides"""
+    z = (hash(components) + 0x9E3779B97F4A7C15) & MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return z ^ (z >> 31)
+
+
+def hp_key(side, pkmn_id, hp):
+    return zobrist_key(side, pkmn_id, constants.HITPOINTS, hp)
+
+
+def boost_key(side, pkmn_id, boost_attribute, amount):
+    return zobrist_key(side, pkmn_id, boost_attribute, amount)
+
+
+def status_key(side, pkmn_id, status):
+    return zobrist_key(side, pkmn_id, constants.STATUS, status)
+
+
+def volatile_status_key(side, pkmn_id, volatile_status):
+    return zobrist_key(side, pkmn_id, constants.VOLATILE_STATUS, volatile_status)
+
+
+def disabled_move_key(side, pkmn_id, move_name):
+    return zobrist_key(side, pkmn_id, constants.DISABLED, move_name)
+
+
+def types_key(side, pkmn_id, types):
+    return zobrist_key(side, pkmn_id, constants.TYPES, tuple(types))
+
+
+def item_key(side, pkmn_id, item):
+    return zobrist_key(side, pkmn_id, constants.ITEM, item)
+
+
+def active_key(side, pkmn_id):
+    return zobrist_key(side, constants.ACTIVE, pkmn_id)
+
+
+def side_condition_key(side, condition, count):
+    # a side-condition with a count of 0 is the same as one that is not in the dictionary
+    if not count:
+        return 0
+    return zobrist_key(side, constants.SIDE_CONDITIONS, condition, count)
+
+
+def wish_key(side, wish):
+    return zobrist_key(side, constants.WISH, tuple(wish))
+
+
+def weather_key(weather):
+    return zobrist_key(constants.WEATHER, weather)
+
+
+def field_key(field):
+    return zobrist_key(constants.FIELD, field)
+
+
+def trick_room_key(trick_room):
+    return zobrist_key(constants.TRICK_ROOM, bool(trick_room))
+
+
+def _static_pokemon_key(side, pkmn):
+    # these attributes are never changed by a StateMutator
+    return zobrist_key(
+        side,
+        pkmn.id,
+        pkmn.level,
+        pkmn.maxhp,
+        pkmn.ability,
+        pkmn.attack,
+        pkmn.defense,
+        pkmn.special_attack,
+        pkmn.special_defense,
+        pkmn.speed,
+        tuple(m[constants.ID] for m in pkmn.moves)
+    )
+
+
+def hash_pokemon(side, pkmn):
+    h = _static_pokemon_key(side, pkmn)
+    h ^= hp_key(side, pkmn.id, pkmn.hp)
+    for attribute in BOOST_ATTRIBUTES.values():
+        h ^= boost_key(side, pkmn.id, attribute, getattr(pkmn, attribute))
+    h ^= status_key(side, pkmn.id, pkmn.status)
+    for vs in pkmn.volatile_status:
+        h ^= volatile_status_key(side, pkmn.id, vs)
+    for m in pkmn.moves:
+        if m.get(constants.DISABLED):
+            h ^= disabled_move_key(side, pkmn.id, m[constants.ID])
+    h ^= types_key(side, pkmn.id, pkmn.types)
+    h ^= item_key(side, pkmn.id, pkmn.item)
+    return h
+
+
+def hash_side(side_string, side):
+    h = active_key(side_string, side.active.id)
+    h ^= hash_pokemon(side_string, side.active)
+    for pkmn in side.reserve.values():
+        h ^= hash_pokemon(side_string, pkmn)
+    for condition, count in side.side_conditions.items():
+        h ^= side_condition_key(side_string, condition, count)
+    h ^= wish_key(side_string, side.wish)
+    return h
+
+
+def hash_state(state):
+    """Returns a 64-bit Zobrist hash of a State, calculated from scratch
+
+       Two states hash to the same value when every field the engine reads is equal.
+       The order of reserve pokemon and side-conditions with a count of 0 do not affect the hash
+       A StateMutator keeps this same value up to date as instructions are applied and reversed"""
+    return (
+        hash_side(constants.SELF, state.self) ^
+        hash_side(constants.OPPONENT, state.opponent) ^
+        weather_key(state.weather) ^
+        field_key(state.field) ^
+        trick_room_key(state.trick_room)
+    )
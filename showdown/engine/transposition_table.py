@@ -0,0 +1,186 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import config
+
+
+# the config values that change the result of a search
+# every cached search result is keyed by them, so a result is only used with the values it was made with
+SEARCH_SETTINGS = [
+    'damage_calc_type',
+    'damage_roll_bucket_size',
+    'merge_identical_states',
+    'chance_pruning_epsilon',
+    'chance_pruning_top_k',
+]
+
+
+def get_search_settings():
+    return tuple(getattr(config, name) for name in SEARCH_SETTINGS)
+
+
+_private_caches = threading.local()
+
+
+@contextmanager
+def private_caches(**caches):
+    """Within the block the getters of the engine's shared caches return these caches instead, in this thread only
+
+       A search in a background thread uses them so it never touches the caches that the main thread is using"""
+    for name, cache in caches.items():
+        setattr(_private_caches, name, cache)
+    try:
+        yield
+    finally:
+        for name in caches:
+            delattr(_private_caches, name)
+
+
+def get_private_cache(name):
+    """Returns the cache given to `private_caches` under `name` in this thread, or None"""
+    return getattr(_private_caches, name, None)
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least-recently-used entry once `max_size` is reached
+
+       Keeps hit/miss counters so the effectiveness of the cache can be reported"""
+
+    def __init__(self, max_size):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive: {}".format(max_size))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+        entries[key] = value
+        while len(entries) > self.max_size:
+            evicted_key, _ = entries.popitem(last=False)
+            self.evictions += 1
+            self._evicted(evicted_key)
+
+    def merge(self, other):
+        """Puts every entry of `other` in this cache, as the most recently used, keeping their order"""
+        for key, value in other._entries.items():
+            self.put(key, value)
+
+    def _evicted(self, key):
+        # subclasses that index their keys remove an evicted key from the index here
+        pass
+
+    def clear(self):
+        self._entries.clear()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "{}(size={}, max_size={}, hits={}, misses={}, evictions={})".format(
+            self.__class__.__name__,
+            len(self),
+            self.max_size,
+            self.hits,
+            self.misses,
+            self.evictions
+        )
+
+
+class TranspositionTable(LRUCache):
+    """Caches the score-lookup returned by `get_payoff_matrix` for a position
+
+       The remaining depth, the options searched, the prune flag and the search settings are part of the key
+       because each of them changes the score-lookup produced for the same state.
+
+       The deepest entry of each state is also indexed by its state-hash alone, so the root of a new turn can reuse
+       the results of a search of the same position made last turn, where it was searched with its options in a different order"""
+
+    def __init__(self, max_size):
+        super().__init__(max_size)
+        self._deepest_keys = dict()
+
+    def put(self, key, value):
+        super().put(key, value)
+        state_key = self._state_key(key)
+        deepest_key = self._deepest_keys.get(state_key)
+        if deepest_key is None or deepest_key[1] <= key[1]:
+            self._deepest_keys[state_key] = key
+
+    def get_deepest(self, state_hash, prune):
+        """Returns the (depth, score-lookup) of the deepest search of a state with any options, or None"""
+        key = self._deepest_keys.get((state_hash, prune, get_search_settings()))
+        if key is None:
+            return None
+        return key[1], self.get(key)
+
+    def clear(self):
+        super().clear()
+        self._deepest_keys.clear()
+
+    def _evicted(self, key):
+        state_key = self._state_key(key)
+        if self._deepest_keys.get(state_key) == key:
+            del self._deepest_keys[state_key]
+
+    @staticmethod
+    def _state_key(key):
+        state_hash, _, _, _, prune, search_settings = key
+        return state_hash, prune, search_settings
+
+    @staticmethod
+    def make_key(state_hash, depth, user_options, opponent_options, prune):
+        return (
+            state_hash,
+            depth,
+            tuple(user_options),
+            tuple(opponent_options),
+            prune,
+            get_search_settings()
+        )
+
+
+_transposition_table = None
+
+
+def get_transposition_table():
+    # the table is created lazily so `config.transposition_table_size` can be set by `run.py` first
+    global _transposition_table
+    private_table = get_private_cache('transposition_table')
+    if private_table is not None:
+        return private_table
+    if _transposition_table is None:
+        _transposition_table = TranspositionTable(config.transposition_table_size)
+    return _transposition_table
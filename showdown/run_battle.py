@@ -2,16 +2,21 @@ import importlib
 import json
 import asyncio
 import concurrent.futures
+import time
 from copy import deepcopy
 
 import constants
 import config
 from config import logger
 from config import reset_logger
+from showdown.engine import profiler
+from showdown.engine.pondering import get_ponderer
 from showdown.engine.evaluate import Scoring
 from showdown.battle import Pokemon
 from showdown.battle import LastUsedMove
 from showdown.battle_modifier import async_update_battle
+from showdown.decision_recorder import snapshot_decision
+from showdown.decision_recorder import record_decision
 
 from showdown.websocket_client import PSWebsocketClient
 from websockets.exceptions import ConnectionClosed
@@ -25,16 +30,77 @@ def battle_is_finished(msg):
     return constants.WIN_STRING in msg and constants.CHAT_STRING not in msg
 
 
+def find_best_move(battle):
+    # a sample of decisions are profiled, and their profile is written to the battle's log
+    with profiler.profiling(config.profile_sample_rate) as search_profiler:
+        best_move = battle.find_best_move()
+    if search_profiler is not None:
+        logger.info("Search profile: {}".format(json.dumps(search_profiler.summary(), sort_keys=True)))
+    return best_move
+
+
+def get_decision_option(battle, decision):
+    # the option, as the engine names it, that a decision made by `format_decision` chose
+    choice = decision[0].split()
+    if choice[0] == '/switch':
+        for pkmn in battle.user.reserve:
+            if str(getattr(pkmn, 'index', None)) == choice[1]:
+                return "{} {}".format(constants.SWITCH_STRING, pkmn.name)
+    elif choice[:2] == ['/choose', 'move']:
+        return choice[2]
+    return None
+
+
+def prepare_pondering(battle, decision):
+    # the position after `decision` is pondered, as the engine sees it
+    if battle.request_json:
+        battle.user.from_json(battle.request_json)
+
+    prepared_battle = battle.prepare_battles(join_moves_together=True)[0]
+    user_options, opponent_options = prepared_battle.get_all_options()
+    user_option = get_decision_option(prepared_battle, decision)
+    if user_option not in user_options:
+        logger.debug("Not pondering the decision: {}".format(decision))
+        return None
+
+    return prepared_battle.create_state(), user_option, opponent_options
+
+
+def start_pondering(battle, decision):
+    # the engine's caches are only shared with searches made in this process
+    if config.search_processes > 1 or battle.search_prune is None:
+        return
+
+    # the battle is copied and prepared in the ponder thread, so the event loop is not held up
+    get_ponderer().start(
+        battle,
+        lambda battle_copy: prepare_pondering(battle_copy, decision),
+        config.search_depth,
+        config.search_time_budget,
+        battle.search_prune
+    )
+
+
 async def async_pick_move(battle):
+    # the search of the last turn's likely outcomes is no longer needed, and shares the caches this search uses
+    get_ponderer().stop()
+
     battle_copy = deepcopy(battle)
     if battle_copy.request_json:
         battle_copy.user.from_json(battle_copy.request_json)
 
+    # the snapshot is taken first as the bot may change `battle_copy` while deciding
+    snapshot = snapshot_decision(battle_copy) if config.record_decisions else None
+
     loop = asyncio.get_event_loop()
+    start = time.perf_counter()
     with concurrent.futures.ThreadPoolExecutor() as pool:
         best_move = await loop.run_in_executor(
-            pool, battle_copy.find_best_move
+            pool, find_best_move, battle_copy
         )
+    if snapshot is not None:
+        record_decision(snapshot, best_move, time.perf_counter() - start)
+
     choice = best_move[0]
     if constants.SWITCH_STRING in choice:
         battle.user.last_used_move = LastUsedMove(battle.user.active.name, "switch {}".format(choice.split()[-1]))
@@ -113,6 +179,8 @@ async def start_random_battle(ps_websocket_client: PSWebsocketClient, pokemon_ba
             # first move needs to be picked here
             best_move = await async_pick_move(battle)
             await ps_websocket_client.send_message(battle.battle_tag, best_move)
+            if config.ponder:
+                start_pondering(battle, best_move)
 
             return battle
 
@@ -169,6 +237,7 @@ async def pokemon_battle(ps_websocket_client, pokemon_battle_type):
         if battle_is_finished(msg):
             winner = msg.split(constants.WIN_STRING)[-1].split('\n')[0].strip()
             logger.debug("Winner: {}".format(winner))
+            get_ponderer().stop()
             await ps_websocket_client.send_message(battle.battle_tag, [config.battle_ending_message])
             
             # Get ranking after ladder match for analysis
@@ -199,7 +268,11 @@ async def pokemon_battle(ps_websocket_client, pokemon_battle_type):
             await ps_websocket_client.leave_battle(battle.battle_tag, save_replay=config.save_replay)
             return winner
         else:
+            # the ponder thread may still be copying the battle
+            get_ponderer().wait_until_copied()
             action_required = await async_update_battle(battle, msg)
             if action_required and not battle.wait:
                 best_move = await async_pick_move(battle)
                 await ps_websocket_client.send_message(battle.battle_tag, best_move)
+                if config.ponder:
+                    start_pondering(battle, best_move)
@@ -0,0 +1,148 @@
+import unittest
+
+import numpy as np
+
+import constants
+from showdown.engine import damage_calculator
+from showdown.engine.batch_damage_calculator import calculate_damage_rolls
+from showdown.engine.batch_damage_calculator import type_effectiveness_modifiers
+from showdown.engine.damage_calculator import pokemon_type_indicies
+from showdown.engine.damage_calculator import type_id_effectiveness_modifier
+from showdown.engine.damage_calculator import _calculate_damage_uncached
+
+from .test_select_best_move import create_pokemon
+
+
+# tests assume 1.5 boost from terrain (gen7)
+damage_calculator.TERRAIN_DAMAGE_BOOST = 1.5
+
+
+class TestCalculateDamageRolls(unittest.TestCase):
+    def setUp(self):
+        self.charizard = create_pokemon("charizard", 100, [])
+        self.venusaur = create_pokemon("venusaur", 100, [])
+        self.tyranitar = create_pokemon("tyranitar", 100, [])
+        self.skarmory = create_pokemon("skarmory", 100, [])
+        self.pikachu = create_pokemon("pikachu", 100, [])
+
+    def assert_same_as_calculate_damage(self, attackers, defenders, moves, conditions=None):
+        for calc_type in ['average', 'max', 'min_max', 'min_max_average', 'all']:
+            rolls = calculate_damage_rolls(attackers, defenders, moves, conditions=conditions, calc_type=calc_type)
+            for a, attacker in enumerate(attackers):
+                for m, move in enumerate(moves):
+                    for d, defender in enumerate(defenders):
+                        expected = _calculate_damage_uncached(attacker, defender, move, conditions=conditions, calc_type=calc_type)
+                        actual = rolls[a, m, d]
+                        if expected is None:
+                            self.assertTrue(np.isnan(actual).all(), "{} {} {}".format(attacker.id, move, defender.id))
+                        else:
+                            self.assertEqual(sorted(set(expected)), sorted(set(actual.tolist())), "{} {} {} {}".format(attacker.id, move, defender.id, calc_type))
+
+    def test_shape_is_attackers_moves_defenders_rolls(self):
+        rolls = calculate_damage_rolls([self.charizard, self.venusaur], [self.tyranitar], ['fireblast', 'earthquake', 'tackle'], calc_type='all')
+        self.assertEqual((2, 3, 1, 16), rolls.shape)
+
+    def test_rolls_are_in_increasing_order(self):
+        rolls = calculate_damage_rolls([self.charizard], [self.venusaur], ['fireblast'], calc_type='all')[0, 0, 0]
+        self.assertEqual(sorted(rolls.tolist()), rolls.tolist())
+
+    def test_status_move_gives_nan(self):
+        rolls = calculate_damage_rolls([self.charizard], [self.venusaur], ['willowisp', 'fireblast'], calc_type='max')
+        self.assertTrue(np.isnan(rolls[0, 0, 0, 0]))
+        self.assertEqual(300, rolls[0, 1, 0, 0])
+
+    def test_invalid_calc_type_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            calculate_damage_rolls([self.charizard], [self.venusaur], ['fireblast'], calc_type='median')
+
+    def test_invalid_move_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            calculate_damage_rolls([self.charizard], [self.venusaur], ['notamove'])
+
+    def test_moves_for_each_attacker(self):
+        rolls = calculate_damage_rolls([self.charizard, self.venusaur], [self.tyranitar], [['fireblast'], ['gigadrain']], calc_type='max')
+        self.assertEqual([_calculate_damage_uncached(self.charizard, self.tyranitar, 'fireblast', calc_type='max')[0]], rolls[0, :, 0, 0].tolist())
+        self.assertEqual([_calculate_damage_uncached(self.venusaur, self.tyranitar, 'gigadrain', calc_type='max')[0]], rolls[1, :, 0, 0].tolist())
+
+    def test_a_different_number_of_moves_for_each_attacker_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            calculate_damage_rolls([self.charizard, self.venusaur], [self.tyranitar], [['fireblast'], ['gigadrain', 'earthquake']])
+
+    def test_special_logic_moves_depend_on_the_defenders_hp(self):
+        self.tyranitar.hp = 100
+        rolls = calculate_damage_rolls([self.charizard], [self.venusaur, self.tyranitar], ['superfang', 'seismictoss'], calc_type='max')
+        self.assertEqual(self.venusaur.hp // 2, rolls[0, 0, 0, 0])
+        self.assertEqual(50, rolls[0, 0, 1, 0])
+        self.assertEqual(100, rolls[0, 1, 0, 0])
+
+    def test_same_as_calculate_damage_without_modifiers(self):
+        pokemon = [self.charizard, self.venusaur, self.tyranitar, self.skarmory, self.pikachu]
+        moves = ['fireblast', 'earthquake', 'thousandarrows', 'gigadrain', 'rockslide', 'thunderbolt', 'dracometeor', 'psychic', 'tackle', 'surf', 'willowisp', 'quickattack', 'bodypress']
+        self.assert_same_as_calculate_damage(pokemon, pokemon, moves)
+
+    def test_same_as_calculate_damage_with_boosts_status_and_volatile_statuses(self):
+        self.charizard.attack_boost = 2
+        self.charizard.special_attack_boost = -1
+        self.charizard.status = constants.BURN
+        self.charizard.volatile_status.add('flashfire')
+        self.venusaur.defense_boost = 1
+        self.venusaur.special_defense_boost = -2
+        self.venusaur.volatile_status.add('tarshot')
+        self.skarmory.volatile_status.add(constants.ROOST)
+        self.pikachu.volatile_status.add('magnetrise')
+        pokemon = [self.charizard, self.venusaur, self.tyranitar, self.skarmory, self.pikachu]
+        moves = ['fireblast', 'flareblitz', 'earthquake', 'gigadrain', 'rockslide']
+        self.assert_same_as_calculate_damage(pokemon, pokemon, moves)
+
+    def test_same_as_calculate_damage_with_unaware(self):
+        self.charizard.attack_boost = 2
+        self.venusaur.defense_boost = 2
+        self.venusaur.ability = 'unaware'
+        self.tyranitar.ability = 'unaware'
+        self.tyranitar.special_defense_boost = 3
+        pokemon = [self.charizard, self.venusaur, self.tyranitar]
+        self.assert_same_as_calculate_damage(pokemon, pokemon, ['flareblitz', 'fireblast', 'crunch'])
+
+    def test_same_as_calculate_damage_in_each_weather(self):
+        pokemon = [self.charizard, self.venusaur, self.tyranitar]
+        moves = ['fireblast', 'surf', 'thunderbolt', 'earthquake']
+        for weather in [constants.SUN, constants.RAIN, constants.SAND, constants.HAIL, constants.DESOLATE_LAND]:
+            self.assert_same_as_calculate_damage(pokemon, pokemon, moves, conditions={constants.WEATHER: weather})
+
+    def test_same_as_calculate_damage_in_each_terrain(self):
+        self.skarmory.volatile_status.add(constants.ROOST)
+        pokemon = [self.charizard, self.venusaur, self.skarmory, self.pikachu]
+        moves = ['thunderbolt', 'gigadrain', 'earthquake', 'dracometeor', 'psychic', 'quickattack']
+        for terrain in [constants.ELECTRIC_TERRAIN, constants.GRASSY_TERRAIN, constants.MISTY_TERRAIN, constants.PSYCHIC_TERRAIN]:
+            self.assert_same_as_calculate_damage(pokemon, pokemon, moves, conditions={constants.TERRAIN: terrain})
+
+    def test_same_as_calculate_damage_with_screens(self):
+        self.pikachu.ability = 'infiltrator'
+        pokemon = [self.charizard, self.pikachu]
+        moves = ['fireblast', 'flareblitz', 'thunderbolt', 'quickattack']
+        for screen in [constants.REFLECT, constants.LIGHT_SCREEN, constants.AURORA_VEIL]:
+            self.assert_same_as_calculate_damage(pokemon, pokemon, moves, conditions={screen: 1})
+
+
+class TestTypeEffectivenessModifiers(unittest.TestCase):
+    def setUp(self):
+        self.type_ids = np.array(list(pokemon_type_indicies.values()))
+
+    def test_same_as_type_id_effectiveness_modifier_for_every_dual_typing(self):
+        defending_type_ids = np.stack(np.meshgrid(self.type_ids, self.type_ids, indexing='ij'), axis=-1)
+        modifiers = type_effectiveness_modifiers(self.type_ids[:, None, None], defending_type_ids[None, :, :, :])
+        for a in self.type_ids:
+            for first in self.type_ids:
+                for second in self.type_ids:
+                    self.assertEqual(type_id_effectiveness_modifier(a, (first, second)), modifiers[a, first, second])
+
+    def test_same_as_type_id_effectiveness_modifier_for_every_single_typing(self):
+        modifiers = type_effectiveness_modifiers(self.type_ids[:, None], self.type_ids[None, :, None])
+        for a in self.type_ids:
+            for t in self.type_ids:
+                self.assertEqual(type_id_effectiveness_modifier(a, (t,)), modifiers[a, t])
+
+    def test_more_than_two_types(self):
+        fire = pokemon_type_indicies['fire']
+        defending_type_ids = np.array([[pokemon_type_indicies['grass'], pokemon_type_indicies['steel'], pokemon_type_indicies['bug']]])
+        self.assertEqual([8], type_effectiveness_modifiers(np.array([fire]), defending_type_ids).tolist())
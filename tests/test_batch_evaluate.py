@@ -0,0 +1,123 @@
+import unittest
+from collections import defaultdict
+from copy import deepcopy
+from unittest import mock
+
+import constants
+from showdown.engine import evaluate as evaluate_module
+from showdown.engine.batch_evaluate import LeafFeatureCollector
+from showdown.engine.batch_evaluate import LeafFeatures
+from showdown.engine.batch_evaluate import evaluate_features
+from showdown.engine.batch_evaluate import evaluate_states
+from showdown.engine.evaluate import Scoring
+from showdown.engine.evaluate import evaluate
+from showdown.engine.objects import Side
+from showdown.engine.objects import State
+from showdown.engine.objects import StateMutator
+
+from .test_select_best_move import create_pokemon
+
+
+class DoubledHPScoring(Scoring):
+    POKEMON_HP = 200
+    POKEMON_BOOSTS = {**Scoring.POKEMON_BOOSTS, constants.SPEED: 50}
+    STATIC_SCORED_SIDE_CONDITIONS = {**Scoring.STATIC_SCORED_SIDE_CONDITIONS, constants.REFLECT: 35}
+
+
+class TestEvaluateStates(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                create_pokemon("pikachu", 100, []),
+                {
+                    "rattata": create_pokemon("rattata", 100, ["tackle", "quickattack", "bodyslam"]),
+                    "charmander": create_pokemon("charmander", 100, []),
+                    "squirtle": create_pokemon("squirtle", 100, []),
+                },
+                (0, 0),
+                defaultdict(lambda: 0)
+            ),
+            Side(
+                create_pokemon("aerodactyl", 100, []),
+                {
+                    "bulbasaur": create_pokemon("bulbasaur", 100, []),
+                    "pidgey": create_pokemon("pidgey", 100, []),
+                },
+                (0, 0),
+                defaultdict(lambda: 0)
+            ),
+            None,
+            None,
+            False
+        )
+        self.mutator = StateMutator(self.state)
+        self.instructions = [
+            [],
+            [(constants.MUTATOR_DAMAGE, constants.SELF, 37.5)],
+            [(constants.MUTATOR_DAMAGE, constants.OPPONENT, self.state.opponent.active.hp)],
+            [(constants.MUTATOR_BOOST, constants.SELF, constants.ATTACK, 6), (constants.MUTATOR_BOOST, constants.OPPONENT, constants.SPEED, -3)],
+            [(constants.MUTATOR_BOOST, constants.SELF, constants.EVASION, 5), (constants.MUTATOR_BOOST, constants.SELF, constants.ACCURACY, -5)],
+            [(constants.MUTATOR_APPLY_STATUS, constants.SELF, constants.TOXIC)],
+            [(constants.MUTATOR_APPLY_STATUS, constants.OPPONENT, constants.SLEEP)],
+            [(constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "rattata"), (constants.MUTATOR_APPLY_STATUS, constants.SELF, constants.BURN)],
+            [(constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.SELF, constants.SUBSTITUTE), (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.OPPONENT, constants.LEECH_SEED)],
+            [(constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.SELF, constants.CONFUSION), (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.SELF, constants.TAUNT)],
+            [(constants.MUTATOR_SIDE_START, constants.SELF, constants.STEALTH_ROCK, 1), (constants.MUTATOR_SIDE_START, constants.OPPONENT, constants.SPIKES, 3)],
+            [(constants.MUTATOR_SIDE_START, constants.OPPONENT, constants.REFLECT, 1), (constants.MUTATOR_SIDE_START, constants.SELF, constants.TOXIC_SPIKES, 2)],
+            [
+                (constants.MUTATOR_SIDE_START, constants.SELF, constants.SPIKES, 2),
+                (constants.MUTATOR_DAMAGE, constants.SELF, self.state.self.active.hp),
+                (constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "squirtle"),
+            ],
+        ]
+
+    def get_states(self):
+        states = []
+        for instructions in self.instructions:
+            self.mutator.apply(instructions)
+            states.append(deepcopy(self.state))
+            self.mutator.reverse(instructions)
+        return states
+
+    def test_same_as_evaluate(self):
+        states = self.get_states()
+
+        self.assertEqual([evaluate(s) for s in states], evaluate_states(states).tolist())
+
+    def test_same_as_evaluate_with_different_scoring_weights(self):
+        states = self.get_states()
+        with mock.patch.object(evaluate_module, 'Scoring', DoubledHPScoring):
+            expected_scores = [evaluate(s) for s in states]
+
+        self.assertEqual(expected_scores, evaluate_states(states, scoring=DoubledHPScoring).tolist())
+        self.assertNotEqual(expected_scores, evaluate_states(states).tolist())
+
+    def test_unknown_status_is_scored_as_a_burn(self):
+        self.state.self.reserve["rattata"].status = "notastatus"
+
+        self.assertEqual([evaluate(self.state)], evaluate_states([self.state]).tolist())
+
+    def test_collector_reads_each_state_when_it_is_added(self):
+        collector = LeafFeatureCollector()
+        expected_scores = []
+        for instructions in self.instructions:
+            self.mutator.apply(instructions)
+            collector.append(self.state)
+            expected_scores.append(evaluate(self.state))
+            self.mutator.reverse(instructions)
+
+        self.assertEqual(len(self.instructions), len(collector))
+        self.assertEqual(expected_scores, evaluate_features(collector.to_features()).tolist())
+
+    def test_no_states_gives_no_scores(self):
+        features = LeafFeatures.from_states([])
+
+        self.assertEqual(0, len(features))
+        self.assertEqual([], evaluate_features(features).tolist())
+
+    def test_too_many_pokemon_raises_value_error(self):
+        for name in ["caterpie", "weedle", "zubat"]:
+            self.state.self.reserve[name] = create_pokemon(name, 100, [])
+
+        with self.assertRaises(ValueError):
+            evaluate_states([self.state])
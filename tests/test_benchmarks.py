@@ -0,0 +1,108 @@
+import copy
+import unittest
+
+import config
+import data
+
+from benchmarks.positions import POSITIONS
+from benchmarks.suite import Position
+from benchmarks.suite import changed_counters
+from benchmarks.suite import compare_results
+from benchmarks.suite import run_benchmarks
+from showdown.engine.move_ordering import MoveOrderer
+from showdown.engine.objects import StateMutator
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import pick_safest
+
+
+class TestPositions(unittest.TestCase):
+    def setUp(self):
+        self.pokemon_mode = config.pokemon_mode
+        self.pokemon_sets = data.pokemon_sets
+
+    def tearDown(self):
+        config.pokemon_mode = self.pokemon_mode
+        data.pokemon_sets = self.pokemon_sets
+
+    def test_every_position_can_be_searched(self):
+        for name in POSITIONS:
+            config.pokemon_mode = 'gen8randombattle'
+            data.pokemon_sets = data.random_battle_sets
+            position = Position(name)
+            self.assertTrue(position.user_options, name)
+            self.assertTrue(position.opponent_options, name)
+            position.get_payoff_matrix(1)
+
+    def test_forced_switch_only_has_switches(self):
+        config.pokemon_mode = 'gen8randombattle'
+        data.pokemon_sets = data.random_battle_sets
+        position = Position('forced_switch')
+        self.assertTrue(all(option.startswith('switch') for option in position.user_options))
+
+    def test_move_ordering_and_pruning_do_not_change_the_safest_option(self):
+        config.pokemon_mode = 'gen8randombattle'
+        data.pokemon_sets = data.random_battle_sets
+        for name in ['hazard_heavy', 'forced_switch']:
+            position = Position(name)
+            expected_safest = pick_safest(get_payoff_matrix(StateMutator(position.state), position.user_options, position.opponent_options, depth=2, prune=False))
+            for move_orderer in [None, MoveOrderer()]:
+                safest = pick_safest(get_payoff_matrix(StateMutator(position.state), position.user_options, position.opponent_options, depth=2, prune=True, move_orderer=move_orderer))
+                self.assertEqual(expected_safest[0][0], safest[0][0], name)
+                self.assertEqual(expected_safest[1], safest[1], name)
+
+    def test_run_benchmarks_gives_results_for_each_benchmark(self):
+        results = run_benchmarks(['forced_switch'], repeat=1, max_depth=1)
+
+        self.assertEqual(1, results['metadata']['max_depth'])
+        self.assertEqual(
+            {'prepare_battles', 'get_all_state_instructions', 'evaluate', 'get_payoff_matrix_depth_1'},
+            set(results['results']['forced_switch'])
+        )
+        self.assertGreater(results['results']['forced_switch']['get_payoff_matrix_depth_1']['counters']['nodes'], 0)
+
+
+class TestCompareResults(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            'metadata': {},
+            'results': {
+                'early_game': {
+                    'evaluate': {'seconds': 1.0},
+                    'get_payoff_matrix_depth_1': {'seconds': 1.0, 'counters': {'nodes': 10, 'leaves': 8}},
+                }
+            }
+        }
+        self.current = copy.deepcopy(self.baseline)
+
+    def test_slower_than_the_threshold_is_a_regression(self):
+        self.current['results']['early_game']['evaluate']['seconds'] = 1.2
+        self.current['results']['early_game']['get_payoff_matrix_depth_1']['seconds'] = 1.05
+
+        comparisons = compare_results(self.baseline, self.current, threshold=0.1)
+
+        self.assertEqual(
+            [
+                ('early_game', 'evaluate', 1.0, 1.2, True),
+                ('early_game', 'get_payoff_matrix_depth_1', 1.0, 1.05, False),
+            ],
+            comparisons
+        )
+
+    def test_benchmarks_missing_from_the_baseline_are_not_compared(self):
+        self.current['results']['hazard_heavy'] = {'evaluate': {'seconds': 1.0}}
+        self.current['results']['early_game']['get_payoff_matrix_depth_3'] = {'seconds': 1.0}
+
+        comparisons = compare_results(self.baseline, self.current)
+
+        self.assertEqual(2, len(comparisons))
+
+    def test_changed_counters(self):
+        self.current['results']['early_game']['get_payoff_matrix_depth_1']['counters'] = {'nodes': 12, 'leaves': 8, 'row_prunes': 1}
+
+        self.assertEqual(
+            [
+                ('early_game', 'get_payoff_matrix_depth_1', 'nodes', 10, 12),
+                ('early_game', 'get_payoff_matrix_depth_1', 'row_prunes', 0, 1),
+            ],
+            changed_counters(self.baseline, self.current)
+        )
@@ -1,13 +1,20 @@
 import unittest
+from unittest import mock
 from collections import defaultdict
 
 import constants
 from showdown.engine import damage_calculator
 from showdown.engine.damage_calculator import _calculate_damage
+from showdown.engine.damage_calculator import _calculate_damage_uncached
 from showdown.engine.damage_calculator import calculate_damage
+from showdown.engine.damage_calculator import damage_multipication_array
+from showdown.engine.damage_calculator import pokemon_type_indicies
+from showdown.engine.damage_calculator import type_effectiveness_modifier
+from showdown.engine.damage_calculator import type_id_effectiveness_modifier
 from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
+from showdown.engine.transposition_table import LRUCache
 
 from showdown.battle import Pokemon as StatePokemon
 
@@ -303,3 +310,112 @@ class TestCalculateDamage(unittest.TestCase):
         )
 
         self.assertNotEqual(0, damage_amounts[0])
+
+
+class TestCalculateDamageCache(unittest.TestCase):
+    def setUp(self):
+        self.charizard = Pokemon.from_state_pokemon_dict(StatePokemon("charizard", 100).to_dict())
+        self.venusaur = Pokemon.from_state_pokemon_dict(StatePokemon("venusaur", 100).to_dict())
+        self.cache = LRUCache(1000)
+        cache_patch = mock.patch('showdown.engine.damage_calculator._damage_calculation_cache', self.cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_cached_damage_is_the_same_as_uncached_damage(self):
+        conditions = [
+            None,
+            {constants.WEATHER: constants.SUN},
+            {constants.WEATHER: constants.SAND, constants.TERRAIN: constants.GRASSY_TERRAIN},
+            {constants.REFLECT: 1, constants.LIGHT_SCREEN: 1},
+            {constants.AURORA_VEIL: 1, constants.TERRAIN: constants.PSYCHIC_TERRAIN},
+        ]
+        moves = ['fireblast', 'earthquake', 'sludgebomb', 'tackle', 'quickattack', 'seismictoss', 'superfang', 'toxic']
+        for calc_type in ['average', 'max', 'min_max', 'all']:
+            for condition in conditions:
+                for move in moves:
+                    for attacker, defender in [(self.charizard, self.venusaur), (self.venusaur, self.charizard)]:
+                        for _ in range(2):
+                            self.assertEqual(
+                                _calculate_damage_uncached(attacker, defender, move, conditions=condition, calc_type=calc_type),
+                                _calculate_damage(attacker, defender, move, conditions=condition, calc_type=calc_type)
+                            )
+
+        self.assertGreater(self.cache.hits, 0)
+
+    def test_repeated_calculation_is_answered_from_the_cache(self):
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast')
+        _calculate_damage(self.charizard, self.venusaur, 'fireblast')
+
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_boosts_are_part_of_the_key(self):
+        dmg = _calculate_damage(self.charizard, self.venusaur, 'fireblast')
+        self.charizard.special_attack_boost = 2
+        boosted_dmg = _calculate_damage(self.charizard, self.venusaur, 'fireblast')
+
+        self.assertEqual(0, self.cache.hits)
+        self.assertGreater(boosted_dmg[0], dmg[0])
+
+    def test_move_overrides_are_part_of_the_key(self):
+        move = damage_calculator.get_move('fireblast').copy()
+        dmg = _calculate_damage(self.charizard, self.venusaur, move)
+        move[constants.BASE_POWER] *= 2
+        stronger_dmg = _calculate_damage(self.charizard, self.venusaur, move)
+
+        self.assertEqual(0, self.cache.hits)
+        self.assertGreater(stronger_dmg[0], dmg[0])
+
+    def test_special_logic_moves_are_not_cached(self):
+        _calculate_damage(self.charizard, self.venusaur, 'superfang')
+        self.venusaur.hp = 10
+        dmg = _calculate_damage(self.charizard, self.venusaur, 'superfang')
+
+        self.assertEqual([5], dmg)
+        self.assertEqual(0, len(self.cache))
+
+    def test_modifying_the_result_does_not_modify_the_cache(self):
+        dmg = _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        dmg.append(0)
+
+        self.assertEqual([300], _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max'))
+
+    def test_invalid_calc_type_raises_valueerror(self):
+        with self.assertRaises(ValueError):
+            _calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='bad')
+
+
+class TestTypeEffectiveness(unittest.TestCase):
+    def multiply_one_type_at_a_time(self, attacking_type_id, defending_type_ids):
+        modifier = 1
+        for defending_type_id in defending_type_ids:
+            modifier *= damage_multipication_array[attacking_type_id][defending_type_id]
+        return modifier
+
+    def test_every_single_and_dual_typing_is_the_same_as_multiplying_one_type_at_a_time(self):
+        type_ids = list(pokemon_type_indicies.values())
+        for attacking_type_id in type_ids:
+            for first_type_id in type_ids:
+                self.assertEqual(
+                    self.multiply_one_type_at_a_time(attacking_type_id, [first_type_id]),
+                    type_id_effectiveness_modifier(attacking_type_id, (first_type_id,))
+                )
+                for second_type_id in type_ids:
+                    self.assertEqual(
+                        self.multiply_one_type_at_a_time(attacking_type_id, [first_type_id, second_type_id]),
+                        type_id_effectiveness_modifier(attacking_type_id, (first_type_id, second_type_id))
+                    )
+
+    def test_more_than_two_types_falls_back_to_multiplying_one_type_at_a_time(self):
+        self.assertEqual(8, type_effectiveness_modifier('fire', ['grass', 'steel', 'bug']))
+
+    def test_type_effectiveness_modifier_accepts_type_names(self):
+        self.assertEqual(4, type_effectiveness_modifier('rock', ['fire', 'flying']))
+        self.assertEqual(0, type_effectiveness_modifier('ground', ['flying']))
+
+    def test_pokemon_type_ids_follow_its_types(self):
+        pkmn = Pokemon.from_state_pokemon_dict(StatePokemon("charizard", 100).to_dict())
+        self.assertEqual((pokemon_type_indicies['fire'], pokemon_type_indicies['flying']), pkmn.type_ids)
+
+        pkmn.types = ['water']
+        self.assertEqual((pokemon_type_indicies['water'],), pkmn.type_ids)
@@ -55,6 +55,21 @@ class TestPickSafest(unittest.TestCase):
 
         self.assertEqual(expected_result, safest)
 
+    def test_pruned_cells_do_not_give_the_bot_a_choice(self):
+        score_lookup = {
+            ("a", "x"): float('nan'),
+            ("a", "y"): 5,
+            ("b", "x"): 10,
+            ("b", "y"): 20,
+            ("c", "x"): 10,
+            ("c", "y"): 30,
+        }
+
+        safest = pick_safest(score_lookup)
+        expected_result = (("c", "y"), 30)
+
+        self.assertEqual(expected_result, safest)
+
 
 class TestGetWeightedChoices(unittest.TestCase):
     def setUp(self):
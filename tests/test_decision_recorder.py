@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+
+import config
+import data
+from showdown.engine.evaluate import Scoring
+from showdown.engine.find_state_instructions import get_state_instruction_cache
+from showdown.engine.move_ordering import get_move_orderer
+from showdown.engine.transposition_table import get_transposition_table
+from showdown.decision_recorder import load_decision
+from showdown.decision_recorder import record_decision
+from showdown.decision_recorder import replay_decision
+from showdown.decision_recorder import snapshot_decision
+
+from benchmarks.positions import forced_switch
+from benchmarks.positions import hazard_heavy
+
+
+class TestDecisionRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.original_config = {
+            name: getattr(config, name) for name in ['decision_directory', 'battle_bot_module', 'pokemon_mode', 'search_depth', 'search_time_budget']
+        }
+        self.original_pokemon_sets = data.pokemon_sets
+
+        config.decision_directory = self.directory.name
+        config.battle_bot_module = 'safest'
+        config.pokemon_mode = 'gen8randombattle'
+        config.search_depth = 1
+        config.search_time_budget = float('inf')
+        data.pokemon_sets = data.random_battle_sets
+
+        self.battle = hazard_heavy()
+
+    def tearDown(self):
+        for name, value in self.original_config.items():
+            setattr(config, name, value)
+        data.pokemon_sets = self.original_pokemon_sets
+        self.directory.cleanup()
+
+    def record(self, battle):
+        snapshot = snapshot_decision(battle)
+        decision = battle.find_best_move()
+        return record_decision(snapshot, decision, 1.5), decision
+
+    def test_recorded_decision_can_be_loaded(self):
+        file_name, decision = self.record(self.battle)
+        record = load_decision(file_name)
+
+        self.assertEqual(decision, record['decision'])
+        self.assertEqual(1.5, record['seconds'])
+        self.assertEqual('safest', record['bot'])
+        self.assertEqual(self.battle.get_all_options(), record['options'])
+        self.assertEqual(1, record['config']['search_depth'])
+        self.assertIn('ferrothorn', record['pokemon_sets'])
+        self.assertEqual(2, record['battle'].user.side_conditions['spikes'])
+        self.assertEqual(0, record['battle'].user.active.boosts['attack'])
+
+    def test_each_decision_of_a_battle_is_recorded_in_its_own_file(self):
+        first_file_name, _ = self.record(self.battle)
+        second_file_name, _ = self.record(self.battle)
+
+        self.assertEqual(os.path.dirname(first_file_name), os.path.dirname(second_file_name))
+        self.assertEqual(['0000.decision.gz', '0001.decision.gz'], sorted(os.listdir(os.path.dirname(first_file_name))))
+
+    def test_decision_that_cannot_be_written_is_not_raised(self):
+        config.decision_directory = os.path.join(self.directory.name, 'file')
+        open(config.decision_directory, 'w').close()
+
+        self.assertIsNone(self.record(self.battle)[0])
+
+    def test_replayed_decision_is_the_same(self):
+        for battle in [self.battle, forced_switch()]:
+            file_name, decision = self.record(battle)
+            replayed_decision, _ = replay_decision(load_decision(file_name))
+            self.assertEqual(decision, replayed_decision)
+
+    def test_replay_uses_the_recorded_environment_and_restores_it(self):
+        file_name, _ = self.record(self.battle)
+        record = load_decision(file_name)
+        record['pokemon_alive_static'] = Scoring.POKEMON_ALIVE_STATIC + 1
+
+        config.search_depth = 3
+        config.pokemon_mode = 'gen4randombattle'
+        original_pokemon_alive_static = Scoring.POKEMON_ALIVE_STATIC
+        data.pokemon_sets = {}
+
+        used = {}
+
+        def find_best_move(battle):
+            used.update(
+                search_depth=config.search_depth,
+                pokemon_mode=config.pokemon_mode,
+                pokemon_alive_static=Scoring.POKEMON_ALIVE_STATIC,
+                has_sets='ferrothorn' in data.pokemon_sets,
+            )
+            return ['decision']
+
+        from showdown.battle_bots.safest.main import BattleBot
+        original_find_best_move = BattleBot.find_best_move
+        BattleBot.find_best_move = find_best_move
+        try:
+            decision, _ = replay_decision(record)
+        finally:
+            BattleBot.find_best_move = original_find_best_move
+
+        self.assertEqual(['decision'], decision)
+        self.assertEqual(
+            {'search_depth': 1, 'pokemon_mode': 'gen8randombattle', 'pokemon_alive_static': original_pokemon_alive_static + 1, 'has_sets': True},
+            used
+        )
+        self.assertEqual(3, config.search_depth)
+        self.assertEqual('gen4randombattle', config.pokemon_mode)
+        self.assertEqual(original_pokemon_alive_static, Scoring.POKEMON_ALIVE_STATIC)
+        self.assertEqual({}, data.pokemon_sets)
+
+    def test_replay_starts_with_empty_caches_and_leaves_the_shared_ones_unchanged(self):
+        file_name, _ = self.record(self.battle)
+        shared_caches = [get_transposition_table(), get_move_orderer(), get_state_instruction_cache()]
+        shared_sizes = [len(get_transposition_table()), len(get_state_instruction_cache())]
+
+        sizes = []
+
+        def find_best_move(battle):
+            self.assertNotIn(get_transposition_table(), shared_caches)
+            self.assertNotIn(get_move_orderer(), shared_caches)
+            self.assertNotIn(get_state_instruction_cache(), shared_caches)
+            sizes.extend([len(get_transposition_table()), len(get_state_instruction_cache())])
+            return ['decision']
+
+        from showdown.battle_bots.safest.main import BattleBot
+        original_find_best_move = BattleBot.find_best_move
+        BattleBot.find_best_move = find_best_move
+        try:
+            replay_decision(load_decision(file_name))
+        finally:
+            BattleBot.find_best_move = original_find_best_move
+
+        self.assertEqual([0, 0], sizes)
+        self.assertIs(shared_caches[0], get_transposition_table())
+        self.assertEqual(shared_sizes, [len(get_transposition_table()), len(get_state_instruction_cache())])
+
+    def test_replay_with_a_different_bot(self):
+        file_name, _ = self.record(self.battle)
+        decision, _ = replay_decision(load_decision(file_name), 'most_damage')
+        self.assertTrue(decision)
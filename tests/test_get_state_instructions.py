@@ -12,8 +12,13 @@ import constants
 from collections import defaultdict
 from copy import deepcopy
 from showdown.engine.objects import TransposeInstruction
+from showdown.engine.objects import compile_instructions
 from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.find_state_instructions import get_all_state_instructions_cached
 from showdown.engine.find_state_instructions import remove_duplicate_instructions
+from showdown.engine.find_state_instructions import prune_unlikely_instructions
+from showdown.engine.find_state_instructions import get_damage_roll_buckets
+from showdown.engine.find_state_instructions import ChancePruningStats
 from showdown.engine.find_state_instructions import lookup_move
 from showdown.engine.find_state_instructions import user_moves_first
 from showdown.engine.objects import State
@@ -21,6 +26,7 @@ from showdown.engine.objects import Pokemon
 from showdown.engine.objects import Side
 from showdown.battle import Pokemon as StatePokemon
 from showdown.engine.objects import StateMutator
+from showdown.engine.transposition_table import LRUCache
 
 
 class TestGetStateInstructions(unittest.TestCase):
@@ -56,7 +62,7 @@ class TestGetStateInstructions(unittest.TestCase):
             False
                     )
 
-        self.mutator = StateMutator(self.state)
+        self.mutator = StateMutator(self.state, debug_hash=True)
 
     def test_two_pokemon_switching(self):
         bot_move = "switch xatu"
@@ -9196,6 +9202,42 @@ class TestRemoveDuplicateInstructions(unittest.TestCase):
 
         self.assertEqual(expected_instructions, new_instructions)
 
+    def test_combines_instructions_containing_lists(self):
+        instructions = [
+            TransposeInstruction(0.5, [(constants.MUTATOR_CHANGE_TYPE, constants.SELF, ['water'], ['normal'])], False),
+            TransposeInstruction(0.5, [(constants.MUTATOR_CHANGE_TYPE, constants.SELF, ['water'], ['normal'])], False),
+        ]
+
+        new_instructions = remove_duplicate_instructions(instructions)
+
+        self.assertEqual([TransposeInstruction(1.0, [(constants.MUTATOR_CHANGE_TYPE, constants.SELF, ['water'], ['normal'])], False)], new_instructions)
+
+    def test_does_not_combine_different_instructions_that_give_the_same_state_without_a_mutator(self):
+        instructions = [
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 5), (constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+
+        self.assertEqual(2, len(remove_duplicate_instructions(instructions)))
+
+    def test_combines_different_instructions_that_give_the_same_state_with_a_mutator(self):
+        TestGetStateInstructions.setUp(self)
+        instructions = [
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 5), (constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+        original_state_hash = self.mutator.state_hash
+
+        new_instructions = remove_duplicate_instructions(instructions, mutator=self.mutator)
+
+        expected_instructions = [
+            TransposeInstruction(0.75, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+        self.assertEqual(expected_instructions, new_instructions)
+        self.assertEqual(original_state_hash, self.mutator.state_hash)
+
 
 class TestUserMovesFirst(unittest.TestCase):
     def setUp(self):
@@ -9229,7 +9271,7 @@ class TestUserMovesFirst(unittest.TestCase):
                         False
                     )
 
-        self.mutator = StateMutator(self.state)
+        self.mutator = StateMutator(self.state, debug_hash=True)
 
     def test_bot_moves_first_when_move_priorities_are_the_same_and_it_is_faster(self):
         user = self.state.self
@@ -9427,3 +9469,221 @@ class TestUserMovesFirst(unittest.TestCase):
         opponent.active.speed = 2
 
         self.assertTrue(user_moves_first(self.state, user_move, opponent_move))
+
+
+class TestGetAllStateInstructionsCached(unittest.TestCase):
+    def setUp(self):
+        TestGetStateInstructions.setUp(self)
+        self.cache = LRUCache(100)
+        cache_patch = mock.patch('showdown.engine.find_state_instructions._state_instruction_cache', self.cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_cached_instructions_are_the_same_as_the_uncached_instructions(self):
+        expected_instructions = get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+        instructions = get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertEqual(len(expected_instructions), len(instructions))
+        for expected, actual in zip(expected_instructions, instructions):
+            self.assertEqual(expected.percentage, actual.percentage)
+            self.assertEqual(compile_instructions(expected.instructions), actual.instructions)
+            self.assertEqual(expected.frozen, actual.frozen)
+
+    def test_repeated_call_is_answered_from_the_cache(self):
+        instructions = get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        same_instructions = get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertIs(instructions, same_instructions)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_different_moves_are_cached_separately(self):
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "switch yveltal")
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(0, self.cache.hits)
+
+    def test_changed_state_is_not_answered_from_the_cache(self):
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.OPPONENT, 10)])
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_damage_calc_type_is_part_of_the_key(self):
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.damage_calc_type = "min_max"
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.damage_calc_type = "average"
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_chance_pruning_is_part_of_the_key(self):
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.chance_pruning_epsilon = 0.1
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.chance_pruning_epsilon = 0.0
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_merging_identical_states_is_part_of_the_key(self):
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.merge_identical_states = True
+        get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+        config.merge_identical_states = False
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_cached_instructions_cannot_be_modified(self):
+        instructions = get_all_state_instructions_cached(self.mutator, "thunderbolt", "moonblast")
+
+        with self.assertRaises(AttributeError):
+            instructions[0].percentage = 0.5
+        with self.assertRaises(AttributeError):
+            instructions[0].instructions.append(('damage', 'opponent', 10))
+        with self.assertRaises(TypeError):
+            instructions[0] = None
+
+
+class TestPruneUnlikelyInstructions(unittest.TestCase):
+    def setUp(self):
+        self.instructions = [
+            TransposeInstruction(0.05, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+            TransposeInstruction(0.6, [(constants.MUTATOR_DAMAGE, constants.SELF, 6)], False),
+            TransposeInstruction(0.1, [(constants.MUTATOR_DAMAGE, constants.SELF, 7)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 8)], False),
+        ]
+
+    def test_removes_instructions_below_epsilon_and_renormalizes(self):
+        instructions, pruned_mass = prune_unlikely_instructions(self.instructions, 0.08)
+
+        self.assertEqual([6, 7, 8], [i.instructions[0][2] for i in instructions])
+        self.assertAlmostEqual(1.0, sum(i.percentage for i in instructions))
+        self.assertAlmostEqual(0.6 / 0.95, instructions[0].percentage)
+        self.assertAlmostEqual(0.05, pruned_mass)
+
+    def test_keeps_the_top_k_most_likely_instructions_in_their_original_order(self):
+        instructions, pruned_mass = prune_unlikely_instructions(self.instructions, 0.0, top_k=2)
+
+        self.assertEqual([6, 8], [i.instructions[0][2] for i in instructions])
+        self.assertAlmostEqual(1.0, sum(i.percentage for i in instructions))
+        self.assertAlmostEqual(0.15, pruned_mass)
+
+    def test_keeps_the_most_likely_instruction_when_every_instruction_is_below_epsilon(self):
+        instructions, pruned_mass = prune_unlikely_instructions(self.instructions, 0.9)
+
+        self.assertEqual([6], [i.instructions[0][2] for i in instructions])
+        self.assertAlmostEqual(1.0, instructions[0].percentage)
+
+    def test_nothing_is_pruned_when_every_instruction_is_likely_enough(self):
+        instructions, pruned_mass = prune_unlikely_instructions(self.instructions, 0.01)
+
+        self.assertIs(self.instructions, instructions)
+        self.assertEqual(0.0, pruned_mass)
+        self.assertEqual(0.05, instructions[0].percentage)
+
+    def test_renormalizes_to_the_original_total_percentage(self):
+        for instruction in self.instructions:
+            instruction.percentage /= 2
+
+        instructions, pruned_mass = prune_unlikely_instructions(self.instructions, 0.04)
+
+        self.assertAlmostEqual(0.5, sum(i.percentage for i in instructions))
+
+
+class TestGetAllStateInstructionsWithChancePruning(unittest.TestCase):
+    def setUp(self):
+        TestGetStateInstructions.setUp(self)
+        self.stats = ChancePruningStats()
+        stats_patch = mock.patch('showdown.engine.find_state_instructions._chance_pruning_stats', self.stats)
+        stats_patch.start()
+        self.addCleanup(stats_patch.stop)
+
+    def tearDown(self):
+        config.chance_pruning_epsilon = 0.0
+        config.chance_pruning_top_k = 0
+
+    def test_unlikely_outcomes_are_pruned(self):
+        unpruned_instructions = get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+        config.chance_pruning_epsilon = 0.1
+        instructions = get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertLess(len(instructions), len(unpruned_instructions))
+        self.assertTrue(all(i.percentage >= 0.1 for i in instructions))
+        self.assertAlmostEqual(1.0, sum(i.percentage for i in instructions))
+
+    def test_top_k_limits_the_number_of_outcomes(self):
+        config.chance_pruning_top_k = 2
+        instructions = get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertEqual(2, len(instructions))
+        self.assertAlmostEqual(1.0, sum(i.percentage for i in instructions))
+
+    def test_pruned_mass_is_recorded(self):
+        config.chance_pruning_epsilon = 0.1
+        get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertEqual(1, self.stats.nodes)
+        self.assertEqual(1, self.stats.pruned_nodes)
+        self.assertGreater(self.stats.pruned_outcomes, 0)
+        self.assertGreater(self.stats.pruned_mass, 0)
+        self.assertLess(self.stats.pruned_mass, 0.5)
+
+    def test_nothing_is_recorded_when_pruning_is_disabled(self):
+        get_all_state_instructions(self.mutator, "thunderbolt", "moonblast")
+
+        self.assertEqual(0, self.stats.nodes)
+
+
+class TestGetDamageRollBuckets(unittest.TestCase):
+    def setUp(self):
+        self.pokemon = Pokemon.from_state_pokemon_dict(StatePokemon("aromatisse", 100).to_dict())
+        self.pokemon.maxhp = 100
+        self.pokemon.hp = 50
+
+    def test_every_roll_is_kept_when_bucket_size_is_zero(self):
+        self.assertEqual([(10, 0.5), (60, 0.5)], get_damage_roll_buckets([10, 60], self.pokemon, 0))
+
+    def test_knockout_rolls_are_one_bucket(self):
+        damage_rolls = get_damage_roll_buckets([10, 50, 55, 60], self.pokemon, 0.01)
+
+        self.assertEqual([(10, 0.25), (60, 0.75)], damage_rolls)
+
+    def test_surviving_rolls_within_bucket_size_are_averaged(self):
+        damage_rolls = get_damage_roll_buckets([10, 11, 12, 30, 31, 49], self.pokemon, 0.05)
+
+        self.assertEqual([(11, 0.5), (30.5, 1 / 3), (49, 1 / 6)], damage_rolls)
+
+    def test_rolls_are_kept_when_the_defender_has_a_substitute(self):
+        self.pokemon.volatile_status.add(constants.SUBSTITUTE)
+
+        self.assertEqual(4, len(get_damage_roll_buckets([10, 50, 55, 60], self.pokemon, 0.05)))
+
+    def test_percentages_add_up_to_one(self):
+        damage_rolls = get_damage_roll_buckets(list(range(35, 51)), self.pokemon, 0.03)
+
+        self.assertAlmostEqual(1.0, sum(percentage for _, percentage in damage_rolls))
+
+
+class TestGetAllStateInstructionsWithDamageRollBuckets(unittest.TestCase):
+    def setUp(self):
+        TestGetStateInstructions.setUp(self)
+        config.damage_calc_type = "all"
+
+    def tearDown(self):
+        config.damage_calc_type = "average"
+        config.damage_roll_bucket_size = 0.0
+
+    def knockout_percentage(self, instructions):
+        return sum(i.percentage for i in instructions if (constants.MUTATOR_DAMAGE, constants.OPPONENT, self.state.opponent.active.hp) in i.instructions)
+
+    def test_bucketing_keeps_the_knockout_chance_with_fewer_outcomes(self):
+        self.state.opponent.active.hp = 63
+        unbucketed_instructions = get_all_state_instructions(self.mutator, "earthquake", "splash")
+        config.damage_roll_bucket_size = 0.05
+        instructions = get_all_state_instructions(self.mutator, "earthquake", "splash")
+
+        self.assertLess(len(instructions), len(unbucketed_instructions))
+        self.assertGreater(self.knockout_percentage(unbucketed_instructions), 0)
+        self.assertAlmostEqual(self.knockout_percentage(unbucketed_instructions), self.knockout_percentage(instructions))
+        self.assertAlmostEqual(1.0, sum(i.percentage for i in instructions))
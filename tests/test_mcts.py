@@ -0,0 +1,105 @@
+import unittest
+
+import config
+import constants
+from showdown.battle_bots.mcts.main import monte_carlo_tree_search
+from showdown.battle_bots.mcts.main import pick_most_visited_move
+from showdown.battle_bots.mcts.main import search_states
+from showdown.battle_bots.mcts.main import normalize_score
+from showdown.engine import parallel_search
+from showdown.engine.state_hash import hash_state
+
+from . import test_select_best_move
+
+
+class TestMonteCarloTreeSearch(unittest.TestCase):
+    setUp = test_select_best_move.TestGetPayoffMatrix.setUp
+
+    def test_stops_after_the_number_of_iterations(self):
+        visits, iterations = monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 50, float('inf'), 2, seed=0)
+
+        self.assertEqual(50, iterations)
+        self.assertEqual(50, sum(visits.values()))
+
+    def test_every_bot_option_is_visited(self):
+        visits, _ = monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 50, float('inf'), 2, seed=0)
+
+        self.assertEqual(self.user_options, list(visits))
+        self.assertTrue(all(visits.values()))
+
+    def test_stops_when_there_is_no_time(self):
+        visits, iterations = monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 50, 0, 2, seed=0)
+
+        self.assertEqual(0, iterations)
+        self.assertEqual(0, sum(visits.values()))
+
+    def test_search_does_not_modify_the_state(self):
+        state_hash = hash_state(self.state)
+        monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 100, float('inf'), 3, seed=0)
+
+        self.assertEqual(state_hash, hash_state(self.state))
+
+    def test_search_with_the_same_seed_gives_the_same_visits(self):
+        visits, _ = monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 100, float('inf'), 2, seed=1)
+        same_visits, _ = monte_carlo_tree_search(self.state, self.user_options, self.opponent_options, 100, float('inf'), 2, seed=1)
+
+        self.assertEqual(visits, same_visits)
+
+    def test_finishing_the_battle_is_visited_the_most(self):
+        self.state.opponent.active.hp = 1
+        self.state.opponent.reserve = {}
+        self.state.self.active.speed = 999
+        self.state.opponent.active.moves = [{constants.ID: 'moonblast', constants.DISABLED: False, constants.CURRENT_PP: 16}]
+        self.state.self.reserve = {}
+        user_options, opponent_options = self.state.get_all_options()
+
+        visits, _ = monte_carlo_tree_search(self.state, user_options, opponent_options, 200, float('inf'), 2, seed=0)
+
+        self.assertEqual('thunderbolt', max(visits, key=visits.get))
+
+
+class TestSearchStates(unittest.TestCase):
+    def setUp(self):
+        test_select_best_move.TestGetPayoffMatrix.setUp(self)
+        self.original_search_processes = config.search_processes
+
+    def tearDown(self):
+        parallel_search.shutdown_executor()
+        config.search_processes = self.original_search_processes
+
+    def test_searches_each_state_serially(self):
+        config.search_processes = 1
+        results = search_states([(self.state, self.user_options, self.opponent_options)] * 2, 20, float('inf'), 2)
+
+        self.assertEqual(2, len(results))
+        self.assertEqual([20, 20], [iterations for _, iterations in results])
+
+    def test_visits_of_each_worker_are_added_together(self):
+        config.search_processes = 2
+        results = search_states([(self.state, self.user_options, self.opponent_options)], 20, float('inf'), 2)
+
+        visits, iterations = results[0]
+        self.assertEqual(20, iterations)
+        self.assertEqual(20, sum(visits.values()))
+
+
+class TestPickMostVisitedMove(unittest.TestCase):
+    def test_picks_the_most_visited_move(self):
+        self.assertEqual('b', pick_most_visited_move([({'a': 10, 'b': 30}, 40)]))
+
+    def test_each_search_has_an_equal_say(self):
+        results = [
+            ({'a': 60, 'b': 40}, 100),
+            ({'a': 1, 'b': 9}, 10),
+        ]
+
+        self.assertEqual('b', pick_most_visited_move(results))
+
+
+class TestNormalizeScore(unittest.TestCase):
+    def test_large_scores_approach_a_won_or_lost_battle(self):
+        self.assertAlmostEqual(1, normalize_score(10000))
+        self.assertAlmostEqual(-1, normalize_score(-10000))
+
+    def test_even_score_is_zero(self):
+        self.assertEqual(0, normalize_score(0))
@@ -0,0 +1,109 @@
+import unittest
+from collections import defaultdict
+
+import constants
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.move_ordering import MoveOrderer
+from showdown.engine.move_ordering import KILLER_MOVES_PER_DEPTH
+
+from .test_select_best_move import create_pokemon
+
+
+class TestMoveOrderer(unittest.TestCase):
+    def setUp(self):
+        self.move_orderer = MoveOrderer()
+        self.state = State(
+            Side(create_pokemon("raichu", 73, ['thunderbolt', 'surf']), {}, (0, 0), defaultdict(int)),
+            Side(create_pokemon("garchomp", 75, ['earthquake', 'dragonclaw', 'swordsdance']), {}, (0, 0), defaultdict(int)),
+            None,
+            None,
+            False
+        )
+        self.opponent_options = ['swordsdance', 'dragonclaw', 'earthquake', 'switch gyarados']
+
+    def test_opponent_options_are_ordered_by_damage_when_nothing_has_been_recorded(self):
+        options = self.move_orderer.order_opponent_options(self.state, self.opponent_options, 1)
+
+        self.assertEqual(['earthquake', 'dragonclaw', 'swordsdance', 'switch gyarados'], options)
+
+    def test_killer_move_is_ordered_first(self):
+        self.move_orderer.record_cutoff('swordsdance', 1, False)
+        options = self.move_orderer.order_opponent_options(self.state, self.opponent_options, 1)
+
+        self.assertEqual('swordsdance', options[0])
+
+    def test_killer_moves_are_kept_per_depth(self):
+        self.move_orderer.record_cutoff('swordsdance', 0, False)
+
+        self.assertEqual(['swordsdance'], self.move_orderer.killer_moves[0])
+        self.assertEqual([], self.move_orderer.killer_moves[1])
+
+    def test_most_recent_killer_moves_are_kept(self):
+        for move in ['swordsdance', 'dragonclaw', 'earthquake']:
+            self.move_orderer.record_cutoff(move, 1, False)
+
+        self.assertEqual(['earthquake', 'dragonclaw'], self.move_orderer.killer_moves[1])
+        self.assertEqual(KILLER_MOVES_PER_DEPTH, len(self.move_orderer.killer_moves[1]))
+
+    def test_history_orders_opponent_options_at_other_depths(self):
+        self.move_orderer.record_cutoff('swordsdance', 2, False)
+        options = self.move_orderer.order_opponent_options(self.state, self.opponent_options, 0)
+
+        self.assertEqual('swordsdance', options[0])
+
+    def test_user_options_without_history_keep_their_order(self):
+        user_options = ['thunderbolt', 'surf', 'switch xatu']
+
+        self.assertEqual(user_options, self.move_orderer.order_user_options(self.state, user_options, 1))
+
+    def test_best_user_option_is_ordered_first(self):
+        self.move_orderer.record_best_user_option('surf', 1)
+        options = self.move_orderer.order_user_options(self.state, ['thunderbolt', 'surf', 'switch xatu'], 1)
+
+        self.assertEqual(['surf', 'thunderbolt', 'switch xatu'], options)
+
+    def test_first_reply_cutoff_rate(self):
+        self.move_orderer.record_cutoff('swordsdance', 1, True)
+        self.move_orderer.record_cutoff('swordsdance', 1, True)
+        self.move_orderer.record_cutoff('earthquake', 1, False)
+
+        self.assertEqual(3, self.move_orderer.cutoffs)
+        self.assertEqual(2, self.move_orderer.first_reply_cutoffs)
+        self.assertAlmostEqual(2 / 3, self.move_orderer.first_reply_cutoff_rate)
+
+    def test_first_reply_cutoff_rate_is_zero_without_cutoffs(self):
+        self.assertEqual(0.0, self.move_orderer.first_reply_cutoff_rate)
+
+    def test_age_halves_history_and_clears_killer_moves(self):
+        self.move_orderer.record_cutoff('swordsdance', 1, False)
+        self.move_orderer.record_best_user_option('surf', 0)
+        self.move_orderer.age()
+
+        self.assertEqual(2, self.move_orderer.opponent_history['swordsdance'])
+        self.assertNotIn('surf', self.move_orderer.user_history)
+        self.assertEqual([], self.move_orderer.killer_moves[1])
+
+    def test_merge_adds_history_and_puts_the_other_killer_moves_first(self):
+        other = MoveOrderer()
+        self.move_orderer.record_cutoff('swordsdance', 1, False)
+        self.move_orderer.record_cutoff('dragonclaw', 1, False)
+        other.record_cutoff('earthquake', 1, False)
+        other.record_cutoff('swordsdance', 1, True)
+        self.move_orderer.merge(other)
+
+        self.assertEqual(8, self.move_orderer.opponent_history['swordsdance'])
+        self.assertEqual(['swordsdance', 'earthquake'], self.move_orderer.killer_moves[1])
+        self.assertEqual(4, self.move_orderer.cutoffs)
+        self.assertEqual(1, self.move_orderer.first_reply_cutoffs)
+
+    def test_damage_estimate_is_cached(self):
+        self.move_orderer.estimate_damage(self.state.opponent.active, self.state.self.active, 'earthquake')
+        self.move_orderer.estimate_damage(self.state.opponent.active, self.state.self.active, 'earthquake')
+
+        self.assertEqual(1, self.move_orderer._damage_estimates.hits)
+
+    def test_switch_and_status_moves_estimate_no_damage(self):
+        self.assertEqual(0, self.move_orderer.estimate_damage(self.state.opponent.active, self.state.self.active, 'switch gyarados'))
+        self.assertEqual(0, self.move_orderer.estimate_damage(self.state.opponent.active, self.state.self.active, 'swordsdance'))
+        self.assertEqual(0, self.move_orderer.estimate_damage(self.state.opponent.active, self.state.self.active, constants.DO_NOTHING_MOVE))
@@ -0,0 +1,55 @@
+import copy
+import pickle
+import unittest
+
+import constants
+from data import all_move_json
+from data.move_table import FrozenDict
+from data.move_table import compile_move_table
+from showdown.engine.damage_calculator import get_move
+
+
+class TestCompileMoveTable(unittest.TestCase):
+    def setUp(self):
+        self.move_table = compile_move_table({
+            'testmove': {
+                constants.ID: 'testmove',
+                constants.BASE_POWER: 80,
+                constants.FLAGS: {constants.CHARGE: 1},
+                constants.DRAIN: [1, 2],
+                constants.SECONDARY: {constants.BOOSTS: {constants.SPEED: -1}}
+            }
+        })
+        self.move = self.move_table['testmove']
+
+    def test_moves_are_read_only(self):
+        with self.assertRaises(TypeError):
+            self.move[constants.BASE_POWER] = 100
+        with self.assertRaises(TypeError):
+            self.move.pop(constants.BASE_POWER)
+        with self.assertRaises(TypeError):
+            self.move.update({constants.BASE_POWER: 100})
+
+    def test_nested_values_are_read_only(self):
+        with self.assertRaises(TypeError):
+            self.move[constants.FLAGS].pop(constants.CHARGE)
+        with self.assertRaises(TypeError):
+            self.move[constants.SECONDARY][constants.BOOSTS][constants.SPEED] = -2
+        self.assertEqual((1, 2), self.move[constants.DRAIN])
+
+    def test_copy_returns_a_regular_dictionary_that_can_be_changed(self):
+        move_copy = self.move.copy()
+        move_copy[constants.BASE_POWER] = 100
+
+        self.assertIs(dict, type(move_copy))
+        self.assertEqual(80, self.move[constants.BASE_POWER])
+
+    def test_deepcopy_and_pickle_keep_the_move_read_only(self):
+        self.assertIs(self.move, copy.deepcopy(self.move))
+
+        unpickled_move = pickle.loads(pickle.dumps(self.move))
+        self.assertIsInstance(unpickled_move, FrozenDict)
+        self.assertEqual(self.move, unpickled_move)
+
+    def test_get_move_shares_the_move_instead_of_copying_it(self):
+        self.assertIs(all_move_json['fireblast'], get_move('fireblast'))
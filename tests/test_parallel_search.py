@@ -0,0 +1,140 @@
+import unittest
+from copy import deepcopy
+from unittest import mock
+
+import config
+from showdown.engine import parallel_search
+from showdown.engine.objects import StateMutator
+from showdown.engine.parallel_search import get_payoff_matrix_parallel
+from showdown.engine.parallel_search import search_states
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import pick_safest
+from showdown.engine.select_best_move import SearchTimeout
+from showdown.engine.transposition_table import SEARCH_SETTINGS
+from showdown.engine.transposition_table import get_search_settings
+
+from . import test_select_best_move
+
+
+class TestGetPayoffMatrixParallel(unittest.TestCase):
+    setUp = test_select_best_move.TestGetPayoffMatrix.setUp
+
+    @classmethod
+    def setUpClass(cls):
+        cls.original_search_processes = config.search_processes
+        config.search_processes = 2
+
+    @classmethod
+    def tearDownClass(cls):
+        parallel_search.shutdown_executor()
+        config.search_processes = cls.original_search_processes
+
+    def test_unpruned_parallel_search_gives_the_same_scores_as_a_serial_search(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+        scores = get_payoff_matrix_parallel(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(list(expected_scores), list(scores))
+
+    def test_pruned_parallel_search_gives_the_same_decision_as_a_serial_search(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True)
+        scores = get_payoff_matrix_parallel(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True)
+
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_expired_deadline_raises_searchtimeout(self):
+        with self.assertRaises(SearchTimeout):
+            get_payoff_matrix_parallel(self.mutator, self.user_options, self.opponent_options, depth=2, deadline=0)
+
+
+class TestSearchStates(unittest.TestCase):
+    setUp = test_select_best_move.TestGetPayoffMatrix.setUp
+
+    def tearDown(self):
+        parallel_search.shutdown_executor()
+        config.search_processes = 1
+
+    def create_searches(self):
+        other_state = deepcopy(self.state)
+        other_state.opponent.active.hp = 1
+        return [
+            (self.state, self.user_options, self.opponent_options),
+            (other_state, self.user_options, self.opponent_options),
+        ]
+
+    def test_parallel_search_gives_the_same_results_as_a_serial_search(self):
+        config.search_processes = 1
+        expected_results = search_states(self.create_searches(), 2, float('inf'), prune=False)
+
+        config.search_processes = 2
+        results = search_states(self.create_searches(), 2, float('inf'), prune=False)
+
+        self.assertEqual(expected_results, results)
+
+    def test_results_are_returned_in_the_order_of_the_searches(self):
+        config.search_processes = 2
+        searches = self.create_searches()
+        results = search_states(searches, 1, float('inf'), prune=False)
+
+        expected_scores = [
+            get_payoff_matrix(StateMutator(state), user_options, opponent_options, depth=1, prune=False)
+            for state, user_options, opponent_options in searches
+        ]
+        self.assertEqual(expected_scores, [scores for scores, _ in results])
+
+
+def get_worker_settings():
+    return get_search_settings(), config.search_processes
+
+
+class TestWorkerInitialization(unittest.TestCase):
+    def setUp(self):
+        self.original_worker_settings = parallel_search._worker_settings
+        parallel_search._worker_settings = None
+
+    def tearDown(self):
+        parallel_search._worker_settings = self.original_worker_settings
+        parallel_search.shutdown_executor()
+        config.search_processes = 1
+
+    def test_worker_is_initialized_by_its_first_task_only(self):
+        settings = (None, ('average', 0.0, False, 0.0, 0), 15)
+        with mock.patch.object(parallel_search, '_initialize_worker') as initialize_worker:
+            parallel_search._run_task(settings, False, max, 1, 2)
+            result = parallel_search._run_task(settings, False, max, 1, 2)
+
+        initialize_worker.assert_called_once_with(*settings)
+        self.assertEqual((2, None), result)
+
+    def test_worker_is_initialized_again_when_the_settings_change(self):
+        with mock.patch.object(parallel_search, '_initialize_worker') as initialize_worker:
+            parallel_search._run_task((None, ('average', 0.0, False, 0.0, 0), 15), False, max, 1, 2)
+            parallel_search._run_task((None, ('average', 0.0, False, 0.1, 0), 15), False, max, 1, 2)
+
+        self.assertEqual(2, initialize_worker.call_count)
+
+    def test_worker_searches_with_the_search_settings_of_the_main_process(self):
+        # the worker is started before the settings change, as it would be with a fresh interpreter
+        executor = parallel_search.get_executor()
+        parallel_search.gather_results([parallel_search.submit(executor, get_worker_settings)])
+
+        original_settings = get_search_settings()
+        config.damage_roll_bucket_size = 0.5
+        config.chance_pruning_epsilon = 0.01
+        try:
+            expected_settings = get_search_settings()
+            worker_settings, search_processes = parallel_search.gather_results([parallel_search.submit(executor, get_worker_settings)])[0]
+        finally:
+            for name, value in zip(SEARCH_SETTINGS, original_settings):
+                setattr(config, name, value)
+
+        self.assertEqual(expected_settings, worker_settings)
+        self.assertEqual(1, search_processes)
+
+    def test_shutdown_leaves_no_pending_tasks(self):
+        config.search_processes = 2
+        futures = [parallel_search.submit(parallel_search.get_executor(), max, i, 1) for i in range(4)]
+        parallel_search.shutdown_executor()
+
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(set(), parallel_search._pending_futures)
@@ -0,0 +1,218 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import config
+import data
+from showdown.engine import profiler
+from showdown.engine.find_state_instructions import get_state_instruction_cache
+from showdown.engine.objects import StateMutator
+from showdown.engine.pondering import Ponderer
+from showdown.engine.pondering import get_likely_positions
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import SearchTimeout
+from showdown.engine.transposition_table import get_transposition_table
+from showdown.run_battle import get_decision_option
+from showdown.run_battle import start_pondering
+
+from benchmarks.positions import choice_locked
+
+
+class PonderingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.original_pokemon_mode = config.pokemon_mode
+        self.original_pokemon_sets = data.pokemon_sets
+        config.pokemon_mode = 'gen8randombattle'
+        data.pokemon_sets = data.random_battle_sets
+
+        battle = choice_locked().prepare_battles(join_moves_together=True)[0]
+        self.state = battle.create_state()
+        self.user_options, self.opponent_options = battle.get_all_options()
+        self.battle = battle
+
+        get_transposition_table().clear()
+        get_state_instruction_cache().clear()
+
+    def tearDown(self):
+        config.pokemon_mode = self.original_pokemon_mode
+        data.pokemon_sets = self.original_pokemon_sets
+        get_transposition_table().clear()
+        get_state_instruction_cache().clear()
+
+
+class TestCancelledSearch(PonderingTestCase):
+    def test_search_that_is_not_cancelled_completes(self):
+        scores = get_payoff_matrix(StateMutator(self.state), self.user_options, self.opponent_options, depth=1, cancelled=threading.Event())
+        self.assertTrue(scores)
+
+    def test_cancelled_search_raises_searchtimeout(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(SearchTimeout):
+            get_payoff_matrix(StateMutator(self.state), self.user_options, self.opponent_options, depth=1, cancelled=cancelled)
+
+    def test_cancelled_search_of_the_likely_positions_raises_searchtimeout(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(SearchTimeout):
+            get_likely_positions(self.state, 'dracometeor', self.opponent_options, max_positions=100, cancelled=cancelled)
+
+
+class TestGetLikelyPositions(PonderingTestCase):
+    def test_probabilities_add_up_to_one_with_the_most_likely_first(self):
+        positions = get_likely_positions(self.state, 'dracometeor', self.opponent_options, max_positions=100)
+
+        probabilities = [probability for probability, _ in positions]
+        self.assertAlmostEqual(1, sum(probabilities))
+        self.assertEqual(sorted(probabilities, reverse=True), probabilities)
+
+    def test_positions_are_distinct_and_the_state_is_unchanged(self):
+        state_hash = StateMutator(self.state).state_hash
+        positions = get_likely_positions(self.state, 'dracometeor', self.opponent_options, max_positions=100)
+
+        hashes = [StateMutator(position).state_hash for _, position in positions]
+        self.assertEqual(len(hashes), len(set(hashes)))
+        self.assertEqual(state_hash, StateMutator(self.state).state_hash)
+
+    def test_only_the_most_likely_positions_are_returned(self):
+        all_positions = get_likely_positions(self.state, 'dracometeor', self.opponent_options, max_positions=100)
+        positions = get_likely_positions(self.state, 'dracometeor', self.opponent_options, max_positions=2)
+
+        self.assertEqual([p for p, _ in all_positions[:2]], [p for p, _ in positions])
+
+
+class TestPonderer(PonderingTestCase):
+    def wait_for(self, ponderer):
+        end = time.time() + 30
+        while ponderer.running and time.time() < end:
+            time.sleep(0.01)
+
+    def start(self, ponderer, max_depth, time_budget=float('inf'), prune=True):
+        ponderer.start(self.battle, lambda battle: (battle.create_state(), 'dracometeor', self.opponent_options), max_depth, time_budget, prune)
+
+    def most_likely_position(self):
+        _, position = get_likely_positions(self.state, 'dracometeor', self.opponent_options, config.ponder_max_positions)[0]
+        return position
+
+    def test_pondered_positions_are_not_searched_again(self):
+        ponderer = Ponderer()
+        self.start(ponderer, max_depth=1)
+        self.wait_for(ponderer)
+        ponderer.stop()
+
+        self.assertGreater(ponderer.positions, 0)
+        self.assertEqual(ponderer.positions, ponderer.positions_searched)
+
+        position = self.most_likely_position()
+        user_options, opponent_options = position.get_all_options()
+        with profiler.profiling() as search_profiler:
+            get_payoff_matrix(StateMutator(position), user_options, opponent_options, depth=1, transposition_table=get_transposition_table())
+
+        self.assertEqual(1, search_profiler.counters['transposition_hits'])
+        self.assertEqual(0, search_profiler.counters['nodes'])
+
+    def test_unpruned_search_of_a_pondered_position_is_not_searched_again(self):
+        ponderer = Ponderer()
+        self.start(ponderer, max_depth=1, prune=False)
+        self.wait_for(ponderer)
+        ponderer.stop()
+
+        position = self.most_likely_position()
+        user_options, opponent_options = position.get_all_options()
+        with profiler.profiling() as search_profiler:
+            get_payoff_matrix(StateMutator(position), user_options, opponent_options, depth=1, prune=False, transposition_table=get_transposition_table())
+
+        self.assertEqual(1, search_profiler.counters['transposition_hits'])
+        self.assertEqual(0, search_profiler.counters['nodes'])
+
+    def test_positions_are_not_searched_deeper_than_the_time_budget_allows(self):
+        ponderer = Ponderer()
+        self.start(ponderer, max_depth=3, time_budget=0)
+        self.wait_for(ponderer)
+        ponderer.stop()
+
+        self.assertEqual(ponderer.positions, ponderer.positions_searched)
+        position = self.most_likely_position()
+        user_options, opponent_options = position.get_all_options()
+        state_hash = StateMutator(position).state_hash
+        for depth, expected in [(1, True), (2, False)]:
+            key = get_transposition_table().make_key(state_hash, depth, user_options, opponent_options, True)
+            self.assertEqual(expected, key in get_transposition_table(), depth)
+
+    def test_shared_caches_are_only_changed_once_pondering_stops(self):
+        ponderer = Ponderer()
+        self.start(ponderer, max_depth=1)
+        self.wait_for(ponderer)
+
+        self.assertEqual(0, len(get_transposition_table()))
+        self.assertEqual(0, len(get_state_instruction_cache()))
+
+        ponderer.stop()
+
+        self.assertGreater(len(get_transposition_table()), 0)
+        self.assertGreater(len(get_state_instruction_cache()), 0)
+
+    def test_battle_is_copied_in_the_thread(self):
+        prepared = []
+        ponderer = Ponderer()
+        ponderer.start(self.battle, lambda battle: prepared.append(battle), 1, float('inf'), True)
+        ponderer.wait_until_copied()
+        ponderer.stop()
+
+        self.assertEqual(1, len(prepared))
+        self.assertIsNot(self.battle, prepared[0])
+
+    def test_nothing_is_searched_when_there_is_nothing_to_ponder(self):
+        ponderer = Ponderer()
+        ponderer.start(self.battle, lambda battle: None, 1, float('inf'), True)
+        ponderer.stop()
+
+        self.assertEqual(0, ponderer.positions)
+        self.assertEqual(0, len(get_transposition_table()))
+
+    def test_stop_cancels_the_search(self):
+        ponderer = Ponderer()
+        self.start(ponderer, max_depth=6)
+        time.sleep(0.05)
+
+        start = time.time()
+        ponderer.stop()
+
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(ponderer.running)
+        self.assertLess(ponderer.positions_searched, max(ponderer.positions, 1))
+
+    def test_stop_without_starting_does_nothing(self):
+        Ponderer().stop()
+
+
+class TestStartPondering(PonderingTestCase):
+    def test_the_bot_search_mode_is_pondered(self):
+        with mock.patch('showdown.run_battle.get_ponderer') as get_ponderer:
+            start_pondering(self.battle, ['/choose move dracometeor', '1'])
+
+        _, _, max_depth, time_budget, prune = get_ponderer.return_value.start.call_args[0]
+        self.assertEqual((config.search_depth, config.search_time_budget, True), (max_depth, time_budget, prune))
+
+    def test_a_bot_that_does_not_search_is_not_pondered(self):
+        self.battle.search_prune = None
+        with mock.patch('showdown.run_battle.get_ponderer') as get_ponderer:
+            start_pondering(self.battle, ['/choose move dracometeor', '1'])
+
+        get_ponderer.return_value.start.assert_not_called()
+
+
+class TestGetDecisionOption(PonderingTestCase):
+    def test_move(self):
+        self.assertEqual('dracometeor', get_decision_option(self.battle, ['/choose move dracometeor', '1']))
+
+    def test_move_with_a_modifier(self):
+        self.assertEqual('dracometeor', get_decision_option(self.battle, ['/choose move dracometeor mega', '1']))
+
+    def test_switch(self):
+        pkmn = self.battle.user.reserve[0]
+        self.assertEqual('switch {}'.format(pkmn.name), get_decision_option(self.battle, ['/switch {}'.format(pkmn.index), '1']))
+
+    def test_team_preview(self):
+        self.assertIsNone(get_decision_option(self.battle, ['/team 123456|1', '1']))
@@ -0,0 +1,122 @@
+import unittest
+from collections import defaultdict
+
+from showdown.engine import profiler
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import StateMutator
+from showdown.engine.select_best_move import get_payoff_matrix
+
+from .test_select_best_move import create_pokemon
+
+
+class TestProfiling(unittest.TestCase):
+    def test_nothing_is_profiled_outside_of_a_profiling_block(self):
+        self.assertIsNone(profiler.get_active_profiler())
+        profiler.count('nodes')
+        self.assertIsNone(profiler.get_active_profiler())
+
+    def test_counts_are_recorded_inside_a_profiling_block(self):
+        with profiler.profiling() as search_profiler:
+            profiler.count('nodes')
+            profiler.count('instruction_sets', 3)
+
+        self.assertEqual(1, search_profiler.counters['nodes'])
+        self.assertEqual(3, search_profiler.counters['instruction_sets'])
+        self.assertIsNone(profiler.get_active_profiler())
+
+    def test_sample_rate_of_zero_does_not_profile(self):
+        with profiler.profiling(0) as search_profiler:
+            self.assertIsNone(search_profiler)
+            self.assertIsNone(profiler.get_active_profiler())
+
+    def test_nested_profiling_block_is_counted_by_the_outer_profiler(self):
+        with profiler.profiling() as outer_profiler:
+            with profiler.profiling() as inner_profiler:
+                profiler.count('nodes')
+
+        self.assertIsNone(inner_profiler)
+        self.assertEqual(1, outer_profiler.counters['nodes'])
+
+    def test_timed_function_is_timed(self):
+        @profiler.timed('test')
+        def function(value):
+            return value * 2
+
+        with profiler.profiling() as search_profiler:
+            self.assertEqual(4, function(2))
+
+        self.assertIn('test', search_profiler.seconds)
+        self.assertLessEqual(search_profiler.seconds['test'], search_profiler.wall_seconds)
+
+    def test_recursive_function_is_only_timed_by_the_outermost_call(self):
+        calls = []
+
+        @profiler.timed('test')
+        def function(depth):
+            calls.append((depth, dict(search_profiler.seconds)))
+            if depth:
+                function(depth - 1)
+
+        with profiler.profiling() as search_profiler:
+            function(3)
+
+        # nothing was recorded until the outermost call returned
+        self.assertTrue(all('test' not in seconds for _, seconds in calls))
+        self.assertLessEqual(search_profiler.seconds['test'], search_profiler.wall_seconds)
+
+    def test_merge_adds_the_counters_and_times_of_a_summary(self):
+        search_profiler = profiler.SearchProfiler()
+        search_profiler.count('nodes', 2)
+        search_profiler.seconds['search'] = 1.0
+
+        search_profiler.merge({'counters': {'nodes': 3, 'leaves': 1}, 'seconds': {'search': 0.5, 'evaluate': 0.25}})
+
+        self.assertEqual({'nodes': 5, 'leaves': 1}, dict(search_profiler.counters))
+        self.assertEqual({'search': 1.5, 'evaluate': 0.25}, dict(search_profiler.seconds))
+
+    def test_run_profiled_returns_a_summary_only_when_profiling(self):
+        def function(amount):
+            profiler.count('nodes', amount)
+            return amount
+
+        self.assertEqual((2, None), profiler.run_profiled(False, function, 2))
+
+        result, summary = profiler.run_profiled(True, function, 2)
+        self.assertEqual(2, result)
+        self.assertEqual({'nodes': 2}, summary['counters'])
+
+
+class TestProfilingSearch(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                create_pokemon("pikachu", 100, ["thunderbolt", "tackle"]),
+                {"rattata": create_pokemon("rattata", 100, ["tackle"])},
+                (0, 0),
+                defaultdict(lambda: 0)
+            ),
+            Side(
+                create_pokemon("bulbasaur", 100, ["gigadrain", "tackle"]),
+                {"pidgey": create_pokemon("pidgey", 100, ["tackle"])},
+                (0, 0),
+                defaultdict(lambda: 0)
+            ),
+            None,
+            None,
+            False
+        )
+        self.mutator = StateMutator(self.state)
+
+    def test_search_records_nodes_and_subsystem_times(self):
+        user_options, opponent_options = self.state.get_all_options()
+        with profiler.profiling() as search_profiler:
+            get_payoff_matrix(self.mutator, user_options, opponent_options, depth=2, prune=False)
+
+        summary = search_profiler.summary()
+        self.assertGreater(summary['counters']['nodes'], 1)
+        self.assertGreater(summary['counters']['leaves'], 0)
+        self.assertGreater(summary['counters']['instruction_sets'], 0)
+        self.assertGreaterEqual(summary['instruction_sets_per_node'], 1)
+        for subsystem in ['search', 'state_instructions', 'mutator', 'evaluate']:
+            self.assertIn(subsystem, summary['seconds'])
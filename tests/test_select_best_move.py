@@ -1,10 +1,23 @@
 import unittest
+from unittest import mock
 from collections import defaultdict
 
+import config
 import constants
 from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
+from showdown.engine.objects import StateMutator
+from showdown.engine.evaluate import evaluate
+from showdown.engine.evaluate import evaluation_bounds
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import iterative_deepening_payoff_matrix
+from showdown.engine.select_best_move import SearchTimeout
+from showdown.engine.select_best_move import pick_safest
+from showdown.engine.state_hash import hash_state
+from showdown.engine.transposition_table import TranspositionTable
+from showdown.engine.move_ordering import MoveOrderer
+from showdown.engine import profiler
 from showdown.battle import Pokemon as StatePokemon
 
 
@@ -465,3 +478,330 @@ class TestGetAllOptions(unittest.TestCase):
         options = self.state.get_all_options()
 
         self.assertEqual(expected_options, options)
+
+
+def create_pokemon(name, level, moves):
+    pkmn = Pokemon.from_state_pokemon_dict(StatePokemon(name, level).to_dict())
+    pkmn.moves = [{constants.ID: m, constants.DISABLED: False, constants.CURRENT_PP: 16} for m in moves]
+    return pkmn
+
+
+class TestGetPayoffMatrix(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                create_pokemon("raichu", 73, ['thunderbolt', 'surf', 'focusblast', 'nastyplot']),
+                {
+                    "xatu": create_pokemon("xatu", 81, ['psychic', 'roost']),
+                    "starmie": create_pokemon("starmie", 81, ['surf', 'recover']),
+                },
+                (0, 0),
+                defaultdict(int)
+            ),
+            Side(
+                create_pokemon("aromatisse", 81, ['moonblast', 'wish', 'protect', 'calmmind']),
+                {
+                    "yveltal": create_pokemon("yveltal", 73, ['darkpulse', 'roost']),
+                    "toxapex": create_pokemon("toxapex", 73, ['scald', 'toxic']),
+                },
+                (0, 0),
+                defaultdict(int)
+            ),
+            None,
+            None,
+            False
+        )
+        self.mutator = StateMutator(self.state)
+        self.user_options, self.opponent_options = self.state.get_all_options()
+
+    def test_search_does_not_modify_the_state(self):
+        state_hash = hash_state(self.state)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2)
+
+        self.assertEqual(state_hash, hash_state(self.state))
+
+    def test_transposition_table_gives_the_same_scores_with_pruning(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True)
+        scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True, transposition_table=TranspositionTable(1000))
+
+        self.assertEqual(str(expected_scores), str(scores))
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_transposition_table_gives_the_same_scores_without_pruning(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+        scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False, transposition_table=TranspositionTable(1000))
+
+        self.assertEqual(expected_scores, scores)
+
+    def test_repeated_search_is_answered_from_the_transposition_table(self):
+        transposition_table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, transposition_table=transposition_table)
+        misses = transposition_table.misses
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, transposition_table=transposition_table)
+
+        self.assertEqual(misses, transposition_table.misses)
+        self.assertGreater(transposition_table.hits, 0)
+
+    def test_state_hash_changes_when_the_state_changes(self):
+        state_hash = hash_state(self.state)
+        self.state.self.active.hp -= 1
+
+        self.assertNotEqual(state_hash, hash_state(self.state))
+
+    def test_state_hash_ignores_side_conditions_with_a_count_of_zero(self):
+        state_hash = hash_state(self.state)
+        self.state.self.side_conditions[constants.REFLECT] = 0
+
+        self.assertEqual(state_hash, hash_state(self.state))
+
+    def test_expired_deadline_raises_searchtimeout(self):
+        with self.assertRaises(SearchTimeout):
+            get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, deadline=0)
+
+    def test_searchtimeout_leaves_the_state_unchanged(self):
+        state_hash = hash_state(self.state)
+
+        with self.assertRaises(SearchTimeout):
+            get_payoff_matrix(self.mutator, self.user_options[:1], self.opponent_options[:1], depth=2, deadline=float('inf'), transposition_table=_ExpiringTable())
+
+        self.assertEqual(state_hash, hash_state(self.state))
+        self.assertEqual(state_hash, self.mutator.state_hash)
+
+    def test_evaluation_bounds_contain_the_evaluation_of_the_state(self):
+        lower, upper = evaluation_bounds(self.state)
+
+        self.assertLessEqual(lower, evaluate(self.state))
+        self.assertGreaterEqual(upper, evaluate(self.state))
+
+    def test_evaluation_bounds_contain_extreme_states(self):
+        lower, upper = evaluation_bounds(self.state)
+
+        self.state.self.active.attack_boost = 6
+        self.state.self.active.special_attack_boost = 6
+        self.state.self.active.speed_boost = 6
+        self.state.self.active.volatile_status.add(constants.SUBSTITUTE)
+        self.state.opponent.active.special_defense_boost = -6
+        self.state.opponent.active.evasion_boost = -6
+        self.state.opponent.active.status = constants.FROZEN
+        self.state.opponent.reserve['yveltal'].hp = 0
+        self.state.self.side_conditions[constants.AURORA_VEIL] = 1
+        self.state.opponent.side_conditions[constants.SPIKES] = 3
+        self.state.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+        self.assertGreaterEqual(upper, evaluate(self.state))
+
+        self.state.self.active.attack_boost = -6
+        self.state.self.active.status = constants.FROZEN
+        self.state.self.reserve['xatu'].hp = 0
+        self.state.opponent.active.attack_boost = 6
+        self.state.opponent.active.special_defense_boost = 6
+        self.state.self.side_conditions[constants.STICKY_WEB] = 1
+        self.assertLessEqual(lower, evaluate(self.state))
+
+    def test_chance_node_pruning_gives_the_same_decision(self):
+        with mock.patch('showdown.engine.select_best_move.evaluation_bounds', return_value=(float('-inf'), float('inf'))):
+            expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2)
+        scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2)
+
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_chance_node_is_cut_when_its_upper_bound_is_below_the_best_row(self):
+        with mock.patch('showdown.engine.objects.StateMutator.evaluation', new_callable=mock.PropertyMock, side_effect=lambda: evaluate(self.state)) as evaluate_mock:
+            expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=1)
+        expected_evaluations = evaluate_mock.call_count
+
+        # an upper-bound this low cuts every chance-node with more than one outcome once the first row is searched
+        state_hash = hash_state(self.state)
+        with mock.patch('showdown.engine.select_best_move.evaluation_bounds', return_value=(-1000, -1000)), \
+                mock.patch('showdown.engine.objects.StateMutator.evaluation', new_callable=mock.PropertyMock, side_effect=lambda: evaluate(self.state)) as evaluate_mock:
+            scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=1)
+
+        self.assertLess(evaluate_mock.call_count, expected_evaluations)
+        self.assertEqual(state_hash, hash_state(self.state))
+        self.assertEqual(list(expected_scores), list(scores))
+        for move_pair, score in scores.items():
+            if move_pair[0] == self.user_options[0]:
+                self.assertEqual(expected_scores[move_pair], score)
+
+    def test_move_orderer_returns_scores_in_the_order_of_the_options(self):
+        scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, move_orderer=MoveOrderer())
+
+        self.assertEqual(
+            [(u, o) for u in self.user_options for o in self.opponent_options],
+            list(scores)
+        )
+
+    def test_move_orderer_does_not_modify_the_state(self):
+        state_hash = hash_state(self.state)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, move_orderer=MoveOrderer())
+
+        self.assertEqual(state_hash, hash_state(self.state))
+
+    def test_move_orderer_records_cutoffs(self):
+        move_orderer = MoveOrderer()
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, move_orderer=move_orderer)
+
+        self.assertGreater(move_orderer.cutoffs, 0)
+        self.assertLessEqual(move_orderer.first_reply_cutoffs, move_orderer.cutoffs)
+
+    def test_move_orderer_does_not_change_the_safest_option(self):
+        move_orderer = MoveOrderer()
+        # search the options in the reverse of the order they are given
+        for i, user_option in enumerate(self.user_options):
+            move_orderer.user_history[user_option] = i
+        for i, opponent_option in enumerate(self.opponent_options):
+            move_orderer.opponent_history[opponent_option] = i
+
+        expected_safest = pick_safest(get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True))
+        safest = pick_safest(get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True, move_orderer=move_orderer))
+
+        self.assertEqual(expected_safest[0][0], safest[0][0])
+        self.assertEqual(expected_safest[1], safest[1])
+
+    def test_pruning_does_not_change_the_safest_option(self):
+        expected_safest = pick_safest(get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False))
+        safest = pick_safest(get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True))
+
+        self.assertEqual(expected_safest[0][0], safest[0][0])
+        self.assertEqual(expected_safest[1], safest[1])
+
+    def test_skipped_cells_of_an_opponent_move_with_equal_scores_are_searched(self):
+        # the opponent's 'y' scores the same for each row that was searched, so whether it gives
+        # the bot a choice depends on the cell of the pruned row 'b'
+        with mock.patch('showdown.engine.select_best_move._score_cell', side_effect=[10, 0, -5, 20, 0, 7]):
+            scores = get_payoff_matrix(self.mutator, ['a', 'b', 'c'], ['x', 'y'], depth=1, prune=True)
+
+        self.assertEqual(7, scores[('b', 'y')])
+        self.assertEqual((('a', 'y'), 0), pick_safest(scores))
+
+    def test_move_orderer_is_not_used_without_pruning(self):
+        move_orderer = MoveOrderer()
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+        scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False, move_orderer=move_orderer)
+
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(0, move_orderer.cutoffs)
+
+
+class _ExpiringTable(TranspositionTable):
+    # raises SearchTimeout on the second lookup, i.e. inside the first child of the root
+    def __init__(self):
+        super(_ExpiringTable, self).__init__(1000)
+
+    def get(self, key, default=None):
+        if self.misses:
+            raise SearchTimeout()
+        return super(_ExpiringTable, self).get(key, default)
+
+
+class TestIterativeDeepeningPayoffMatrix(unittest.TestCase):
+    setUp = TestGetPayoffMatrix.setUp
+
+    def test_returns_the_deepest_search_when_there_is_enough_time(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+        scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 2, float('inf'), prune=False)
+
+        self.assertEqual(2, depth)
+        self.assertEqual(expected_scores, scores)
+
+    def test_completes_depth_one_when_there_is_no_time(self):
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=1, prune=False)
+        scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 3, 0, prune=False)
+
+        self.assertEqual(1, depth)
+        self.assertEqual(expected_scores, scores)
+
+    def test_does_not_search_deeper_with_a_single_option(self):
+        _, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options[:1], self.opponent_options, 3, float('inf'))
+
+        self.assertEqual(1, depth)
+
+    def test_reuses_a_search_of_the_position_with_its_options_in_a_different_order(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options[::-1], self.opponent_options[::-1], depth=2, prune=False, transposition_table=table)
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False)
+
+        with profiler.profiling() as search_profiler:
+            scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 2, 0, prune=False, transposition_table=table)
+
+        self.assertEqual(2, depth)
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(list(expected_scores), list(scores))
+        self.assertEqual(1, search_profiler.counters['retained_roots'])
+
+    def test_does_not_reuse_a_search_deeper_than_the_max_depth(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False, transposition_table=table)
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=1, prune=False)
+
+        scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 1, float('inf'), prune=False, transposition_table=table)
+
+        self.assertEqual(1, depth)
+        self.assertEqual(expected_scores, scores)
+
+    def test_does_not_reuse_a_search_of_fewer_options(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options[:1], self.opponent_options, depth=2, prune=False, transposition_table=table)
+
+        with profiler.profiling() as search_profiler:
+            _, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 3, 0, prune=False, transposition_table=table)
+
+        self.assertEqual(1, depth)
+        self.assertEqual(0, search_profiler.counters['retained_roots'])
+
+    def test_reuses_a_search_of_more_options_when_not_pruning(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False, transposition_table=table)
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options[:2], self.opponent_options, depth=2, prune=False)
+
+        with profiler.profiling() as search_profiler:
+            scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options[:2], self.opponent_options, 2, 0, prune=False, transposition_table=table)
+
+        self.assertEqual(2, depth)
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(1, search_profiler.counters['retained_roots'])
+
+    def test_reuses_a_pruned_search_of_the_same_options(self):
+        table = TranspositionTable(1000)
+        expected_scores = get_payoff_matrix(self.mutator, self.user_options[::-1], self.opponent_options, depth=2, prune=True, transposition_table=table)
+
+        with profiler.profiling() as search_profiler:
+            scores, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 2, 0, prune=True, transposition_table=table)
+
+        self.assertEqual(2, depth)
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+        self.assertEqual(1, search_profiler.counters['retained_roots'])
+
+    def test_does_not_reuse_a_search_made_with_other_search_settings(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=False, transposition_table=table)
+
+        original_chance_pruning_epsilon = config.chance_pruning_epsilon
+        config.chance_pruning_epsilon = 0.1
+        try:
+            with profiler.profiling() as search_profiler:
+                _, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 2, 0, prune=False, transposition_table=table)
+        finally:
+            config.chance_pruning_epsilon = original_chance_pruning_epsilon
+
+        self.assertEqual(1, depth)
+        self.assertEqual(0, search_profiler.counters['retained_roots'])
+        self.assertEqual(0, search_profiler.counters['transposition_hits'])
+
+    def test_does_not_reuse_a_pruned_search_of_more_options(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(self.mutator, self.user_options, self.opponent_options, depth=2, prune=True, transposition_table=table)
+
+        with profiler.profiling() as search_profiler:
+            _, depth = iterative_deepening_payoff_matrix(self.mutator, self.user_options[:2], self.opponent_options, 2, 0, prune=True, transposition_table=table)
+
+        self.assertEqual(1, depth)
+        self.assertEqual(0, search_profiler.counters['retained_roots'])
+
+    def test_the_best_option_of_a_retained_search_is_searched_first(self):
+        table = TranspositionTable(1000)
+        move_orderer = MoveOrderer()
+        retained_scores = get_payoff_matrix(self.mutator, self.user_options[-1:], self.opponent_options, depth=2, prune=False, transposition_table=table)
+
+        iterative_deepening_payoff_matrix(self.mutator, self.user_options, self.opponent_options, 1, float('inf'), prune=False, transposition_table=table, move_orderer=move_orderer)
+
+        self.assertEqual(pick_safest(retained_scores)[0][0], move_orderer.order_user_options(self.state, self.user_options, 1)[0])
@@ -1,6 +1,8 @@
 import unittest
+from unittest import mock
 
 from collections import defaultdict
+from copy import copy
 import constants
 
 from showdown.battle import Pokemon as StatePokemon
@@ -8,6 +10,13 @@ from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
 from showdown.engine.objects import StateMutator
+from showdown.engine.objects import TransposeInstruction
+from showdown.engine.objects import StateHashDivergedError
+from showdown.engine.objects import OPCODES
+from showdown.engine.objects import compile_instruction
+from showdown.engine.objects import compile_instructions
+from showdown.engine.state_hash import hash_state
+from showdown.engine.evaluate import evaluate
 
 
 class TestStatemutator(unittest.TestCase):
@@ -41,7 +50,7 @@ class TestStatemutator(unittest.TestCase):
             None,
             False
         )
-        self.mutator = StateMutator(self.state)
+        self.mutator = StateMutator(self.state, debug_hash=True)
 
     def test_switch_instruction_replaces_active(self):
         instruction = (
@@ -684,6 +693,21 @@ class TestStatemutator(unittest.TestCase):
         self.mutator.reverse(list_of_instructions)
         self.assertEqual(['normal'], self.state.self.active.types)
 
+    def test_apply_and_reverse_change_types_keeps_the_type_ids_up_to_date(self):
+        self.state.self.active.types = ['normal']
+        instruction = (
+            constants.MUTATOR_CHANGE_TYPE,
+            constants.SELF,
+            ['water', 'grass'],
+            self.state.self.active.types
+        )
+        list_of_instructions = [instruction]
+        self.mutator.apply(list_of_instructions)
+        self.assertEqual((2, 4), self.state.self.active.type_ids)
+
+        self.mutator.reverse(list_of_instructions)
+        self.assertEqual((0,), self.state.self.active.type_ids)
+
     def test_changing_item(self):
         self.state.self.active.item = 'some_item'
         instruction = (
@@ -800,3 +824,214 @@ class TestStatemutator(unittest.TestCase):
         self.mutator.reverse(list_of_instructions)
 
         self.assertEqual((2, 100), self.state.self.wish)
+
+
+class TestStateMutatorHash(unittest.TestCase):
+    def setUp(self):
+        TestStatemutator.setUp(self)
+        self.self_active_moves = [
+            {constants.ID: 'tackle', constants.DISABLED: False},
+            {constants.ID: 'growl', constants.DISABLED: False},
+        ]
+        self.state.self.active.moves = self.self_active_moves
+        self.mutator.rehash()
+        self.instructions = [
+            (constants.MUTATOR_DAMAGE, constants.SELF, 10),
+            (constants.MUTATOR_HEAL, constants.OPPONENT, 5),
+            (constants.MUTATOR_BOOST, constants.SELF, constants.ATTACK, 2),
+            (constants.MUTATOR_UNBOOST, constants.OPPONENT, constants.SPEED, 1),
+            (constants.MUTATOR_APPLY_STATUS, constants.SELF, constants.BURN),
+            (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.OPPONENT, constants.CONFUSION),
+            (constants.MUTATOR_SIDE_START, constants.SELF, constants.SPIKES, 1),
+            (constants.MUTATOR_WISH_START, constants.SELF, 50, 0),
+            (constants.MUTATOR_DISABLE_MOVE, constants.SELF, 'tackle'),
+            (constants.MUTATOR_WEATHER_START, constants.SUN, None),
+            (constants.MUTATOR_FIELD_START, constants.ELECTRIC_TERRAIN, None),
+            (constants.MUTATOR_TOGGLE_TRICKROOM,),
+            (constants.MUTATOR_CHANGE_TYPE, constants.SELF, ['water'], ['electric']),
+            (constants.MUTATOR_CHANGE_ITEM, constants.OPPONENT, 'leftovers', self.state.opponent.active.item),
+            (constants.MUTATOR_SWITCH, constants.SELF, 'pikachu', 'rattata'),
+            (constants.MUTATOR_SIDE_END, constants.SELF, constants.SPIKES, 1),
+            (constants.MUTATOR_WISH_DECREMENT, constants.SELF),
+        ]
+
+    def test_hash_matches_a_hash_from_scratch_after_applying_instructions(self):
+        self.mutator.apply(self.instructions)
+
+        self.assertEqual(hash_state(self.state), self.mutator.state_hash)
+
+    def test_hash_returns_to_its_original_value_after_reversing_instructions(self):
+        original_hash = self.mutator.state_hash
+        self.mutator.apply(self.instructions)
+        self.mutator.reverse(self.instructions)
+
+        self.assertEqual(original_hash, self.mutator.state_hash)
+
+    def test_hash_changes_after_applying_instructions(self):
+        original_hash = self.mutator.state_hash
+        self.mutator.apply(self.instructions)
+
+        self.assertNotEqual(original_hash, self.mutator.state_hash)
+
+    def test_debug_mode_raises_error_when_an_instruction_does_not_update_the_hash(self):
+        self.mutator.apply_opcodes[OPCODES[constants.MUTATOR_DAMAGE]] = lambda side, amount: setattr(self.state.self.active, 'hp', 1)
+
+        with self.assertRaises(StateHashDivergedError):
+            self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+
+    def test_debug_mode_allows_the_state_to_be_modified_directly_between_instructions(self):
+        self.state.self.active.hp = 1
+        self.mutator.apply([(constants.MUTATOR_HEAL, constants.SELF, 10)])
+
+        self.assertEqual(11, self.state.self.active.hp)
+
+    def test_rehash_picks_up_direct_modifications(self):
+        self.state.self.active.hp = 1
+        self.mutator.rehash()
+
+        self.assertEqual(hash_state(self.state), self.mutator.state_hash)
+
+    def test_hash_is_kept_after_a_block_that_leaves_the_state_as_it_found_it(self):
+        original_hash = self.mutator.state_hash
+        with self.mutator.hash_suspended():
+            self.mutator.apply(self.instructions)
+            self.mutator.reverse(self.instructions)
+
+        self.assertEqual(original_hash, self.mutator.state_hash)
+
+    def test_hash_is_not_kept_up_to_date_inside_a_suspended_block(self):
+        mutator = StateMutator(self.state, debug_hash=False)
+        mutator.state_hash
+        with mutator.hash_suspended():
+            with mock.patch('showdown.engine.state_hash.hp_key') as hp_key:
+                mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+                mutator.reverse([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+
+        hp_key.assert_not_called()
+
+    def test_hash_is_calculated_again_after_a_block_that_raises(self):
+        self.mutator.state_hash
+        with self.assertRaises(ValueError):
+            with self.mutator.hash_suspended():
+                self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+                raise ValueError()
+
+        self.assertEqual(hash_state(self.state), self.mutator.state_hash)
+
+
+class TestCompiledInstructions(unittest.TestCase):
+    def setUp(self):
+        TestStateMutatorHash.setUp(self)
+        self.compiled_instructions = compile_instructions(self.instructions)
+
+    def test_compiled_instruction_has_an_opcode_and_a_side_id(self):
+        self.assertEqual(
+            (OPCODES[constants.MUTATOR_BOOST], 1, constants.SPEED, 1),
+            compile_instruction((constants.MUTATOR_BOOST, constants.OPPONENT, constants.SPEED, 1))
+        )
+
+    def test_compiled_instruction_without_a_side_only_has_an_opcode(self):
+        self.assertEqual(
+            (OPCODES[constants.MUTATOR_WEATHER_START], constants.SUN, None),
+            compile_instruction((constants.MUTATOR_WEATHER_START, constants.SUN, None))
+        )
+        self.assertEqual((OPCODES[constants.MUTATOR_TOGGLE_TRICKROOM],), compile_instruction((constants.MUTATOR_TOGGLE_TRICKROOM,)))
+
+    def test_compiling_a_compiled_instruction_does_nothing(self):
+        self.assertEqual(self.compiled_instructions, compile_instructions(self.compiled_instructions))
+
+    def test_compiled_instructions_give_the_same_state_as_string_instructions(self):
+        self.mutator.apply(self.compiled_instructions)
+        compiled_hash = hash_state(self.state)
+        self.mutator.reverse(self.compiled_instructions)
+        self.mutator.apply(self.instructions)
+
+        self.assertEqual(hash_state(self.state), compiled_hash)
+        self.assertEqual(hash_state(self.state), self.mutator.state_hash)
+
+    def test_reversing_compiled_instructions_gives_back_the_original_state(self):
+        original_hash = hash_state(self.state)
+        self.mutator.apply(self.compiled_instructions)
+        self.mutator.reverse(self.compiled_instructions)
+
+        self.assertEqual(original_hash, hash_state(self.state))
+        self.assertEqual(original_hash, self.mutator.state_hash)
+
+    def test_transpose_instruction_compiles_its_instructions(self):
+        transpose_instruction = TransposeInstruction(1.0, list(self.instructions[:5]))
+        for instruction in self.instructions[5:]:
+            transpose_instruction.add_instruction(instruction)
+
+        self.assertEqual(list(self.compiled_instructions), transpose_instruction.compiled_instructions)
+        self.assertEqual(self.instructions, transpose_instruction.instructions)
+
+    def test_transpose_instruction_compiles_each_instruction_once(self):
+        transpose_instruction = TransposeInstruction(1.0, list(self.instructions[:5]))
+        copied_instruction = copy(transpose_instruction)
+
+        with mock.patch('showdown.engine.objects.compile_instruction', side_effect=compile_instruction) as compile_instruction_mock:
+            copied_instruction.add_instruction(self.instructions[5])
+            self.mutator.apply(copied_instruction.compiled_instructions)
+            self.mutator.reverse(copied_instruction.compiled_instructions)
+            self.mutator.apply(transpose_instruction.compiled_instructions)
+
+        self.assertEqual(1, compile_instruction_mock.call_count)
+
+    def test_setting_the_instructions_of_a_transpose_instruction_compiles_them_again(self):
+        transpose_instruction = TransposeInstruction(1.0, list(self.instructions[:5]))
+        transpose_instruction.compiled_instructions
+        transpose_instruction.instructions = list(self.instructions[5:10])
+
+        self.assertEqual(list(self.compiled_instructions[5:10]), transpose_instruction.compiled_instructions)
+
+    def test_apply_one_accepts_compiled_instructions(self):
+        self.mutator.apply_one(compile_instruction((constants.MUTATOR_DAMAGE, constants.SELF, 10)))
+
+        self.assertEqual(self.state.self.active.maxhp - 10, self.state.self.active.hp)
+
+
+class TestStateMutatorEvaluation(unittest.TestCase):
+    def setUp(self):
+        TestStateMutatorHash.setUp(self)
+        self.state.self.side_conditions[constants.STEALTH_ROCK] = 1
+        self.state.opponent.side_conditions[constants.SPIKES] = 2
+        self.state.self.reserve["rattata"].hp = 0
+        self.mutator.rehash()
+
+    def test_evaluation_is_the_same_as_evaluate(self):
+        self.assertEqual(evaluate(self.state), self.mutator.evaluation)
+
+    def test_evaluation_is_the_same_as_evaluate_after_each_instruction(self):
+        self.mutator.evaluation
+        for instruction in self.instructions:
+            self.mutator.apply([instruction])
+            self.assertEqual(evaluate(self.state), self.mutator.evaluation, instruction)
+
+    def test_evaluation_is_the_same_as_evaluate_after_reversing_each_instruction(self):
+        self.mutator.apply(self.instructions)
+        self.mutator.evaluation
+        for instruction in reversed(self.instructions):
+            self.mutator.reverse([instruction])
+            self.assertEqual(evaluate(self.state), self.mutator.evaluation, instruction)
+
+    def test_evaluation_is_updated_when_it_is_not_read_between_instructions(self):
+        original_evaluation = self.mutator.evaluation
+        self.mutator.apply(self.instructions)
+        self.assertEqual(evaluate(self.state), self.mutator.evaluation)
+
+        self.mutator.reverse(self.instructions)
+        self.assertEqual(original_evaluation, self.mutator.evaluation)
+
+    def test_switching_to_a_fainted_pokemon_changes_the_side_condition_score(self):
+        self.mutator.evaluation
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, self.state.self.active.hp)])
+        self.mutator.apply([(constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "charmander")])
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluation)
+
+    def test_rehash_picks_up_direct_modifications(self):
+        self.mutator.evaluation
+        self.state.opponent.active.hp = 1
+        self.mutator.rehash()
+
+        self.assertEqual(evaluate(self.state), self.mutator.evaluation)
@@ -0,0 +1,149 @@
+import threading
+import unittest
+
+import config
+from showdown.engine.transposition_table import LRUCache
+from showdown.engine.transposition_table import TranspositionTable
+from showdown.engine.transposition_table import get_private_cache
+from showdown.engine.transposition_table import private_caches
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(2)
+
+    def test_get_returns_stored_value(self):
+        self.cache.put('a', 1)
+
+        self.assertEqual(1, self.cache.get('a'))
+
+    def test_get_returns_default_for_missing_key(self):
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_hits_and_misses_are_counted(self):
+        self.cache.put('a', 1)
+        self.cache.get('a')
+        self.cache.get('b')
+
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(0.5, self.cache.hit_rate)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+
+        self.assertIn('a', self.cache)
+        self.assertNotIn('b', self.cache)
+        self.assertIn('c', self.cache)
+        self.assertEqual(1, self.cache.evictions)
+
+    def test_size_never_exceeds_max_size(self):
+        for i in range(10):
+            self.cache.put(i, i)
+
+        self.assertEqual(2, len(self.cache))
+
+    def test_clear_removes_entries_and_counters(self):
+        self.cache.put('a', 1)
+        self.cache.get('a')
+        self.cache.clear()
+
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.hits)
+
+    def test_merge_puts_the_other_entries_as_the_most_recently_used(self):
+        other = LRUCache(2)
+        other.put('b', 2)
+        self.cache.put('a', 1)
+        self.cache.put('c', 3)
+        self.cache.merge(other)
+
+        self.assertNotIn('a', self.cache)
+        self.assertEqual(2, self.cache.get('b'))
+        self.assertEqual(3, self.cache.get('c'))
+
+    def test_non_positive_max_size_raises_valueerror(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_keys_differ_by_depth(self):
+        key_1 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True)
+        key_2 = TranspositionTable.make_key(1, 2, ['tackle'], ['tackle'], True)
+
+        self.assertNotEqual(key_1, key_2)
+
+    def test_keys_differ_by_prune(self):
+        key_1 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True)
+        key_2 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], False)
+
+        self.assertNotEqual(key_1, key_2)
+
+    def test_keys_differ_by_each_search_setting(self):
+        for name, value in [('damage_calc_type', 'max'), ('damage_roll_bucket_size', 0.5), ('merge_identical_states', True), ('chance_pruning_epsilon', 0.01), ('chance_pruning_top_k', 3)]:
+            key_1 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True)
+            original_value = getattr(config, name)
+            setattr(config, name, value)
+            try:
+                key_2 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True)
+            finally:
+                setattr(config, name, original_value)
+
+            self.assertNotEqual(key_1, key_2, name)
+
+    def test_keys_are_equal_for_list_and_tuple_options(self):
+        key_1 = TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True)
+        key_2 = TranspositionTable.make_key(1, 1, ('tackle',), ('tackle',), True)
+
+        self.assertEqual(key_1, key_2)
+
+    def test_get_deepest_returns_the_deepest_search_of_a_state(self):
+        table = TranspositionTable(10)
+        table.put(TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True), 'depth 1')
+        table.put(TranspositionTable.make_key(1, 2, ['tackle'], ['tackle'], True), 'depth 2')
+        table.put(TranspositionTable.make_key(1, 1, ['tackle', 'growl'], ['tackle'], True), 'other options')
+
+        self.assertEqual((2, 'depth 2'), table.get_deepest(1, True))
+
+    def test_get_deepest_returns_none_for_a_state_that_was_not_searched(self):
+        table = TranspositionTable(10)
+        table.put(TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True), 'depth 1')
+
+        self.assertIsNone(table.get_deepest(2, True))
+        self.assertIsNone(table.get_deepest(1, False))
+
+    def test_get_deepest_returns_none_once_the_entry_is_evicted(self):
+        table = TranspositionTable(1)
+        table.put(TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True), 'depth 1')
+        table.put(TranspositionTable.make_key(2, 1, ['tackle'], ['tackle'], True), 'depth 1')
+
+        self.assertIsNone(table.get_deepest(1, True))
+        self.assertEqual((1, 'depth 1'), table.get_deepest(2, True))
+
+    def test_clear_removes_the_deepest_entries(self):
+        table = TranspositionTable(10)
+        table.put(TranspositionTable.make_key(1, 1, ['tackle'], ['tackle'], True), 'depth 1')
+        table.clear()
+
+        self.assertIsNone(table.get_deepest(1, True))
+
+
+class TestPrivateCaches(unittest.TestCase):
+    def test_private_cache_is_only_returned_within_the_block(self):
+        cache = LRUCache(2)
+        with private_caches(state_instruction_cache=cache):
+            self.assertIs(cache, get_private_cache('state_instruction_cache'))
+        self.assertIsNone(get_private_cache('state_instruction_cache'))
+
+    def test_private_cache_is_only_returned_in_its_thread(self):
+        found = []
+        with private_caches(state_instruction_cache=LRUCache(2)):
+            thread = threading.Thread(target=lambda: found.append(get_private_cache('state_instruction_cache')))
+            thread.start()
+            thread.join()
+
+        self.assertEqual([None], found)